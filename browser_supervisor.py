@@ -0,0 +1,255 @@
+import os
+import glob
+import time
+import signal
+import shutil
+import logging
+import threading
+
+# Префиксы временных директорий, которые создаёт парсер
+PROFILE_PREFIX = "ozon_profile_"
+PROXY_EXT_PREFIX = "ozon_proxy_"
+
+# Имена процессов браузера, за которыми следим
+BROWSER_PROCESS_NAMES = ("chrome", "chromedriver", "google-chrome", "chrome_crashpad")
+
+
+def read_proc_table():
+    """Снимок таблицы процессов из /proc: pid -> (ppid, имя, RSS в КБ, возраст в сек)"""
+    table = {}
+    try:
+        clock_ticks = os.sysconf('SC_CLK_TCK')
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except Exception:
+        return table
+
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                stat = f.read()
+            # Имя процесса в скобках может содержать пробелы
+            name = stat[stat.index('(') + 1:stat.rindex(')')]
+            fields = stat[stat.rindex(')') + 2:].split()
+            ppid = int(fields[1])
+            age = uptime - int(fields[19]) / clock_ticks
+
+            rss_kb = 0
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss_kb = int(line.split()[1])
+                        break
+
+            table[pid] = (ppid, name, rss_kb, age)
+        except (FileNotFoundError, ProcessLookupError, ValueError, IndexError, PermissionError):
+            continue
+
+    return table
+
+
+def process_tree(root_pid, table):
+    """Все pid дерева процессов, начиная с root_pid"""
+    children = {}
+    for pid, (ppid, _, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+
+    tree = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in table:
+            tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def is_browser_process(name):
+    return any(name.startswith(prefix) for prefix in BROWSER_PROCESS_NAMES)
+
+
+class BrowserSupervisor:
+    """Контроль браузеров процесса: RSS деревьев процессов, лимиты и очистка сирот"""
+
+    def __init__(self):
+        self.rss_limit_mb = int(os.getenv('BROWSER_RSS_LIMIT_MB', 1500))
+        self.max_pages = int(os.getenv('BROWSER_MAX_PAGES', 50))
+        self.orphan_min_age = int(os.getenv('BROWSER_ORPHAN_MIN_AGE', 120))
+        self.monitor_interval = int(os.getenv('BROWSER_MONITOR_INTERVAL', 60))
+        self.lock = threading.Lock()
+        self.browsers = {}  # worker -> {'pid', 'profile_dir', 'pages', 'started'}
+        self.claimed_dirs = set()  # временные директории живых парсеров
+        self.monitor_thread = None
+
+    def register(self, worker, driver, profile_dir):
+        """Регистрация запущенного браузера воркера"""
+        pid = None
+        try:
+            pid = driver.service.process.pid
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось получить pid chromedriver для {worker}: {e}")
+
+        with self.lock:
+            self.browsers[worker] = {
+                'pid': pid,
+                'profile_dir': profile_dir,
+                'pages': 0,
+                'started': time.time()
+            }
+        logging.info(f"🧭 Браузер воркера {worker} зарегистрирован (pid {pid})")
+
+    def unregister(self, worker):
+        with self.lock:
+            self.browsers.pop(worker, None)
+
+    def claim_dir(self, path):
+        """Защита временной директории от очистки, пока она используется"""
+        with self.lock:
+            self.claimed_dirs.add(path)
+
+    def release_dir(self, path):
+        with self.lock:
+            self.claimed_dirs.discard(path)
+
+    def note_page(self, worker):
+        """Учёт обработанной страницы"""
+        with self.lock:
+            info = self.browsers.get(worker)
+            if info:
+                info['pages'] += 1
+
+    def browser_count(self):
+        with self.lock:
+            return len(self.browsers)
+
+    def browser_pid(self, worker):
+        with self.lock:
+            info = self.browsers.get(worker)
+            return info['pid'] if info else None
+
+    def tree_rss_mb(self, pid, table=None):
+        """Суммарный RSS дерева процессов браузера в МБ"""
+        if not pid:
+            return 0.0
+        table = table if table is not None else read_proc_table()
+        return sum(table[p][2] for p in process_tree(pid, table)) / 1024
+
+    def should_recycle(self, worker):
+        """Причина перезапуска браузера или None"""
+        with self.lock:
+            info = dict(self.browsers.get(worker) or {})
+        if not info:
+            return None
+
+        if self.max_pages and info['pages'] >= self.max_pages:
+            return f"обработано страниц: {info['pages']}"
+
+        rss = self.tree_rss_mb(info['pid'])
+        if self.rss_limit_mb and rss >= self.rss_limit_mb:
+            return f"RSS {rss:.0f} МБ >= {self.rss_limit_mb} МБ"
+
+        return None
+
+    def memory_report(self):
+        """Память по воркерам: worker -> {'rss_mb', 'pages', 'uptime'}"""
+        table = read_proc_table()
+        with self.lock:
+            browsers = {worker: dict(info) for worker, info in self.browsers.items()}
+
+        return {
+            worker: {
+                'rss_mb': round(self.tree_rss_mb(info['pid'], table), 1),
+                'pages': info['pages'],
+                'uptime': int(time.time() - info['started'])
+            }
+            for worker, info in browsers.items()
+        }
+
+    def kill_tree(self, pid):
+        """Принудительное завершение дерева процессов браузера"""
+        if not pid:
+            return 0
+        table = read_proc_table()
+        killed = 0
+        # Сначала потомки, затем сам chromedriver
+        for p in reversed(process_tree(pid, table)):
+            # Защита от переиспользования pid чужим процессом
+            if not is_browser_process(table[p][1]):
+                continue
+            try:
+                os.kill(p, signal.SIGKILL)
+                killed += 1
+            except (ProcessLookupError, PermissionError):
+                continue
+        if killed:
+            logging.info(f"🔪 Завершено процессов браузера: {killed} (pid {pid})")
+        return killed
+
+    def cleanup_orphans(self):
+        """Удаление осиротевших процессов chrome/chromedriver и временных профилей"""
+        table = read_proc_table()
+        with self.lock:
+            live_pids = [info['pid'] for info in self.browsers.values() if info['pid']]
+            live_dirs = {info['profile_dir'] for info in self.browsers.values()} | self.claimed_dirs
+
+        owned = set()
+        for pid in live_pids:
+            owned.update(process_tree(pid, table))
+
+        killed = 0
+        for pid, (ppid, name, _, age) in table.items():
+            if pid in owned or not is_browser_process(name) or age < self.orphan_min_age:
+                continue
+            # Корень осиротевшего дерева: родитель не браузер
+            parent = table.get(ppid)
+            if parent and is_browser_process(parent[1]) and ppid not in owned:
+                continue
+            killed += self.kill_tree(pid)
+
+        removed = 0
+        now = time.time()
+        tmp_dir = os.environ.get('TMPDIR', '/tmp')
+        for pattern in (PROFILE_PREFIX, PROXY_EXT_PREFIX):
+            for path in glob.glob(os.path.join(tmp_dir, f"{pattern}*")):
+                if path in live_dirs:
+                    continue
+                try:
+                    if now - os.path.getmtime(path) < self.orphan_min_age:
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+                except OSError:
+                    continue
+
+        if killed or removed:
+            logging.info(f"🧹 Очистка сирот: процессов {killed}, директорий {removed}")
+        return killed, removed
+
+    def start_monitor(self):
+        """Фоновый поток: отчёт о памяти и очистка сирот"""
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            return
+
+        def monitor():
+            while True:
+                time.sleep(self.monitor_interval)
+                try:
+                    report = self.memory_report()
+                    if report:
+                        summary = ", ".join(
+                            f"{worker}: {info['rss_mb']} МБ/{info['pages']} стр."
+                            for worker, info in sorted(report.items())
+                        )
+                        logging.info(f"🧠 Память браузеров: {summary}")
+                    self.cleanup_orphans()
+                except Exception as e:
+                    logging.warning(f"⚠️ Ошибка мониторинга браузеров: {e}")
+
+        self.monitor_thread = threading.Thread(target=monitor, name="browser-monitor", daemon=True)
+        self.monitor_thread.start()
+
+
+supervisor = BrowserSupervisor()
@@ -0,0 +1,179 @@
+import os
+import time
+import logging
+import functools
+import threading
+import statistics
+from collections import deque
+import pika
+from rabbit import SELLER_QUEUE, connection_params
+
+
+def read_int_file(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return None if value == 'max' else int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def free_memory_mb():
+    """Свободная память контейнера (МБ): лимит cgroup минус использование, но не больше MemAvailable"""
+    candidates = []
+
+    # cgroup v2, затем v1
+    for limit_path, usage_path in (
+            ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+            ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes')):
+        limit = read_int_file(limit_path)
+        usage = read_int_file(usage_path)
+        # v1 без лимита отдаёт огромное число
+        if limit and usage is not None and limit < 1 << 60:
+            candidates.append((limit - usage) / 1024 / 1024)
+            break
+
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) / 1024)
+                    break
+    except OSError:
+        pass
+
+    return min(candidates) if candidates else None
+
+
+class ConcurrencyController:
+    """Число активных слотов воркеров (prefetch канала) по очереди, блокировкам, задержкам и памяти"""
+
+    def __init__(self):
+        self.mode = os.getenv('CONCURRENCY_MODE', 'adaptive')
+        self.min_slots = int(os.getenv('WORKERS_MIN', 1))
+        self.max_slots = int(os.getenv('WORKERS_MAX', 5))
+        self.slots = min(self.max_slots, max(self.min_slots, int(os.getenv('WORKERS_INITIAL', 2))))
+        if self.mode != 'adaptive':
+            self.slots = self.max_slots
+        self.interval = int(os.getenv('CONCURRENCY_INTERVAL', 30))
+        self.window = int(os.getenv('CONCURRENCY_WINDOW', 300))
+        self.max_block_rate = float(os.getenv('CONCURRENCY_MAX_BLOCK_RATE', 0.2))
+        self.max_latency = float(os.getenv('CONCURRENCY_MAX_LATENCY', 120))
+        self.slot_memory_mb = int(os.getenv('CONCURRENCY_SLOT_MEMORY_MB', 700))
+        self.min_free_mb = int(os.getenv('CONCURRENCY_MIN_FREE_MB', 300))
+        # Предзагрузка: на каждый слот ещё одно сообщение ждёт в процессе
+        self.lookahead = False
+
+        self.lock = threading.Lock()
+        self.outcomes = deque()  # (время, статус, длительность)
+        self.connection = None
+        self.channel = None
+        self.thread = None
+
+    def record(self, status, duration):
+        """Учёт результата обработки продавца"""
+        now = time.time()
+        with self.lock:
+            self.outcomes.append((now, status, duration))
+            while self.outcomes and now - self.outcomes[0][0] > self.window:
+                self.outcomes.popleft()
+
+    def window_stats(self):
+        """Доля блокировок и медианная длительность успешных продавцов за окно"""
+        with self.lock:
+            outcomes = list(self.outcomes)
+        if not outcomes:
+            return 0.0, None, 0
+        blocked = sum(1 for _, status, _ in outcomes if status == 'blocked')
+        durations = [duration for _, status, duration in outcomes if status == 'ok']
+        latency = statistics.median(durations) if durations else None
+        return blocked / len(outcomes), latency, len(outcomes)
+
+    def decide(self, backlog, free_mb):
+        """Новое число слотов: мультипликативное снижение при давлении, +1 при запасе"""
+        block_rate, latency, samples = self.window_stats()
+        slots = self.slots
+        reason = None
+
+        if free_mb is not None and free_mb < self.min_free_mb:
+            slots, reason = slots - 1, f"мало памяти: {free_mb:.0f} МБ"
+        elif samples >= 3 and block_rate > self.max_block_rate:
+            slots, reason = slots // 2, f"доля блокировок {block_rate:.0%}"
+        elif latency is not None and latency > self.max_latency:
+            slots, reason = slots - 1, f"медианное время продавца {latency:.0f} сек"
+        elif backlog is not None and backlog == 0:
+            slots, reason = slots - 1, "очередь пуста"
+        elif backlog is not None and backlog > slots and (
+                free_mb is None or free_mb - self.slot_memory_mb >= self.min_free_mb):
+            slots, reason = slots + 1, f"в очереди {backlog} сообщений"
+
+        slots = min(self.max_slots, max(self.min_slots, slots))
+        return slots, reason
+
+    def prefetch_count(self, slots=None):
+        """Prefetch канала для числа слотов (с учётом сообщений для предзагрузки)"""
+        slots = slots or self.slots
+        return slots * 2 if self.lookahead else slots
+
+    def attach(self, connection, channel):
+        """Привязка к текущему соединению консьюмера (после каждого переподключения)"""
+        self.connection = connection
+        self.channel = channel
+
+    def apply(self, slots):
+        """Смена prefetch канала в потоке соединения: RabbitMQ выдаст не больше slots сообщений"""
+        connection, channel = self.connection, self.channel
+        if not connection or not channel:
+            return False
+        try:
+            connection.add_callback_threadsafe(
+                functools.partial(channel.basic_qos, prefetch_count=self.prefetch_count(slots), global_qos=True)
+            )
+            return True
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось изменить число слотов: {e}")
+            return False
+
+    def queue_backlog(self, channel):
+        try:
+            return channel.queue_declare(queue=SELLER_QUEUE, durable=True, passive=True).method.message_count
+        except Exception as e:
+            logging.debug(f"⚠️ Не удалось получить глубину очереди: {e}")
+            return None
+
+    def start(self):
+        """Фоновый поток управления числом слотов"""
+        if self.mode != 'adaptive' or (self.thread and self.thread.is_alive()):
+            return
+
+        def control_loop():
+            connection = None
+            status_channel = None
+            while True:
+                time.sleep(self.interval)
+                try:
+                    # Отдельное соединение: канал консьюмера принадлежит другому потоку
+                    if connection is None or connection.is_closed:
+                        connection = pika.BlockingConnection(connection_params())
+                        status_channel = None
+                    if status_channel is None or status_channel.is_closed:
+                        status_channel = connection.channel()
+                    backlog = self.queue_backlog(status_channel)
+                    free_mb = free_memory_mb()
+                    slots, reason = self.decide(backlog, free_mb)
+
+                    if slots != self.slots and self.apply(slots):
+                        logging.info(f"🎚️ Слоты воркеров: {self.slots} -> {slots} ({reason})")
+                        self.slots = slots
+                        # Новое решение - по наблюдениям уже при новом числе слотов
+                        with self.lock:
+                            self.outcomes.clear()
+                except Exception as e:
+                    logging.warning(f"⚠️ Ошибка регулятора параллелизма: {e}")
+                    connection = None
+
+        self.thread = threading.Thread(target=control_loop, name="concurrency-controller", daemon=True)
+        self.thread.start()
+
+
+controller = ConcurrencyController()
@@ -0,0 +1,44 @@
+import os
+import time
+
+# Бюджет времени на продавца (сек), включая все попытки, ожидания и паузы; 0 - без ограничения
+SELLER_BUDGET = float(os.getenv('SELLER_BUDGET', 180))
+
+
+class DeadlineExceeded(BaseException):
+    """Бюджет продавца исчерпан.
+
+    Наследуется от BaseException, как asyncio.CancelledError: широкие `except Exception`
+    в шагах парсинга не должны глотать отмену.
+    """
+
+
+class Deadline:
+    """Оставшееся время продавца для ожиданий, пауз и повторов"""
+
+    def __init__(self, budget=None):
+        self.budget = budget or None
+        self.expires = time.monotonic() + budget if self.budget else None
+
+    def remaining(self):
+        if self.expires is None:
+            return float('inf')
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, limit, stage="ожидание"):
+        """Таймаут шага: не больше limit и не дольше остатка бюджета"""
+        self.check(stage)
+        return max(1, min(limit, self.remaining()))
+
+    def sleep(self, seconds, stage="пауза"):
+        """Пауза, которая не переживёт бюджет: если остатка не хватает, отмена сразу"""
+        if seconds >= self.remaining():
+            raise DeadlineExceeded(stage)
+        time.sleep(seconds)
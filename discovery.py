@@ -0,0 +1,93 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from rabbit import SELLER_QUEUE, Publisher
+
+DISCOVERY_DB = os.getenv('DISCOVERY_DB', '/app/data/discovery.db')
+
+# Сбор ID продавцов со страниц и постановка найденных в очередь
+DISCOVERY_ENABLED = os.getenv('DISCOVERY', 'false').lower() == 'true'
+
+# Ссылки и упоминания /seller/<id> и /seller/<slug>-<id> в разметке и встроенном состоянии
+# страницы; регулярное выражение выполняется в браузере, в Python приходят только ID
+SELLER_LINKS_SCRIPT = r"""
+var ids = {};
+var re = /\/seller\/(?:[\w-]*-)?(\d+)(?![\w-])/g;
+var html = document.documentElement.innerHTML;
+var match;
+while ((match = re.exec(html)) !== null) {
+    ids[match[1]] = 1;
+}
+return Object.keys(ids);
+"""
+
+
+class DiscoveryStore:
+    """Постоянное множество известных ID продавцов (общий файл для реплик)"""
+
+    def __init__(self, path=DISCOVERY_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS sellers (
+                seller_id TEXT PRIMARY KEY,
+                source TEXT,
+                discovered_at REAL
+            )
+        """)
+        self.db.commit()
+
+    def add(self, seller_ids, source):
+        """Добавление ID; возвращает только ранее не встречавшиеся"""
+        now = time.time()
+        added = []
+        with self.lock, self.db:
+            for seller_id in seller_ids:
+                cursor = self.db.execute(
+                    "INSERT OR IGNORE INTO sellers (seller_id, source, discovered_at) VALUES (?, ?, ?)",
+                    (str(seller_id), str(source), now)
+                )
+                if cursor.rowcount:
+                    added.append(str(seller_id))
+        return added
+
+    def forget(self, seller_ids):
+        """Откат добавления (публикация не удалась) - ID найдётся снова"""
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM sellers WHERE seller_id = ?", [(str(i),) for i in seller_ids])
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM sellers").fetchone()[0]
+
+
+class SellerDiscovery:
+    """Найденные на страницах продавцы -> множество известных -> очередь seller_ids"""
+
+    def __init__(self):
+        self.store = DiscoveryStore()
+        self.publisher = Publisher(SELLER_QUEUE, declare=False)
+
+    def mark_seen(self, seller_id, source='queue'):
+        """ID, уже полученный из очереди, повторно не ставим"""
+        self.store.add([seller_id], source)
+
+    def harvest(self, driver, source):
+        """Сбор ID со страницы и публикация новых"""
+        seller_ids = driver.execute_script(SELLER_LINKS_SCRIPT) or []
+        new_ids = self.store.add(seller_ids, source)
+        if not new_ids:
+            return 0
+        if not self.publisher.publish([seller_id.encode() for seller_id in new_ids]):
+            logging.error(f"❌ Не удалось поставить в очередь найденных продавцов: {len(new_ids)}")
+            self.store.forget(new_ids)
+            return 0
+        logging.info(f"🔭 Со страницы {source} найдено новых продавцов: {len(new_ids)} (из {len(seller_ids)})")
+        return len(new_ids)
+
+
+seller_discovery = SellerDiscovery() if DISCOVERY_ENABLED else None
@@ -0,0 +1,87 @@
+import os
+import json
+import logging
+from dataclasses import dataclass, replace
+from fingerprints import LEGAL_FIELDS
+
+# Стадии извлечения со страницы продавца
+STAGES = ('shop_name', 'products', 'legal')
+
+# Поля отпечатка, которые заполняет стадия
+STAGE_FIELDS = {
+    'shop_name': ('name',),
+    'products': ('products',),
+    'legal': LEGAL_FIELDS,
+}
+
+
+@dataclass(slots=True, frozen=True)
+class ExtractionProfile:
+    """Набор стадий извлечения и архивирование HTML"""
+    name: str
+    stages: tuple
+    archive_html: bool = True
+
+    def runs(self, stage):
+        return stage in self.stages
+
+    @property
+    def fingerprint_fields(self):
+        """Поля, которые профиль извлекает (остальные отпечатки не сверяются)"""
+        return tuple(field for stage in self.stages for field in STAGE_FIELDS[stage])
+
+
+PROFILES = {
+    'full': ExtractionProfile(name='full', stages=STAGES),
+    # ОГРН/ИНН и метрики: состояние страницы, модалка - только если его не хватило
+    'legal-only': ExtractionProfile(name='legal-only', stages=('legal',), archive_html=False),
+    # Название и товары, без модалки "Магазин"
+    'products-only': ExtractionProfile(name='products-only', stages=('shop_name', 'products'), archive_html=False),
+}
+
+
+def parse_flag(value):
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).lower() == 'true'
+
+
+def get_extraction_profile(name=None, archive_html=None):
+    """Профиль по имени (по умолчанию EXTRACTION_PROFILE); ARCHIVE_HTML или archive_html переопределяют HTML"""
+    name = name or os.getenv('EXTRACTION_PROFILE', 'full')
+    if name not in PROFILES:
+        logging.warning(f"⚠️ Неизвестный профиль извлечения '{name}', используется full")
+        name = 'full'
+    profile = PROFILES[name]
+
+    archive_html = parse_flag(archive_html if archive_html is not None else os.getenv('ARCHIVE_HTML') or None)
+    if archive_html is not None and archive_html != profile.archive_html:
+        profile = replace(profile, archive_html=archive_html)
+    return profile
+
+
+def message_body(seller_id, profile=None, archive_html=None):
+    """Тело сообщения seller_ids: просто ID или JSON с профилем задания"""
+    if profile is None and archive_html is None:
+        return str(seller_id)
+    data = {'seller_id': str(seller_id)}
+    if profile:
+        data['profile'] = profile
+    if archive_html is not None:
+        data['html'] = archive_html
+    return json.dumps(data)
+
+
+def parse_message(body):
+    """ID продавца и профиль из тела сообщения: '123' или {"seller_id": "123", "profile": "legal-only", "html": false}.
+
+    ValueError - тело не разбирается.
+    """
+    text = body.decode() if isinstance(body, bytes) else str(body)
+    text = text.strip()
+    if not text.startswith('{'):
+        return text, get_extraction_profile()
+    data = json.loads(text)
+    if not isinstance(data, dict) or not data.get('seller_id'):
+        raise ValueError(f"нет seller_id в сообщении: {text[:200]}")
+    return str(data['seller_id']), get_extraction_profile(data.get('profile'), data.get('html'))
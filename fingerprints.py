@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+FINGERPRINT_DB = os.getenv('FINGERPRINT_DB', '/app/data/fingerprints.db')
+
+# Минимальный возраст данных продавца для повторного обхода (сек)
+REFRESH_MIN_AGE = int(os.getenv('REFRESH_MIN_AGE', 86400))
+
+# Поля отпечатка по блокам страницы
+MAIN_FIELDS = ('name', 'products')
+LEGAL_FIELDS = ('ogrn', 'inn', 'legal_name', 'reviews', 'rating', 'registration')
+
+
+def digest(value):
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def products_digest(products_json):
+    """Отпечаток товаров без учёта порядка карточек и служебных полей"""
+    try:
+        products = json.loads(products_json or '[]')
+    except (TypeError, ValueError):
+        return digest(products_json or '')
+    items = sorted(f"{p.get('link', '')}|{p.get('name', '')}|{p.get('price', '')}" for p in products)
+    return digest("\n".join(items))
+
+
+def field_digests(record):
+    """Отпечатки полей записи"""
+    digests = {field: digest(getattr(record, field) or '') for field in ('name',) + LEGAL_FIELDS}
+    digests['products'] = products_digest(record.products_json)
+    return digests
+
+
+def block_digest(digests, fields):
+    # Поля, которые ещё ни один обход не извлекал, - пустые
+    return digest("|".join(digests.get(field, '') for field in fields))
+
+
+class FingerprintStore:
+    """Отпечатки продавцов: главная страница и юридический блок, история изменений"""
+
+    def __init__(self, path=FINGERPRINT_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        # Файл общий для реплик (bind mount), поэтому ждём блокировку
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                seller_id TEXT PRIMARY KEY,
+                main_hash TEXT,
+                legal_hash TEXT,
+                field_hashes TEXT,
+                crawls INTEGER DEFAULT 0,
+                changes INTEGER DEFAULT 0,
+                last_crawled REAL,
+                last_changed REAL,
+                scheduled_at REAL
+            )
+        """)
+        self.db.commit()
+
+    def update(self, seller_id, record, fields=None):
+        """Сравнение с прошлым обходом; возвращает множество изменившихся полей.
+
+        fields - поля, которые обход извлекал (профиль извлечения); отпечатки остальных сохраняются прежними.
+        """
+        digests = field_digests(record)
+        now = time.time()
+
+        with self.lock, self.db:
+            row = self.db.execute(
+                "SELECT field_hashes FROM fingerprints WHERE seller_id = ?", (str(seller_id),)
+            ).fetchone()
+
+            previous = json.loads(row[0] or '{}') if row else {}
+            if fields is not None:
+                digests = {**previous, **{field: digests[field] for field in fields}}
+            # Пустое юрполе - неудачное извлечение (модалка не открылась), а не изменение: отпечаток прежний
+            for field in LEGAL_FIELDS:
+                if field in previous and not getattr(record, field):
+                    digests[field] = previous[field]
+            if row is None:
+                changed = set(fields if fields is not None else digests)
+            else:
+                changed = {field for field, value in digests.items() if previous.get(field) != value}
+            main_hash = block_digest(digests, MAIN_FIELDS)
+            legal_hash = block_digest(digests, LEGAL_FIELDS)
+
+            self.db.execute("""
+                INSERT INTO fingerprints (seller_id, main_hash, legal_hash, field_hashes,
+                                          crawls, changes, last_crawled, last_changed)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT(seller_id) DO UPDATE SET
+                    main_hash = excluded.main_hash,
+                    legal_hash = excluded.legal_hash,
+                    field_hashes = excluded.field_hashes,
+                    crawls = crawls + 1,
+                    changes = changes + excluded.changes,
+                    last_crawled = excluded.last_crawled,
+                    last_changed = COALESCE(excluded.last_changed, last_changed)
+            """, (
+                str(seller_id), main_hash, legal_hash, json.dumps(digests),
+                1 if changed else 0, now, now if changed else None
+            ))
+
+        return changed
+
+    def due(self, limit, min_age=REFRESH_MIN_AGE):
+        """Продавцы для повторного обхода: устаревшие и часто меняющиеся - первыми"""
+        now = time.time()
+        with self.lock, self.db:
+            rows = self.db.execute("""
+                SELECT seller_id FROM fingerprints
+                WHERE last_crawled <= :cutoff
+                  AND (scheduled_at IS NULL OR scheduled_at <= last_crawled OR scheduled_at <= :cutoff)
+                ORDER BY (:now - last_crawled) * (changes + 1.0) / (crawls + 2.0) DESC
+                LIMIT :limit
+            """, {'now': now, 'cutoff': now - min_age, 'limit': limit}).fetchall()
+            ids = [row[0] for row in rows]
+            # Помечаем поставленных в очередь, чтобы не дублировать их следующим запуском
+            self.db.executemany(
+                "UPDATE fingerprints SET scheduled_at = ? WHERE seller_id = ?", [(now, i) for i in ids]
+            )
+        logging.info(f"📅 К повторному обходу отобрано продавцов: {len(ids)}")
+        return ids
+
+
+def append_changes(path, seller_id, record, changed):
+    """Изменившиеся поля продавца в журнал изменений (JSON Lines)"""
+    entry = {
+        'seller_id': str(seller_id),
+        'url': record.url,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'changed': {field: getattr(record, field if field != 'products' else 'products_json') for field in sorted(changed)}
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
@@ -0,0 +1,219 @@
+import os
+import time
+import random
+import fcntl
+import shutil
+import logging
+import threading
+from dataclasses import dataclass
+from selenium.webdriver.chrome.options import Options
+
+# Базовые опции для Chrome в Docker
+DOCKER_ARGUMENTS = (
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-setuid-sandbox",
+)
+
+STEALTH_ARGUMENTS = (
+    "--disable-blink-features=AutomationControlled",
+    "--disable-features=UserAgentClientHint",
+)
+
+USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+)
+
+
+@dataclass(slots=True, frozen=True)
+class LaunchProfile:
+    """Набор опций запуска браузера"""
+    name: str
+    arguments: tuple
+    window_size: str
+    page_load_strategy: str
+    images: bool = True
+
+    def build_options(self, user_data_dir, cache_dir=None, cache_size_mb=None, performance_log=False, proxy=None,
+                      proxy_extension=None):
+        """Опции Chrome; proxy_extension - расширение авторизации прокси с логином и паролем (вместо --proxy-server)"""
+        options = Options()
+        for argument in DOCKER_ARGUMENTS + STEALTH_ARGUMENTS + self.arguments:
+            # Расширение авторизации прокси не загрузится при отключённых расширениях
+            if proxy_extension and argument == "--disable-extensions":
+                continue
+            options.add_argument(argument)
+        options.add_argument(f"--window-size={self.window_size}")
+        options.page_load_strategy = self.page_load_strategy
+
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option('useAutomationExtension', False)
+        if not self.images:
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+        options.add_argument(f"--user-agent={random.choice(USER_AGENTS)}")
+        # Профиль (cookies, localStorage) у каждого браузера свой
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+        if cache_dir:
+            options.add_argument(f"--disk-cache-dir={cache_dir}")
+            options.add_argument(f"--disk-cache-size={cache_size_mb * 1024 * 1024}")
+        if proxy_extension:
+            options.add_extension(proxy_extension)
+        elif proxy:
+            options.add_argument(f"--proxy-server={proxy}")
+        if performance_log:
+            # События CDP Network в driver.get_log('performance')
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        return options
+
+
+PROFILES = {
+    # Прежний запуск: полный рендер страницы
+    'stealth-max': LaunchProfile(
+        name='stealth-max',
+        arguments=(),
+        window_size="1920,1080",
+        page_load_strategy='normal',
+    ),
+    # Без картинок и фоновых служб Chrome, управление возвращается после DOMContentLoaded
+    'lean': LaunchProfile(
+        name='lean',
+        arguments=(
+            "--blink-settings=imagesEnabled=false",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--mute-audio",
+            "--no-first-run",
+        ),
+        window_size="1366,768",
+        page_load_strategy='eager',
+        images=False,
+    ),
+}
+
+
+def split_proxy(proxy):
+    """Прокси из PROXY_LIST ([scheme://][user:pass@]host:port) -> (host, port, user, password)"""
+    address = proxy.split('://', 1)[-1]
+    credentials, _, server = address.rpartition('@')
+    host, _, port = server.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"некорректный прокси '{proxy}': ожидается [user:pass@]host:port")
+    user, _, password = credentials.partition(':')
+    return host, port, user or None, password or None
+
+
+def get_launch_profile(name=None):
+    name = name or os.getenv('LAUNCH_PROFILE', 'stealth-max')
+    if name not in PROFILES:
+        logging.warning(f"⚠️ Неизвестный профиль запуска '{name}', используется stealth-max")
+        name = 'stealth-max'
+    return PROFILES[name]
+
+
+def dir_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / 1024 / 1024
+
+
+class AssetCache:
+    """Общий для браузеров контейнера HTTP-кэш (JS/CSS Ozon).
+
+    Браузеры не пишут в общий каталог одновременно: при запуске снимок копируется
+    в профиль, при закрытии кэш профиля заменяет снимок, если тот устарел.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('BROWSER_CACHE', 'true').lower() == 'true'
+        self.seed_dir = os.getenv('BROWSER_CACHE_DIR', '/app/cache/chrome')
+        self.max_mb = int(os.getenv('BROWSER_CACHE_MAX_MB', 200))
+        self.publish_interval = int(os.getenv('BROWSER_CACHE_PUBLISH_INTERVAL', 900))
+        self.lock_path = f"{self.seed_dir}.lock"
+
+    def cache_dir(self, profile_dir):
+        return os.path.join(profile_dir, "asset_cache") if self.enabled else None
+
+    def locked(self, mode):
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, 'w')
+        try:
+            fcntl.flock(lock_file, mode)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def prepare(self, profile_dir):
+        """Каталог кэша для браузера профиля; при первом запуске заполняется из снимка"""
+        cache_dir = self.cache_dir(profile_dir)
+        if not cache_dir or os.path.exists(cache_dir):
+            return cache_dir
+
+        lock_file = self.locked(fcntl.LOCK_SH)
+        try:
+            if os.path.isdir(self.seed_dir):
+                shutil.copytree(self.seed_dir, cache_dir)
+                logging.info(f"📦 Кэш ресурсов скопирован в профиль ({dir_size_mb(cache_dir):.0f} МБ)")
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось скопировать кэш ресурсов: {e}")
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        finally:
+            if lock_file:
+                lock_file.close()
+        return cache_dir
+
+    def publish(self, profile_dir):
+        """Кэш закрытого браузера становится новым снимком, если снимок старше publish_interval"""
+        cache_dir = self.cache_dir(profile_dir)
+        if not cache_dir or not os.path.isdir(cache_dir):
+            return False
+        try:
+            if time.time() - os.path.getmtime(self.seed_dir) < self.publish_interval:
+                return False
+        except OSError:
+            pass
+
+        size_mb = dir_size_mb(cache_dir)
+        if not size_mb or size_mb > self.max_mb * 1.2:
+            return False
+
+        suffix = f"{os.getpid()}.{threading.get_ident()}"
+        tmp_dir = f"{self.seed_dir}.tmp.{suffix}"
+        old_dir = f"{self.seed_dir}.old.{suffix}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        try:
+            shutil.copytree(cache_dir, tmp_dir)
+            # Не ждём: если снимок сейчас копируют, обновим при следующем закрытии
+            lock_file = self.locked(fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if lock_file is None:
+                return False
+            try:
+                if os.path.isdir(self.seed_dir):
+                    os.rename(self.seed_dir, old_dir)
+                os.rename(tmp_dir, self.seed_dir)
+                # copytree переносит mtime источника - отмечаем время публикации
+                os.utime(self.seed_dir)
+            finally:
+                lock_file.close()
+            logging.info(f"📦 Обновлён общий кэш ресурсов ({size_mb:.0f} МБ)")
+            return True
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось обновить общий кэш ресурсов: {e}")
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+asset_cache = AssetCache()
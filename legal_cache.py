@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+LEGAL_CACHE_DB = os.getenv('LEGAL_CACHE_DB', '/app/data/legal_cache.db')
+
+# Юрданные продавца между обходами: модалка "Магазин" открывается только для истёкших и изменившихся записей.
+# По умолчанию - в повторных обходах (REFRESH_MODE); в первичном обходе данные нужны свежие
+LEGAL_CACHE_ENABLED = os.getenv('LEGAL_CACHE', os.getenv('REFRESH_MODE', 'false')).lower() == 'true'
+LEGAL_CACHE_TTL = int(os.getenv('LEGAL_CACHE_TTL', 30 * 86400))
+# Метрики модалки (рейтинг, отзывы) меняются чаще - свой срок; 0 - обновлять при каждом обходе
+LEGAL_METRICS_TTL = int(os.getenv('LEGAL_METRICS_TTL', 3 * 86400))
+
+LEGAL_FIELDS = ('ОГРН', 'ИНН', 'Название_юр_лица')
+METRIC_FIELDS = ('Отзывы', 'Рейтинг', 'Срок_регистрации', 'Заказы')
+# Дешёвые признаки со страницы: расхождение с сохранённым значением - запись устарела
+SIGNAL_FIELDS = ('Название', 'ОГРН', 'ИНН')
+
+
+def pick(data, fields):
+    return {field: data[field] for field in fields if data.get(field)}
+
+
+def is_stale(seller_id, signals, observed):
+    """Признаки со страницы расходятся с сохранёнными: юрданные изменились, нужна модалка"""
+    changed = [field for field, value in pick(observed, SIGNAL_FIELDS).items()
+               if signals.get(field) and signals[field] != value]
+    if changed:
+        logging.info(f"🗂️ Юрданные {seller_id} в кэше устарели: изменились {', '.join(changed)}")
+    return bool(changed)
+
+
+class LegalCache:
+    """Кэш юрданных и метрик продавцов с раздельными сроками годности (общий для реплик файл SQLite)"""
+
+    def __init__(self, path=LEGAL_CACHE_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        # Файл общий для реплик (bind mount), поэтому ждём блокировку
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS legal (
+                seller_id TEXT PRIMARY KEY,
+                legal TEXT,
+                legal_checked REAL,
+                metrics TEXT,
+                metrics_checked REAL,
+                signals TEXT
+            )
+        """)
+        self.db.commit()
+
+    def lookup(self, seller_id, observed):
+        """Годные юрданные и метрики: (legal или None, metrics или None).
+
+        observed - признаки с текущей страницы; расхождение с сохранёнными делает юрданные устаревшими.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT legal, legal_checked, metrics, metrics_checked, signals FROM legal WHERE seller_id = ?",
+                (str(seller_id),)
+            ).fetchone()
+        if row is None:
+            return None, None
+
+        now = time.time()
+        legal = json.loads(row[0] or '{}')
+        if not legal or now - (row[1] or 0) > LEGAL_CACHE_TTL or is_stale(seller_id, json.loads(row[4] or '{}'), observed):
+            legal = None
+
+        metrics = json.loads(row[2] or '{}')
+        if not metrics or now - (row[3] or 0) > LEGAL_METRICS_TTL:
+            metrics = None
+        return legal, metrics
+
+    def store(self, seller_id, data):
+        """Сохранение свежих юрданных и/или метрик продавца; пустые блоки не затирают сохранённые"""
+        legal = pick(data, LEGAL_FIELDS)
+        metrics = pick(data, METRIC_FIELDS)
+        # Неполные юрданные (только название) не кэшируем: без ОГРН/ИНН модалку всё равно нужно открыть
+        if not (legal.get('ОГРН') or legal.get('ИНН')):
+            legal = {}
+        if not legal and not metrics:
+            return
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("""
+                INSERT INTO legal (seller_id, legal, legal_checked, metrics, metrics_checked, signals)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(seller_id) DO UPDATE SET
+                    legal = COALESCE(excluded.legal, legal),
+                    legal_checked = COALESCE(excluded.legal_checked, legal_checked),
+                    metrics = COALESCE(excluded.metrics, metrics),
+                    metrics_checked = COALESCE(excluded.metrics_checked, metrics_checked),
+                    signals = CASE WHEN excluded.legal IS NULL THEN signals ELSE excluded.signals END
+            """, (
+                str(seller_id),
+                json.dumps(legal, ensure_ascii=False) if legal else None, now if legal else None,
+                json.dumps(metrics, ensure_ascii=False) if metrics else None, now if metrics else None,
+                json.dumps(pick(data, SIGNAL_FIELDS), ensure_ascii=False)
+            ))
+
+
+legal_cache = LegalCache() if LEGAL_CACHE_ENABLED else None
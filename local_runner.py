@@ -0,0 +1,155 @@
+import sys
+import time
+import queue
+import logging
+import argparse
+import functools
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import parser as ozon
+from browser_supervisor import supervisor
+from concurrency import controller
+from profiling import profiler
+from pipeline import pipeline
+from rabbit import RETRY_MAX_ATTEMPTS
+from extraction_profiles import PROFILES, get_extraction_profile
+
+
+def read_seller_ids(args):
+    """ID продавцов из диапазона или файла (по одному в строке)"""
+    if args.ids_file:
+        with open(args.ids_file, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [str(seller_id) for seller_id in range(args.start, args.end + 1)]
+
+
+class LocalRunner:
+    """Обработка списка продавцов N воркерами без RabbitMQ"""
+
+    def __init__(self, seller_ids, workers, max_attempts=RETRY_MAX_ATTEMPTS, report_interval=60):
+        self.work = queue.Queue()
+        for seller_id in seller_ids:
+            self.work.put((seller_id, 1))
+        self.total = len(seller_ids)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.report_interval = report_interval
+        self.lock = threading.Lock()
+        self.stats = {'ok': 0, 'failed': 0, 'retries': 0}
+        self.durations = []
+        self.started = None
+        self.in_flight = 0  # продавцы, чей результат ещё не записан (конвейер PIPELINE)
+
+    def worker(self):
+        try:
+            while True:
+                try:
+                    seller_id, attempt = self.work.get(timeout=1)
+                except queue.Empty:
+                    # Очередь пуста, но незаписанный результат ещё может вернуть продавца на повтор
+                    with self.lock:
+                        if not self.in_flight:
+                            return
+                    continue
+
+                with self.lock:
+                    self.in_flight += 1
+                started = time.time()
+                ozon.parse_task(seller_id, attempt, on_done=functools.partial(self.finish, seller_id, attempt, started))
+                self.work.task_done()
+        finally:
+            ozon.release_worker_parser()
+
+    def finish(self, seller_id, attempt, started, status):
+        """Итог продавца - когда результат записан (как подтверждение сообщения в RabbitMQ)"""
+        with self.lock:
+            self.in_flight -= 1
+            self.durations.append(time.time() - started)
+            if status == 'ok':
+                self.stats['ok'] += 1
+            elif attempt < self.max_attempts:
+                # Повтор в конец очереди вместо ожидания в потоке
+                self.stats['retries'] += 1
+                self.work.put((seller_id, attempt + 1))
+            else:
+                self.stats['failed'] += 1
+
+    def progress(self):
+        with self.lock:
+            done = self.stats['ok'] + self.stats['failed']
+            elapsed = time.time() - self.started
+            rate = done / elapsed * 60 if elapsed else 0
+            return done, elapsed, rate
+
+    def run(self):
+        logging.info(f"🚀 Локальный запуск: {self.total} продавцов, воркеров: {self.workers}")
+        self.started = time.time()
+        controller.slots = self.workers
+        supervisor.start_monitor()
+        profiler.install()
+
+        threads = [
+            threading.Thread(target=self.worker, name=f"worker_{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=self.report_interval / len(threads))
+            done, elapsed, rate = self.progress()
+            logging.info(f"📊 Прогресс: {done}/{self.total}, {rate:.1f} продавцов/мин, прошло {elapsed:.0f} сек")
+
+        # Дописываем результаты, оставшиеся в конвейере записи
+        pipeline.drain()
+        return self.report()
+
+    def report(self):
+        done, elapsed, rate = self.progress()
+        durations = sorted(self.durations)
+        avg = sum(durations) / len(durations) if durations else 0
+        p95 = durations[int(len(durations) * 0.95)] if durations else 0
+
+        logging.info("🎉 Локальный запуск завершён")
+        logging.info(f"   - Продавцов: {self.total}, успешно: {self.stats['ok']}, неудачно: {self.stats['failed']}")
+        logging.info(f"   - Повторов: {self.stats['retries']}")
+        logging.info(f"   - Время: {elapsed:.0f} сек, пропускная способность: {rate:.1f} продавцов/мин")
+        logging.info(f"   - Время на попытку: среднее {avg:.1f} сек, p95 {p95:.1f} сек")
+        return self.stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Локальный парсинг продавцов без RabbitMQ")
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--start', type=int, help="первый ID диапазона")
+    source.add_argument('--ids-file', help="файл с ID продавцов, по одному в строке")
+    arg_parser.add_argument('--end', type=int, help="последний ID диапазона (включительно)")
+    arg_parser.add_argument('--workers', type=int, default=2, help="число браузеров")
+    arg_parser.add_argument('--max-attempts', type=int, default=RETRY_MAX_ATTEMPTS)
+    arg_parser.add_argument('--pause', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                            help="пауза между продавцами воркера, сек (для бенчмарков - 0 0)")
+    arg_parser.add_argument('--profile', choices=sorted(PROFILES), help="профиль извлечения (по умолчанию EXTRACTION_PROFILE)")
+    arg_parser.add_argument('--archive-html', choices=('true', 'false'), help="сохранять HTML страниц")
+    args = arg_parser.parse_args()
+
+    if args.start is not None and args.end is None:
+        arg_parser.error("--start требует --end")
+    if args.pause:
+        ozon.SELLER_PAUSE = tuple(args.pause)
+    if args.profile or args.archive_html:
+        ozon.default_profile = get_extraction_profile(args.profile, args.archive_html)
+    # Повторы ведёт раннер: одна попытка на вызов, частичные данные - на последней
+    ozon.RETRY_MODE = 'queue'
+    ozon.RETRY_MAX_ATTEMPTS = args.max_attempts
+
+    runner = LocalRunner(read_seller_ids(args), args.workers, args.max_attempts)
+    stats = runner.run()
+    return 0 if stats['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+# Модель записи общая с парсером (records.py лежит в корне проекта)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from records import CSV_HEADERS
+
+MERGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "merge_csv.py")
+
+# Размер пулов заготовок: строки собираются из них без json.dumps на каждую строку
+POOL_SIZE = 500
+
+
+def random_digits(rng, length):
+    return str(rng.randint(10 ** (length - 1), 10 ** length - 1))
+
+
+def product_pool(rng, products_max):
+    """Заготовки колонки 'Товары' как у парсера: JSON с отступами, 0..products_max товаров"""
+    pool = []
+    for _ in range(POOL_SIZE):
+        products = []
+        for _ in range(rng.randint(0, products_max)):
+            price = rng.randint(99, 99999)
+            rating = round(rng.uniform(3.5, 5.0), 1)
+            reviews = rng.randint(0, 20000)
+            products.append({
+                'name': f"Товар {rng.randint(1, 10 ** 6)} " + "описание " * rng.randint(2, 8),
+                'price': f"{price:,} ₽".replace(',', ' '),
+                'link': f"https://www.ozon.ru/product/tovar-{rng.randint(10 ** 8, 10 ** 9)}/",
+                'image': f"https://ir.ozone.ru/s3/multimedia-{rng.randint(1, 9)}/wc250/{rng.randint(10 ** 9, 10 ** 10)}.jpg",
+                'rating': str(rating),
+                'reviews_count': f"{reviews} отзывов",
+                'price_value': float(price),
+                'rating_value': rating,
+                'reviews_value': reviews,
+            })
+        pool.append(json.dumps(products, ensure_ascii=False, indent=2))
+    return pool
+
+
+def legal_pool(rng):
+    """Заготовки юридических полей и метрик: полные, частичные и пустые"""
+    pool = []
+    for _ in range(POOL_SIZE):
+        years = rng.randint(1, 12)
+        reviews = rng.randint(0, 500000)
+        rating = round(rng.uniform(3.0, 5.0), 2)
+        pool.append({
+            'ОГРН': random_digits(rng, 13),
+            'ИНН': random_digits(rng, rng.choice((10, 12))),
+            'Название юр лица': f"ООО \"Компания {rng.randint(1, 10 ** 6)}\"",
+            'Кол-во отзывов': f"{reviews:,}".replace(',', ' '),
+            'рейтинг': str(rating).replace('.', ','),
+            'Срок регистрации': f"{years} лет",
+            'Отзывы_число': str(reviews),
+            'Рейтинг_число': str(rating),
+            'Срок_регистрации_мес': str(years * 12),
+        })
+    return pool
+
+
+def make_row(rng, seller_id, products, legal, full_rate, partial_rate):
+    """Строка продавца со смесью полноты: полная / без юрблока / только URL и название"""
+    row = dict.fromkeys(CSV_HEADERS, '')
+    row['URL'] = f"https://www.ozon.ru/seller/{seller_id}"
+    row['название'] = f"Магазин {seller_id}"
+    row['Html'] = f"/app/html/main_{seller_id}_{int(time.time())}.html"
+
+    kind = rng.random()
+    if kind < full_rate:
+        row.update(rng.choice(legal))
+        row['Товары'] = rng.choice(products)
+    elif kind < full_rate + partial_rate:
+        metrics = rng.choice(legal)
+        for column in ('Кол-во отзывов', 'рейтинг', 'Отзывы_число', 'Рейтинг_число'):
+            row[column] = metrics[column]
+        row['Товары'] = rng.choice(products)
+    else:
+        row['Товары'] = '[]'
+    return [row[column] for column in CSV_HEADERS]
+
+
+def generate_shards(data_dir, rows, shards, dup_rate, products_max, full_rate, partial_rate, seed):
+    """Шарды sellers_*.csv; доля dup_rate строк повторяет уже встречавшихся продавцов"""
+    rng = random.Random(seed)
+    products = product_pool(rng, products_max)
+    legal = legal_pool(rng)
+    unique_ids = max(1, int(rows * (1 - dup_rate)))
+    next_id = 0
+
+    per_shard = -(-rows // shards)
+    written = 0
+    for shard in range(shards):
+        path = os.path.join(data_dir, f"sellers_bench_{shard:04d}.csv")
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADERS)
+            for _ in range(min(per_shard, rows - written)):
+                # Дубликат - один из уже записанных продавцов, обычно с другой полнотой
+                if next_id >= unique_ids or (next_id and rng.random() < dup_rate):
+                    seller_id = rng.randrange(next_id)
+                else:
+                    seller_id = next_id
+                    next_id += 1
+                writer.writerow(make_row(rng, seller_id, products, legal, full_rate, partial_rate))
+                written += 1
+    return next_id
+
+
+def dir_size_mb(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file()) / 1024 / 1024
+
+
+def run_merge(data_dir):
+    """Запуск merge_csv.py отдельным процессом: время и пиковый RSS именно слияния"""
+    started = time.time()
+    process = subprocess.Popen(
+        [sys.executable, MERGE_SCRIPT, '--data-dir', data_dir],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.time() - started
+    # ru_maxrss в Linux - в КБ
+    return wall, usage.ru_maxrss / 1024, process.returncode, process.stderr.read().decode(errors='replace')
+
+
+def estimate_mb(rows, products_max):
+    """Грубая оценка объёма шардов: ~330 байт на товар в JSON с отступами"""
+    return rows * (300 + products_max / 2 * 330 * 0.85) / 1024 / 1024
+
+
+def bench(rows, args):
+    workdir = tempfile.mkdtemp(prefix="merge_bench_", dir=args.workdir)
+    try:
+        free_mb = shutil.disk_usage(workdir).free / 1024 / 1024
+        # Шарды и результат слияния примерно одного объёма
+        needed_mb = estimate_mb(rows, args.products_max) * 2.2
+        if needed_mb > free_mb:
+            print(f"⏭️ {rows} строк: нужно ~{needed_mb / 1024:.1f} ГБ диска, свободно {free_mb / 1024:.1f} ГБ")
+            return None
+
+        shards = args.shards or max(1, rows // args.rows_per_shard)
+        started = time.time()
+        sellers = generate_shards(workdir, rows, shards, args.dup_rate, args.products_max,
+                                  args.full_rate, args.partial_rate, args.seed)
+        generated = time.time() - started
+        input_mb = dir_size_mb(workdir)
+        print(f"🧪 {rows} строк, {shards} шардов, {sellers} продавцов, {input_mb:.0f} МБ (генерация {generated:.0f} сек)")
+
+        wall, peak_mb, code, errors = run_merge(workdir)
+        result = {
+            'rows': rows,
+            'shards': shards,
+            'sellers': sellers,
+            'input_mb': round(input_mb, 1),
+            'wall_sec': round(wall, 2),
+            'peak_rss_mb': round(peak_mb, 1),
+            'rows_per_sec': round(rows / wall) if wall else None,
+            'exit_code': code,
+            'fits_limit': code == 0 and peak_mb <= args.memory_limit_mb,
+        }
+        if code != 0:
+            # -9 - процесс убит (OOM)
+            print(f"❌ Слияние завершилось с кодом {code}: {errors.strip()[-500:]}")
+        print(f"   ⏱️ {wall:.1f} сек, пиковый RSS {peak_mb:.0f} МБ, {result['rows_per_sec']} строк/сек, "
+              f"{'в пределах' if result['fits_limit'] else 'ВЫШЕ'} лимита {args.memory_limit_mb} МБ")
+        return result
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк merge_csv.py на синтетических шардах")
+    arg_parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    arg_parser.add_argument('--shards', type=int, default=0, help="число шардов (по умолчанию rows / rows-per-shard)")
+    arg_parser.add_argument('--rows-per-shard', type=int, default=2000)
+    arg_parser.add_argument('--dup-rate', type=float, default=0.2, help="доля повторных строк продавцов")
+    arg_parser.add_argument('--full-rate', type=float, default=0.6, help="доля строк с юрданными и товарами")
+    arg_parser.add_argument('--partial-rate', type=float, default=0.25, help="доля строк с метриками без юрданных")
+    arg_parser.add_argument('--products-max', type=int, default=20, help="товаров в колонке 'Товары' (как у парсера)")
+    arg_parser.add_argument('--memory-limit-mb', type=int, default=500, help="лимит памяти merge-csv в compose")
+    arg_parser.add_argument('--workdir', default=None, help="каталог для шардов (по умолчанию системный tmp)")
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--keep', action='store_true', help="не удалять шарды и результат")
+    arg_parser.add_argument('--output', help="JSON с результатами")
+    args = arg_parser.parse_args()
+
+    results = [result for rows in args.rows if (result := bench(rows, args))]
+
+    print("\n📊 Итог:")
+    print(f"{'строк':>10} {'МБ':>8} {'сек':>8} {'RSS МБ':>8} {'строк/с':>9}  лимит")
+    for r in results:
+        print(f"{r['rows']:>10} {r['input_mb']:>8.0f} {r['wall_sec']:>8.1f} {r['peak_rss_mb']:>8.0f} "
+              f"{r['rows_per_sec'] or 0:>9}  {'ok' if r['fits_limit'] else 'превышен'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,39 @@ import pandas as pd
 import glob
 import os
 import sys
+import argparse
 from datetime import datetime
 
+# Модель записи общая с парсером (records.py лежит в корне проекта)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from records import CSV_HEADERS, COMPLETENESS_WEIGHTS, NON_SCORED_COLUMNS, parse_int, parse_number, parse_registration_months
+
+
+def normalize_columns(df):
+    """Числовые колонки из строковых: отзывы, рейтинг, срок регистрации в месяцах"""
+    sources = [
+        ('Отзывы_число', 'Кол-во отзывов', parse_int),
+        ('Рейтинг_число', 'рейтинг', parse_number),
+        ('Срок_регистрации_мес', 'Срок регистрации', parse_registration_months),
+    ]
+    for target, source, parse in sources:
+        if source not in df.columns:
+            continue
+        parsed = df[source].map(parse)
+        # Старые файлы без числовых колонок или с пустыми значениями
+        if target in df.columns:
+            existing = pd.to_numeric(df[target], errors='coerce')
+            df[target] = existing.fillna(pd.to_numeric(parsed, errors='coerce'))
+        else:
+            df[target] = pd.to_numeric(parsed, errors='coerce')
+    for column in ('Отзывы_число', 'Срок_регистрации_мес'):
+        if column in df.columns:
+            df[column] = df[column].astype('Int64')
+    return df
+
 
-def merge_csv_files():
+def merge_csv_files(data_dir="/app/data"):
     """Объединение всех CSV файлов в один с сохранением наиболее полных данных"""
-    data_dir = "/app/data"
     output_file = f"{data_dir}/combined_sellers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
     print("🔍 Поиск CSV файлов...")
@@ -25,7 +52,8 @@ def merge_csv_files():
     dataframes = []
     for file in csv_files:
         try:
-            df = pd.read_csv(file, encoding='utf-8-sig')
+            # Все колонки строками: ОГРН/ИНН не должны превращаться в float
+            df = pd.read_csv(file, encoding='utf-8-sig', dtype=str, keep_default_na=False)
             dataframes.append(df)
             print(f"✅ Загружен: {os.path.basename(file)} ({len(df)} строк)")
 
@@ -46,36 +74,19 @@ def merge_csv_files():
     print(f"📊 Всего записей до обработки: {before_dedup}")
     print(f"📋 Доступные колонки: {list(combined_df.columns)}")
 
-    # 🔥 ИСПРАВЛЕНИЕ: Используем правильные названия колонок из парсера
-    def get_data_completeness_score(row):
-        """Оцениваем полноту данных в строке"""
-        score = 0
-
-        # 🔥 ПРАВИЛЬНЫЕ НАЗВАНИЯ КОЛОНОК (из вашего парсера):
-        # 'URL', 'название', 'Html', 'ОГРН', 'ИНН', 'Название юр лица',
-        # 'Кол-во отзывов', 'рейтинг', 'Срок регистрации', 'Товары'
-
-        # Даем больший вес важным полям
-        if pd.notna(row.get('ОГРН')) and row.get('ОГРН') != '':
-            score += 10
-        if pd.notna(row.get('Название юр лица')) and row.get('Название юр лица') != '':
-            score += 8
-        if pd.notna(row.get('рейтинг')) and row.get('рейтинг') != '':
-            score += 5
-        if pd.notna(row.get('Кол-во отзывов')) and row.get('Кол-во отзывов') != '':
-            score += 5
-        if pd.notna(row.get('Срок регистрации')) and row.get('Срок регистрации') != '':
-            score += 5
-        if pd.notna(row.get('ИНН')) and row.get('ИНН') != '':
-            score += 7
-
-        # Учитываем количество заполненных полей
-        filled_fields = sum(1 for value in row.values if pd.notna(value) and value != '')
-        score += filled_fields
-        return score
+    # Нормализация: числовые колонки из строк "1 234", "4,8", "5 лет"
+    combined_df = normalize_columns(combined_df)
+
+    # Оценка полноты данных по маске заполненности (векторно, без построчного apply)
+    filled = combined_df.notna() & (combined_df != '')
+    filled = filled.drop(columns=[c for c in NON_SCORED_COLUMNS if c in filled.columns])
+    score = filled.sum(axis=1)
+    for column, weight in COMPLETENESS_WEIGHTS.items():
+        if column in filled.columns:
+            score += filled[column] * weight
 
     # Добавляем столбец с оценкой полноты данных
-    combined_df['_completeness_score'] = combined_df.apply(get_data_completeness_score, axis=1)
+    combined_df['_completeness_score'] = score
 
     # Сортируем по полноте данных (самые полные записи - первыми)
     combined_df = combined_df.sort_values('_completeness_score', ascending=False)
@@ -83,8 +94,10 @@ def merge_csv_files():
     # Удаляем дубликаты по URL, оставляя самые полные записи
     combined_df = combined_df.drop_duplicates(subset=['URL'], keep='first')
 
-    # Удаляем временный столбец
+    # Удаляем временный столбец, колонки в порядке парсера
     combined_df = combined_df.drop('_completeness_score', axis=1)
+    ordered = [c for c in CSV_HEADERS if c in combined_df.columns]
+    combined_df = combined_df[ordered + [c for c in combined_df.columns if c not in ordered]]
 
     after_dedup = len(combined_df)
 
@@ -158,5 +171,10 @@ def merge_csv_files():
         print(f"   Ошибка при выводе примера: {e}")
 
 
+    return output_file
+
+
 if __name__ == "__main__":
-    merge_csv_files()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Объединение CSV файлов парсера")
+    arg_parser.add_argument('--data-dir', default="/app/data")
+    merge_csv_files(arg_parser.parse_args().data_dir)
@@ -0,0 +1,85 @@
+import os
+import re
+import json
+import base64
+import logging
+
+# Запросы за данными виджетов страницы продавца и модалки "Магазин"
+API_URL_RE = re.compile(os.getenv('NETWORK_CAPTURE_URLS', r'/api/(?:entrypoint-api|composer-api)\.bx/'))
+
+# Буферы тел ответов в браузере (байт): ответы composer-api бывают по несколько МБ
+MAX_TOTAL_BUFFER = 64 * 1024 * 1024
+MAX_RESOURCE_BUFFER = 16 * 1024 * 1024
+
+
+def widget_states(payload):
+    """Состояния виджетов из ответа API: widgetStates -> разобранный JSON"""
+    states = {}
+    if not isinstance(payload, dict):
+        return states
+    for key, raw in (payload.get('widgetStates') or {}).items():
+        try:
+            states[key] = json.loads(raw) if isinstance(raw, str) else raw
+        except (TypeError, ValueError):
+            continue
+    return states
+
+
+class NetworkCapture:
+    """Тела JSON ответов API Ozon через CDP (журнал производительности + Network.getResponseBody)"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pending = {}  # requestId -> url ответа, тело которого ещё загружается
+
+    def start(self):
+        self.enable()
+        self.reset()
+
+    def enable(self):
+        """Сетевые события текущей вкладки (домен Network включается для каждой вкладки отдельно)"""
+        self.driver.execute_cdp_cmd('Network.enable', {
+            'maxTotalBufferSize': MAX_TOTAL_BUFFER,
+            'maxResourceBufferSize': MAX_RESOURCE_BUFFER,
+        })
+
+    def reset(self):
+        """Отбросить накопленные события (перед загрузкой новой страницы)"""
+        self.driver.get_log('performance')
+        self.pending.clear()
+
+    def read_body(self, request_id):
+        body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        text = body.get('body', '')
+        if body.get('base64Encoded'):
+            text = base64.b64decode(text).decode('utf-8')
+        return json.loads(text)
+
+    def collect(self):
+        """Состояния виджетов из ответов API, завершившихся с прошлого вызова"""
+        finished = []
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                if API_URL_RE.search(response.get('url', '')) and 'json' in response.get('mimeType', ''):
+                    self.pending[params.get('requestId')] = response.get('url')
+            elif method == 'Network.loadingFinished':
+                finished.append(params.get('requestId'))
+
+        states = {}
+        for request_id in finished:
+            url = self.pending.pop(request_id, None)
+            if url is None:
+                continue
+            try:
+                states.update(widget_states(self.read_body(request_id)))
+            except Exception as e:
+                logging.debug(f"⚠️ Не удалось прочитать ответ {url}: {e}")
+        return states
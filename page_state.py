@@ -0,0 +1,306 @@
+import re
+import json
+
+# Один вызов скрипта: все состояния виджетов (data-state) и гидрация Nuxt (если arguments[0])
+STATE_SCRIPT = """
+var states = {};
+document.querySelectorAll('[data-state]').forEach(function (el, i) {
+    // Виджеты прошлой страницы, оставшиеся после мягкого перехода, не читаем
+    if (el.closest('[data-soft-nav-stale]')) return;
+    states[el.id || ('state-' + i)] = el.getAttribute('data-state');
+});
+try {
+    // После мягкого перехода __NUXT__ хранит состояние продавца с последней полной загрузки
+    if (arguments[0] && window.__NUXT__ && window.__NUXT__.state) {
+        states['__NUXT__'] = JSON.stringify(window.__NUXT__.state);
+    }
+} catch (e) {}
+return states;
+"""
+
+# Ключевые слова названий метрик магазина -> поле записи
+METRIC_KEYWORDS = [
+    (['заказ', 'заказов'], 'Заказы'),
+    (['работает', 'ozon'], 'Срок_регистрации'),
+    (['оценк', 'рейтинг', 'средняя'], 'Рейтинг'),
+    (['отзыв', 'количество'], 'Отзывы'),
+]
+
+# Подписи метрик в виджетах магазина и модалки целиком (без двоеточия, регистр не важен) -> поле записи.
+# Состояния страницы сверяются только с ними: подстроки вроде "ozon" или "количество" есть в любом виджете
+METRIC_LABELS = [
+    (re.compile(r'(количество )?заказ(ов|ы)'), 'Заказы'),
+    (re.compile(r'(работает (с|на) ozon|на ozon|срок работы( на ozon)?)'), 'Срок_регистрации'),
+    (re.compile(r'(средняя оценка( товаров)?|рейтинг( магазина| продавца)?)'), 'Рейтинг'),
+    (re.compile(r'(количество )?отзыв(ов|ы)'), 'Отзывы'),
+]
+
+# Виджеты продавца, сведений о магазине и модалки "Магазин" - источники юрданных и метрик
+SELLER_WIDGET_MARKERS = ('seller', 'shop', 'modal', 'transparency', 'legal')
+
+# Допустимые значения: ОГРН (ОГРНИП - 15 цифр), ИНН, метрики - короткие и с цифрами
+FIELD_PATTERNS = {
+    'ОГРН': re.compile(r'\d{13}|\d{15}'),
+    'ИНН': re.compile(r'\d{10}|\d{12}'),
+}
+METRIC_FIELDS = ('Заказы', 'Срок_регистрации', 'Рейтинг', 'Отзывы')
+
+LEGAL_NUMBER_RE = re.compile(r'\b\d{10,13}\b')
+OGRN_HINT_RE = re.compile(r'\b\d{13}\b|ОГРН|ИНН', re.IGNORECASE)
+
+# Виджеты со списками товаров: в них артикулы и тексты карточек дают ложные совпадения
+PRODUCT_WIDGET_MARKERS = ('paginator', 'tilegrid', 'searchresults', 'skugrid')
+
+
+def metric_field(metric_name):
+    """Поле записи для названия метрики из модалки/состояния"""
+    name = metric_name.lower()
+    for words, field in METRIC_KEYWORDS:
+        if any(word in name for word in words):
+            return field
+    return None
+
+
+def metric_label_field(label):
+    """Поле записи для точной подписи метрики из состояния виджета; None - не подпись метрики"""
+    normalized = " ".join(label.lower().replace('ё', 'е').rstrip(':').split())
+    for pattern, field in METRIC_LABELS:
+        if pattern.fullmatch(normalized):
+            return field
+    return None
+
+
+def is_seller_widget(key):
+    lowered = str(key).lower()
+    return (any(marker in lowered for marker in SELLER_WIDGET_MARKERS)
+            and not any(marker in lowered for marker in PRODUCT_WIDGET_MARKERS))
+
+
+def validate_seller_info(data):
+    """Поля юрданных и метрик, прошедшие проверку формата; остальные отбрасываются"""
+    valid = {}
+    for field, value in data.items():
+        value = str(value).strip()
+        if not value:
+            continue
+        pattern = FIELD_PATTERNS.get(field)
+        if pattern is not None and not pattern.fullmatch(value):
+            continue
+        if field in METRIC_FIELDS and (len(value) > 40 or not any(c.isdigit() for c in value)):
+            continue
+        valid[field] = value
+    return valid
+
+
+def parse_legal_text(legal_text):
+    """Разбор юридического блока: название юрлица, ОГРН, ИНН"""
+    data = {}
+    if not legal_text:
+        return data
+
+    lines = legal_text.split('\n')
+
+    # Название юрлица (первая строка)
+    if lines:
+        data['Название_юр_лица'] = lines[0].strip()
+
+    # ОГРН (13 цифр)
+    ogrn_match = re.search(r'\b\d{13}\b', legal_text)
+    if ogrn_match:
+        data['ОГРН'] = ogrn_match.group()
+    else:
+        ogrn_alt = re.search(r'ОГРН\s*[:\-]?\s*(\d{13})', legal_text, re.IGNORECASE)
+        if ogrn_alt:
+            data['ОГРН'] = ogrn_alt.group(1)
+
+    # ИНН (10 или 12 цифр)
+    inn_match = re.search(r'\b\d{10,12}\b', legal_text)
+    if inn_match:
+        data['ИНН'] = inn_match.group()
+    else:
+        inn_alt = re.search(r'ИНН\s*[:\-]?\s*(\d{10,12})', legal_text, re.IGNORECASE)
+        if inn_alt:
+            data['ИНН'] = inn_alt.group(1)
+
+    # Авто-определение если не нашли по шаблонам
+    if not data.get('ОГРН') and not data.get('ИНН'):
+        numbers = re.findall(r'\b\d{10,13}\b', legal_text)
+        for num in numbers:
+            if len(num) == 13 and not data.get('ОГРН'):
+                data['ОГРН'] = num
+            elif len(num) in [10, 12] and not data.get('ИНН'):
+                data['ИНН'] = num
+
+    return data
+
+
+def collect_widget_states(driver, hydration=True):
+    """Состояния виджетов страницы одним вызовом: id -> разобранный JSON.
+
+    hydration=False - без __NUXT__ (страница открыта мягким переходом, гидрация от другого продавца).
+    """
+    raw_states = driver.execute_script(STATE_SCRIPT, hydration) or {}
+    states = {}
+    for key, raw in raw_states.items():
+        try:
+            states[key] = json.loads(raw) if isinstance(raw, str) else raw
+        except (TypeError, ValueError):
+            continue
+    return states
+
+
+def leaf_strings(container):
+    """Тексты контейнера: прямые строки и текстовые атомы вложенных объектов"""
+    values = container.values() if isinstance(container, dict) else container
+    strings = []
+    for value in values:
+        if isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, dict):
+            for key in ('text', 'title', 'content', 'value'):
+                if isinstance(value.get(key), str):
+                    strings.append(value[key])
+    # Отбрасываем ссылки, идентификаторы и служебные значения
+    return [s.strip() for s in strings if s.strip() and not s.startswith(('http', '/', '#'))]
+
+
+def iter_containers(node, depth=0):
+    """Обход всех dict/list в JSON-состоянии (строки внутри могут быть вложенным JSON)"""
+    if depth > 40:
+        return
+    if isinstance(node, str):
+        if node[:1] in '{[':
+            try:
+                yield from iter_containers(json.loads(node), depth + 1)
+            except ValueError:
+                pass
+        return
+    if isinstance(node, dict):
+        yield node
+        children = node.values()
+    elif isinstance(node, list):
+        yield node
+        children = node
+    else:
+        return
+    for child in children:
+        yield from iter_containers(child, depth + 1)
+
+
+def extract_seller_info(states, seller_only=True):
+    """Юридические данные и метрики магазина из состояний виджетов продавца/JSON ответов API.
+
+    Читаются только виджеты продавца, магазина и модалки (seller_only=False - все переданные,
+    например ответ API открытой модалки); результат проверен validate_seller_info.
+    """
+    data = {}
+    legal_text = ""
+
+    seller_states = [state for key, state in states.items() if not seller_only or is_seller_widget(key)]
+
+    for container in iter_containers(seller_states):
+        strings = leaf_strings(container)
+        if not strings:
+            continue
+
+        # Юридический блок: первый контейнер с ОГРН/ИНН рядом с текстом названия
+        if not legal_text:
+            joined = "\n".join(strings)
+            if OGRN_HINT_RE.search(joined) and LEGAL_NUMBER_RE.search(joined) and any(
+                    not LEGAL_NUMBER_RE.fullmatch(s) for s in strings):
+                legal_text = joined
+
+        # Строка метрики: точная подпись и следующее за ней значение с цифрами
+        for name, value in zip(strings, strings[1:]):
+            field = metric_label_field(name)
+            if field and not data.get(field) and len(value) <= 40 and any(c.isdigit() for c in value):
+                data[field] = value
+
+    if legal_text:
+        data.update(parse_legal_text(legal_text))
+
+    return validate_seller_info(data)
+
+
+RATING_RE = re.compile(r'\d[.,]\d')
+IMAGE_RE = re.compile(r'https?://\S+\.(?:jpe?g|png|webp)', re.IGNORECASE)
+
+# Ключи с названием магазина в виджетах продавца. Общие name/title не берём: ими подписаны
+# кнопки и разделы виджета; без этих ключей название читается из шапки страницы
+SHOP_NAME_KEYS = ('sellerName', 'shopName')
+
+
+def container_texts(node):
+    """Все текстовые атомы (поле text) внутри узла состояния"""
+    return [
+        c['text'].strip() for c in iter_containers(node)
+        if isinstance(c, dict) and isinstance(c.get('text'), str) and c['text'].strip()
+    ]
+
+
+def product_from_item(item, link):
+    """Поля товара из элемента списка виджета товаров"""
+    texts = container_texts(item.get('mainState', item))
+    price = next((t for t in texts if '₽' in t), '')
+    rating = next((t for t in texts if RATING_RE.fullmatch(t)), '')
+    reviews = next((t for t in texts if 'отзыв' in t.lower()), '')
+    names = [t for t in texts if t not in (price, rating, reviews) and not t[:1].isdigit()]
+
+    image = ''
+    for container in iter_containers(item):
+        values = container.values() if isinstance(container, dict) else container
+        image = next((v for v in values if isinstance(v, str) and IMAGE_RE.match(v)), '')
+        if image:
+            break
+
+    if link.startswith('/'):
+        link = f"https://www.ozon.ru{link}"
+    return {
+        'name': max(names, key=len, default=''),
+        'price': price,
+        'link': link,
+        'image': image,
+        'rating': rating,
+        'reviews_count': reviews,
+    }
+
+
+def extract_products(states, limit=20):
+    """Товары из состояний виджетов списков товаров (элементы items со ссылкой на товар)"""
+    products = []
+    seen = set()
+    for key, state in states.items():
+        if not any(marker in str(key).lower() for marker in PRODUCT_WIDGET_MARKERS):
+            continue
+        for container in iter_containers(state):
+            if not isinstance(container, dict) or not isinstance(container.get('items'), list):
+                continue
+            for item in container['items']:
+                if not isinstance(item, dict):
+                    continue
+                link = (item.get('action') or {}).get('link') or ''
+                if '/product/' not in link or link in seen:
+                    continue
+                seen.add(link)
+                product = product_from_item(item, link)
+                if product['name']:
+                    products.append(product)
+                if len(products) >= limit:
+                    return products
+    return products
+
+
+def extract_shop_name(states):
+    """Название магазина из виджетов продавца (seller/shop в ключе виджета)"""
+    for key, state in states.items():
+        lowered = str(key).lower()
+        if not ('seller' in lowered or 'shop' in lowered) or any(m in lowered for m in PRODUCT_WIDGET_MARKERS):
+            continue
+        for container in iter_containers(state):
+            if not isinstance(container, dict):
+                continue
+            for name_key in SHOP_NAME_KEYS:
+                value = container.get(name_key)
+                if isinstance(value, str) and len(value.strip()) > 2 and not value.startswith(('http', '/')):
+                    return value.strip()
+    return ''
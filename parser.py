@@ -1,4 +1,3 @@
-import csv
 import logging
 import random
 import time
@@ -7,12 +6,12 @@ import sys
 import tempfile
 import shutil
 import json
+import functools
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium_stealth import stealth
 from webdriver_manager.chrome import ChromeDriverManager
@@ -20,47 +19,215 @@ from webdriver_manager.core.os_manager import ChromeType
 import pika
 from concurrent.futures import ThreadPoolExecutor
 import threading
+from browser_supervisor import supervisor, PROFILE_PREFIX, PROXY_EXT_PREFIX
+from page_state import (collect_widget_states, extract_seller_info, extract_products, extract_shop_name,
+                        metric_field, parse_legal_text)
+from selector_registry import selector_registry, find_all
+from records import SellerRecord, ProductRecord
+from sinks import create_sink, ProductCsvSink
+from rabbit import RETRY_MAX_ATTEMPTS, schedule_retry
+from concurrency import controller
+from fingerprints import FingerprintStore, append_changes
+from launch_profiles import get_launch_profile, asset_cache, split_proxy
+from network_capture import NetworkCapture
+from profiling import profiler
+from pipeline import pipeline, write_text
+from deadline import Deadline, DeadlineExceeded, SELLER_BUDGET
+from sessions import session_pool, BrowserSession
+from discovery import seller_discovery
+from proxy_leases import proxy_leases
+from soft_navigation import SoftNavigator, SOFT_NAVIGATION, SOFT_NAVIGATION_TIMEOUT
+from prefetch import Prefetcher, Ticket, PREFETCH
+from legal_cache import legal_cache, METRIC_FIELDS
+from extraction_profiles import get_extraction_profile, parse_message
 
 # ПЕРЕМЕСТИТЕ ВСЕ ИНИЦИАЛИЗАЦИЮ ПОСЛЕ ИМПОРТОВ
-executor = ThreadPoolExecutor(max_workers=5)
-lock = threading.Lock()
-
-# Создаём папки в контейнере
-os.makedirs("/app/logs", exist_ok=True)
-os.makedirs("/app/data", exist_ok=True)
-os.makedirs("/app/screenshots", exist_ok=True)
-os.makedirs("/app/html", exist_ok=True)
+# Предзагрузка: на каждый слот ещё одно сообщение ждёт своей очереди и загружается во фоновой вкладке
+controller.lookahead = PREFETCH
+prefetcher = Prefetcher(lambda: controller.slots) if PREFETCH else None
+
+# Верхняя граница потоков; число одновременно обрабатываемых продавцов задаёт регулятор (prefetch)
+executor = ThreadPoolExecutor(max_workers=controller.prefetch_count(controller.max_slots), thread_name_prefix="worker")
+
+# Парсер (браузер) каждого потока-воркера живёт между продавцами
+worker_state = threading.local()
+# PREFETCH: браузеры потоков, которые сейчас ждут сообщения, а не обрабатывают его
+idle_parsers = []
+idle_parsers_lock = threading.Lock()
+
+# queue - неудачные продавцы уходят в очередь отложенных повторов, inline - повторы со sleep в потоке
+RETRY_MODE = os.getenv('RETRY_MODE', 'queue')
+
+# Отпечатки ведутся в режиме обновления (сохраняются только изменившиеся продавцы) или по FINGERPRINTS:
+# запись в общий fingerprints.db на каждого продавца не нужна обычному обходу
+REFRESH_MODE = os.getenv('REFRESH_MODE', 'false').lower() == 'true'
+FINGERPRINTS_ENABLED = REFRESH_MODE or os.getenv('FINGERPRINTS', 'false').lower() == 'true'
+fingerprint_store = FingerprintStore() if FINGERPRINTS_ENABLED else None
+changes_lock = threading.Lock()
+
+# Глубокий обход товаров: прокрутка пагинатора, товары пишутся в отдельный файл products_*.csv
+DEEP_PRODUCTS = os.getenv('DEEP_PRODUCTS', 'false').lower() == 'true'
+DEEP_PRODUCTS_MAX = int(os.getenv('DEEP_PRODUCTS_MAX', 5000))
+DEEP_PRODUCTS_MAX_SCROLLS = int(os.getenv('DEEP_PRODUCTS_MAX_SCROLLS', 300))
+# Окно последних позиций и ссылок для отсева повторов: больше числа карточек, которые пагинатор держит в DOM
+DEEP_PRODUCTS_SEEN_WINDOW = int(os.getenv('DEEP_PRODUCTS_SEEN_WINDOW', 500))
+
+# Пауза между продавцами одного воркера (сек)
+SELLER_PAUSE = tuple(float(x) for x in os.getenv('SELLER_PAUSE', '10,20').split(','))
+
+# Профиль запуска браузера: stealth-max (полный рендер) или lean
+launch_profile = get_launch_profile()
+
+# Перехват JSON ответов API Ozon через CDP: название, товары и юрданные - из данных виджетов, DOM - запасной путь
+NETWORK_CAPTURE = os.getenv('NETWORK_CAPTURE', 'false').lower() == 'true'
+
+# Повтор неудавшейся стадии на уже загруженной странице (без driver.get);
+# страница перезагружается, только если она испорчена (блокировка, уход со страницы продавца)
+STAGE_RETRIES = int(os.getenv('STAGE_RETRIES', 2))
+STAGE_RETRY_STAGES = tuple(s.strip() for s in os.getenv('STAGE_RETRY_STAGES', 'legal').split(',') if s.strip())
+
+# Стадии извлечения для логов и причины неполной записи
+STAGE_LABELS = {'shop_name': 'название', 'products': 'товары', 'legal': 'юрданные'}
+
+# Профиль извлечения задания (full / legal-only / products-only); сообщение может задать свой
+default_profile = get_extraction_profile()
+
+# Поля, при наличии которых в состоянии страницы модалка "Магазин" не открывается.
+# Метрики входят в список: без них модалка нужна, иначе рейтинг, отзывы и срок работы теряются
+LEGAL_STATE_REQUIRED_FIELDS = [
+    f.strip() for f in os.getenv(
+        'LEGAL_STATE_REQUIRED_FIELDS', 'Название_юр_лица,ОГРН,ИНН,Рейтинг,Отзывы,Срок_регистрации'
+    ).split(',') if f.strip()
+]
+
+# Создаём папки в контейнере; APP_DIR - корень для запуска вне контейнера (local_runner.py)
+APP_DIR = os.getenv('APP_DIR', '/app')
+os.makedirs(f"{APP_DIR}/logs", exist_ok=True)
+os.makedirs(f"{APP_DIR}/data", exist_ok=True)
+os.makedirs(f"{APP_DIR}/screenshots", exist_ok=True)
+os.makedirs(f"{APP_DIR}/html", exist_ok=True)
 
 # Настройка логирования ДО определения классов
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('/app/logs/parser.log', encoding='utf-8'),
+        logging.FileHandler(f'{APP_DIR}/logs/parser.log', encoding='utf-8'),
         logging.StreamHandler(sys.stdout)
     ]
 )
 
-def parse_task(seller_id: str):
-    parser = None
-    try:
+def remember_recent(recent, key, limit=DEEP_PRODUCTS_SEEN_WINDOW):
+    """Ключ - в окно последних (dict по порядку вставки); возвращает вытесненный ключ или None"""
+    recent[key] = None
+    if len(recent) > limit:
+        dropped = next(iter(recent))
+        del recent[dropped]
+        return dropped
+    return None
+
+
+class PageLost(Exception):
+    """Загруженная страница продавца непригодна для извлечения - нужна перезагрузка"""
+
+
+def get_worker_parser():
+    """Парсер текущего потока, создаётся при первом обращении"""
+    parser = getattr(worker_state, 'parser', None)
+    if parser is None:
         parser = OzonSellerParser()
-        result = parser.parse_seller(seller_id)
-        if result:
+        worker_state.parser = parser
+    return parser
+
+
+def lend_worker_parser():
+    """PREFETCH: браузер потока, освободившего слот, - в общий запас.
+
+    Потоков вдвое больше слотов (половина ждёт сообщения), браузеров - не больше слотов.
+    """
+    parser = getattr(worker_state, 'parser', None)
+    worker_state.parser = None
+    if parser:
+        with idle_parsers_lock:
+            idle_parsers.append(parser)
+
+
+def borrow_worker_parser():
+    """PREFETCH: потоку, занявшему слот, - браузер из запаса (если своего нет)"""
+    if getattr(worker_state, 'parser', None) is None:
+        with idle_parsers_lock:
+            if idle_parsers:
+                worker_state.parser = idle_parsers.pop()
+
+
+def release_worker_parser():
+    """Закрытие парсера текущего потока"""
+    parser = getattr(worker_state, 'parser', None)
+    worker_state.parser = None
+    if parser:
+        parser.close()
+
+
+def parse_task(seller_id: str, attempt: int = 1, on_done=None, profile=None) -> str:
+    """Обработка продавца воркером; возвращает статус извлечения.
+
+    on_done(status) вызывается, когда результат записан (или сразу, если записывать нечего):
+    по нему подтверждается сообщение. profile - профиль извлечения сообщения (по умолчанию - задания).
+    """
+    status = 'error'
+    started = time.time()
+    pending = None
+    try:
+        with profiler.stage('browser_start'):
+            parser = get_worker_parser()
+        with profiler.seller():
+            if RETRY_MODE == 'queue':
+                # Одна попытка без ожиданий; частичные данные пишем только на последней
+                pending = parser.parse_seller(seller_id, max_attempts=1,
+                                              save_partial=attempt >= RETRY_MAX_ATTEMPTS, profile=profile)
+            else:
+                pending = parser.parse_seller(seller_id, profile=profile)
+        status = parser.last_status
+        controller.record(status, time.time() - started)
+        if pending:
             logging.info(f"✅ Успешно обработан продавец {seller_id}")
         else:
             logging.warning(f"⚠️ Не удалось обработать продавца {seller_id}")
-        time.sleep(random.uniform(10, 20))
+
+        selector_registry.maybe_report()
+
+        # Перезапуск браузера по лимиту памяти или числу страниц
+        supervisor.note_page(parser.worker_name)
+        reason = supervisor.should_recycle(parser.worker_name)
+        if reason:
+            with profiler.stage('recycle'):
+                parser.recycle_driver(reason)
+
+        # Слотов стало меньше, чем запущенных браузеров - освобождаем память
+        if supervisor.browser_count() > controller.slots:
+            logging.info(f"🎚️ Закрываем браузер {parser.worker_name}: слотов {controller.slots}")
+            release_worker_parser()
+
+        time.sleep(random.uniform(*SELLER_PAUSE))
     except Exception as e:
         logging.error(f"❌ Критическая ошибка при обработке {seller_id}: {e}", exc_info=True)
-    finally:
-        if parser:
-            parser.close()
+        controller.record(status, time.time() - started)
+        # Состояние браузера неизвестно - закрываем, следующий продавец начнёт с чистого
+        release_worker_parser()
+
+    if on_done:
+        if pending is None:
+            on_done(status)
+        else:
+            # Неудачная запись - повод повторить продавца
+            pending.add_done_callback(lambda future: on_done(status if future.result() is not None else 'error'))
+    return status
 
 
 class OzonSellerParser:
     def __init__(self):
         self.instance_id = os.getenv('HOSTNAME', f"parser-{random.randint(1000, 9999)}")
+        self.worker_name = f"{self.instance_id}/{threading.current_thread().name}"
         self.request_count = 0
         self.driver = None
         self.wait = None
@@ -69,25 +236,45 @@ class OzonSellerParser:
         self.proxy_rotation_count = 0 #int(os.getenv('PROXY_ROTATION_COUNT', 3))
         self.proxy_timeout = int(os.getenv('PROXY_ROTATION_TIMEOUT', 30))
         self.screenshot_counter = 0  # Счетчик скриншотов
+        self.last_status = None  # Итог последнего parse_seller: ok / incomplete / blocked / error
+        self.network = None
+        self.navigator = None  # Мягкие переходы между продавцами (SOFT_NAVIGATION)
+        self.prefetch_tab = None  # (ID продавца, вкладка) предзагрузки следующего продавца
+        self.session = None  # Сессия (cookies, localStorage) из пула прокси
+        self.deadline = Deadline()  # Бюджет текущего продавца; вне parse_seller - без ограничения
+        self.api_states = {}  # Состояния виджетов из перехваченных ответов API текущей страницы
+        self.profile = default_profile  # Профиль извлечения текущего продавца
+        self.done_stages = set()  # Стадии текущего продавца, не требующие повтора после перезагрузки
 
         # Загружаем список прокси
         proxy_list_str = os.getenv('PROXY_LIST', '')
         if proxy_list_str:
             self.proxy_list = [p.strip() for p in proxy_list_str.split(',') if p.strip()]
+            # Ошибка формата - сразу при запуске, а не 407 и ротации на каждой странице
+            for proxy in self.proxy_list:
+                split_proxy(proxy)
+        # Прокси слота - аренда из общего для реплик реестра, а не общий для всех первый в списке
+        if self.proxy_list and proxy_leases:
+            self.current_proxy = proxy_leases.acquire(self.worker_name, self.proxy_list)
+            self.current_proxy_index = self.proxy_list.index(self.current_proxy)
 
         # Уникальная временная директория для Chrome
-        self.chrome_temp_dir = tempfile.mkdtemp()
+        self.chrome_temp_dir = tempfile.mkdtemp(prefix=PROFILE_PREFIX)
+        supervisor.claim_dir(self.chrome_temp_dir)
         logging.info(f"Инициализация парсера {self.instance_id}, профиль: {self.chrome_temp_dir}")
 
         try:
             self.setup_driver()
             self.wait = WebDriverWait(self.driver, 15)
 
-            # Инициализация CSV
-            self.data_dir = "/app/data"
+            # Инициализация приёмника результатов (CSV воркера или очередь seller_results)
+            self.data_dir = f"{APP_DIR}/data"
             os.makedirs(self.data_dir, exist_ok=True)
-            self.csv_file = f"{self.data_dir}/sellers_{self.instance_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            self.init_csv()
+            self.csv_file = (f"{self.data_dir}/sellers_{self.instance_id}_{threading.current_thread().name}_"
+                             f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+            self.sink = create_sink(self.csv_file)
+            if DEEP_PRODUCTS:
+                self.product_sink = ProductCsvSink(self.csv_file.replace('/sellers_', '/products_'))
         except Exception as e:
             logging.error(f"❌ Ошибка инициализации парсера: {e}", exc_info=True)
             self.close()
@@ -97,7 +284,7 @@ class OzonSellerParser:
         """Сохранение скриншота с автоматической нумерацией"""
         try:
             #self.screenshot_counter += 1
-            #screenshot_path = f"/app/screenshots/{self.instance_id}_{self.screenshot_counter:03d}_{prefix}_{int(time.time())}.png"
+            #screenshot_path = f"{APP_DIR}/screenshots/{self.instance_id}_{self.screenshot_counter:03d}_{prefix}_{int(time.time())}.png"
             #self.driver.save_screenshot(screenshot_path)
             #logging.info(f"📸 Сохранен скриншот: {screenshot_path}")
             return "" # screenshot_path
@@ -164,7 +351,7 @@ class OzonSellerParser:
             import zipfile
             import os
 
-            proxy_dir = tempfile.mkdtemp()
+            proxy_dir = tempfile.mkdtemp(prefix=PROXY_EXT_PREFIX)
 
             with open(os.path.join(proxy_dir, "manifest.json"), "w") as f:
                 f.write(manifest_json)
@@ -185,6 +372,19 @@ class OzonSellerParser:
             logging.error(f"❌ Ошибка создания расширения прокси: {e}")
             return None
 
+    def proxy_extension(self):
+        """Расширение авторизации для прокси с логином и паролем (--proxy-server их не принимает)"""
+        if not self.current_proxy:
+            return None
+        host, port, user, password = split_proxy(self.current_proxy)
+        if not user:
+            return None
+        extension = self.create_proxy_auth_extension(host, port, user, password or '')
+        if not extension:
+            # Без авторизации прокси ответит 407, что неотличимо от блокировки
+            raise RuntimeError(f"не удалось создать расширение авторизации прокси {host}:{port}")
+        return extension
+
     def rotate_proxy(self):
         """Ротация прокси и перезапуск драйвера"""
         if not self.proxy_list or len(self.proxy_list) <= 1:
@@ -192,27 +392,23 @@ class OzonSellerParser:
             return False
 
         try:
-            # Очищаем временные файлы расширений прокси
+            # Очищаем осиротевшие процессы и временные файлы расширений прокси
             try:
-                import glob
-                temp_dirs = glob.glob("/tmp/tmp*")
-                for temp_dir in temp_dirs:
-                    try:
-                        if os.path.exists(temp_dir) and "proxy_auth" in temp_dir:
-                            shutil.rmtree(temp_dir, ignore_errors=True)
-                            logging.debug(f"🧹 Очищена временная директория: {temp_dir}")
-                    except Exception as e:
-                        logging.debug(f"⚠️ Не удалось очистить {temp_dir}: {e}")
+                supervisor.cleanup_orphans()
             except Exception as e:
                 logging.warning(f"⚠️ Ошибка при очистке временных файлов: {e}")
 
-            # Переходим к следующему прокси по кругу
+            # Наименее загруженный прокси из реестра аренды, без него - следующий по кругу
             if not hasattr(self, 'current_proxy_index'):
                 self.current_proxy_index = 0
 
             old_proxy_index = self.current_proxy_index
-            self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxy_list)
-            new_proxy = self.proxy_list[self.current_proxy_index]
+            if proxy_leases:
+                new_proxy = proxy_leases.acquire(self.worker_name, self.proxy_list, exclude=self.current_proxy)
+                self.current_proxy_index = self.proxy_list.index(new_proxy)
+            else:
+                self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxy_list)
+                new_proxy = self.proxy_list[self.current_proxy_index]
 
             old_proxy = self.current_proxy
             self.current_proxy = new_proxy
@@ -222,12 +418,7 @@ class OzonSellerParser:
                 f"🔄 Ротируем прокси [{old_proxy_index + 1}→{self.current_proxy_index + 1}/{len(self.proxy_list)}]: {old_proxy} -> {new_proxy}")
 
             # Перезапускаем драйвер с новым прокси
-            if self.driver:
-                try:
-                    self.driver.quit()
-                    time.sleep(3)  # Увеличиваем задержку для полного закрытия
-                except Exception as e:
-                    logging.warning(f"⚠️ Ошибка при закрытии драйвера: {e}")
+            self.shutdown_driver()
 
             # Переинициализируем драйвер с новым прокси
             try:
@@ -248,8 +439,9 @@ class OzonSellerParser:
                 try:
                     self.current_proxy_index = old_proxy_index
                     self.current_proxy = old_proxy
-                    if self.driver:
-                        self.driver.quit()
+                    if proxy_leases and old_proxy:
+                        proxy_leases.acquire(self.worker_name, [old_proxy])
+                    self.shutdown_driver()
                     self.setup_driver()
                     self.wait = WebDriverWait(self.driver, 15)
                     logging.info("🔄 Возврат к предыдущему прокси")
@@ -261,8 +453,7 @@ class OzonSellerParser:
             logging.error(f"❌ Ошибка ротации прокси: {e}")
             # Пробуем восстановить работу с текущим прокси
             try:
-                if self.driver:
-                    self.driver.quit()
+                self.shutdown_driver()
                 self.setup_driver()
                 self.wait = WebDriverWait(self.driver, 15)
                 logging.info("🔄 Восстановление драйвера после ошибки ротации")
@@ -275,31 +466,12 @@ class OzonSellerParser:
         from webdriver_manager.chrome import ChromeDriverManager
         from webdriver_manager.core.os_manager import ChromeType
 
-        chrome_options = Options()
-
-        # Критические опции для Docker
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-setuid-sandbox")
-        chrome_options.add_argument("--window-size=1920,1080")
-
-        # Улучшенные stealth опции
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--disable-features=UserAgentClientHint")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-
-        # User-Agent
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        ]
-        chrome_options.add_argument(f"--user-agent={random.choice(user_agents)}")
-
-        # Уникальный профиль
-        chrome_options.add_argument(f"--user-data-dir={self.chrome_temp_dir}")
+        # Флаги, размер окна и стратегия загрузки - из профиля запуска; кэш ресурсов общий для контейнера
+        cache_dir = asset_cache.prepare(self.chrome_temp_dir)
+        chrome_options = launch_profile.build_options(
+            self.chrome_temp_dir, cache_dir, asset_cache.max_mb, performance_log=NETWORK_CAPTURE,
+            proxy=self.current_proxy, proxy_extension=self.proxy_extension()
+        )
 
         try:
             # АВТОМАТИЧЕСКАЯ УСТАНОВКА ChromeDriver
@@ -307,67 +479,88 @@ class OzonSellerParser:
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
 
             # Применяем stealth
-            stealth(
-                self.driver,
-                languages=["ru-RU", "ru", "en-US", "en"],
-                vendor="Google Inc.",
-                platform="Win32",
-                webgl_vendor="Intel Inc.",
-                renderer="Intel Iris OpenGL Engine",
-                fix_hairline=True,
-                run_on_insecure_origins=False
-            )
-            logging.info("✅ Драйвер успешно инициализирован")
+            self.apply_stealth()
+            if NETWORK_CAPTURE:
+                self.network = NetworkCapture(self.driver)
+                self.network.start()
+            if SOFT_NAVIGATION:
+                self.navigator = SoftNavigator()
+            if session_pool:
+                self.session = BrowserSession(session_pool, self.current_proxy, self.worker_name)
+                try:
+                    self.session.restore(self.driver)
+                except Exception as e:
+                    logging.warning(f"⚠️ Не удалось восстановить сессию: {e}")
+            supervisor.register(self.worker_name, self.driver, self.chrome_temp_dir)
+            logging.info(f"✅ Драйвер успешно инициализирован (профиль запуска {launch_profile.name})")
 
         except Exception as e:
             logging.error(f"❌ Ошибка создания драйвера: {e}", exc_info=True)
             raise
 
-    def init_csv(self):
-        """Инициализация CSV файла"""
-        headers = [
-            'URL', 'название', 'Html', 'ОГРН', 'ИНН', 'Название юр лица',
-            'Кол-во отзывов', 'рейтинг', 'Срок регистрации', 'Товары'
-        ]
-        try:
-            with open(self.csv_file, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-            logging.info(f"✅ Создан CSV файл: {self.csv_file}")
-        except Exception as e:
-            logging.error(f"❌ Ошибка создания CSV: {e}", exc_info=True)
+    def apply_stealth(self):
+        """Маскировка автоматизации для текущей вкладки"""
+        stealth(
+            self.driver,
+            languages=["ru-RU", "ru", "en-US", "en"],
+            vendor="Google Inc.",
+            platform="Win32",
+            webgl_vendor="Intel Inc.",
+            renderer="Intel Iris OpenGL Engine",
+            fix_hairline=True,
+            run_on_insecure_origins=False
+        )
 
     def save_to_csv(self, data):
-        """Сохранение данных в CSV"""
+        """Сохранение записи в приёмник результатов (SellerRecord или словарь парсера)"""
         try:
-            with open(self.csv_file, 'a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    data.get('URL', ''),
-                    data.get('Название', ''),
-                    data.get('Html_путь', ''),
-                    data.get('ОГРН', ''),
-                    data.get('ИНН', ''),
-                    data.get('Название_юр_лица', ''),
-                    data.get('Отзывы', ''),
-                    data.get('Рейтинг', ''),
-                    data.get('Срок_регистрации', ''),
-                    data.get('Товары_JSON', '')
-                ])
-                f.flush()
-                os.fsync(f.fileno())
-            logging.info(f"✅ Данные сохранены в CSV")
-            return True
+            record = data if isinstance(data, SellerRecord) else SellerRecord.from_dict(data)
+            return self.sink.write(record)
         except Exception as e:
             logging.error(f"❌ Ошибка сохранения в CSV: {e}", exc_info=True)
             return False
 
+    def record_changes(self, seller_id, record, fields=None):
+        """Сверка с отпечатком прошлого обхода; изменения пишутся в журнал. True - есть изменения"""
+        try:
+            changed = fingerprint_store.update(seller_id, record, fields)
+        except Exception as e:
+            logging.warning(f"⚠️ Ошибка проверки отпечатка {seller_id}: {e}")
+            return True
+
+        if changed and REFRESH_MODE:
+            logging.info(f"🔀 Изменились поля продавца {seller_id}: {', '.join(sorted(changed))}")
+            with changes_lock:
+                append_changes(f"{self.data_dir}/changes_{self.instance_id}.jsonl", seller_id, record, changed)
+        return bool(changed)
+
+    def build_record(self, seller_id, seller_data, fingerprint=True, fields=None):
+        """Этап сериализации: запись продавца и сверка отпечатка (полей fields); дальше - задача записи"""
+        with profiler.stage('serialize'):
+            products = seller_data.get('Товары_JSON')
+            if isinstance(products, list):
+                seller_data['Товары_JSON'] = json.dumps(products, ensure_ascii=False, indent=2)
+            record = SellerRecord.from_dict(seller_data)
+            if fingerprint and FINGERPRINTS_ENABLED and not self.record_changes(seller_id, record, fields) and REFRESH_MODE:
+                logging.info(f"💤 Продавец {seller_id} не изменился, запись пропущена")
+                return record
+        return functools.partial(self.store_record, seller_id, record)
+
+    def store_record(self, seller_id, record):
+        """Этап записи: запись в приёмник; None - запись не удалась"""
+        with profiler.stage('save'):
+            if self.save_to_csv(record):
+                logging.info(f"💾 Данные продавца {seller_id} сохранены")
+                return record
+        logging.error(f"❌ Ошибка сохранения данных для {seller_id}")
+        return None
+
     def save_html_page(self, seller_id, prefix=""):
         """Сохранение HTML страницы"""
         try:
-            html_path = f"/app/html/{prefix}{seller_id}_{int(time.time())}.html"
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(self.driver.page_source)
+            html_path = f"{APP_DIR}/html/{prefix}{seller_id}_{int(time.time())}.html"
+            # page_source читается в потоке браузера, запись файла - в конвейере
+            pipeline.submit_write(functools.partial(write_text, html_path, self.driver.page_source))
             return html_path
         except Exception as e:
             logging.warning(f"⚠️ Не удалось сохранить HTML: {e}")
@@ -380,10 +573,12 @@ class OzonSellerParser:
 
             # Ждем появления пагинатора с товарами продавца
             try:
-                WebDriverWait(self.driver, 10).until(
+                WebDriverWait(self.driver, self.deadline.timeout(10, "товары")).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-widget='infiniteVirtualPaginator']"))
                 )
                 logging.info("✅ Найден пагинатор с товарами продавца")
+            except DeadlineExceeded:
+                raise
             except:
                 logging.warning("⚠️ Не найден пагинатор с товарами продавца, возвращаем пустой список")
                 return []
@@ -410,183 +605,7 @@ class OzonSellerParser:
 
                 for card in visible_cards:
                     try:
-                        product_data = {}
-
-                        # 1. НАЗВАНИЕ ТОВАРА
-                        try:
-                            # Ищем название в основном месте
-                            name_selectors = [
-                                ".bq03_0_2-a span.tsBody500Medium",
-                                "a[href*='/product/'] .bq03_0_2-a span",
-                                ".tsBody500Medium",
-                                "span[class*='tsBody500']"
-                            ]
-
-                            for name_selector in name_selectors:
-                                try:
-                                    name_elem = card.find_element(By.CSS_SELECTOR, name_selector)
-                                    name_text = name_elem.text.strip()
-                                    if name_text and len(name_text) > 5:
-                                        product_data['name'] = name_text
-                                        break
-                                except:
-                                    continue
-
-                            if not product_data.get('name'):
-                                product_data['name'] = ''
-
-                        except Exception as e:
-                            logging.debug(f"⚠️ Ошибка поиска названия: {e}")
-                            product_data['name'] = ''
-
-                        # 2. ЦЕНА ТОВАРА
-                        try:
-                            # Основные селекторы цены
-                            price_selectors = [
-                                ".c35_3_8-a1.tsHeadline500Medium",
-                                "span[class*='tsHeadline500Medium']",
-                                ".c35_3_8-a0 span",
-                                "//span[contains(text(), '₽')]"
-                            ]
-
-                            for price_selector in price_selectors:
-                                try:
-                                    if price_selector.startswith("//"):
-                                        price_elems = card.find_elements(By.XPATH, price_selector)
-                                    else:
-                                        price_elems = card.find_elements(By.CSS_SELECTOR, price_selector)
-
-                                    for elem in price_elems:
-                                        text = elem.text.strip()
-                                        if '₽' in text or (any(char.isdigit() for char in text) and len(text) <= 20):
-                                            product_data['price'] = text
-                                            break
-                                    if product_data.get('price'):
-                                        break
-                                except:
-                                    continue
-
-                            if not product_data.get('price'):
-                                product_data['price'] = ''
-
-                        except Exception as e:
-                            logging.debug(f"⚠️ Ошибка поиска цены: {e}")
-                            product_data['price'] = ''
-
-                        # 3. ССЫЛКА НА ТОВАР
-                        try:
-                            link_selectors = [
-                                "a[href*='/product/']",
-                                ".tile-clickable-element[href*='/product/']"
-                            ]
-
-                            for link_selector in link_selectors:
-                                try:
-                                    link_elem = card.find_element(By.CSS_SELECTOR, link_selector)
-                                    href = link_elem.get_attribute('href')
-                                    if href and '/product/' in href:
-                                        product_data['link'] = href if href.startswith(
-                                            'http') else f"https://www.ozon.ru{href}"
-                                        break
-                                except:
-                                    continue
-
-                            if not product_data.get('link'):
-                                product_data['link'] = ''
-
-                        except Exception as e:
-                            logging.debug(f"⚠️ Ошибка поиска ссылки: {e}")
-                            product_data['link'] = ''
-
-                        # 4. ФОТО ТОВАРА
-                        try:
-                            img_selectors = [
-                                "img.i4s_24.b95_3_3-a",
-                                "img[loading='eager']",
-                                "img[src*='ozon.ru']",
-                                "img.b95_3_3-a"
-                            ]
-
-                            for img_selector in img_selectors:
-                                try:
-                                    img_elem = card.find_element(By.CSS_SELECTOR, img_selector)
-                                    img_src = img_elem.get_attribute('src')
-                                    if img_src and 'ozon.ru' in img_src:
-                                        product_data['image'] = img_src
-                                        break
-                                except:
-                                    continue
-
-                            if not product_data.get('image'):
-                                product_data['image'] = ''
-
-                        except Exception as e:
-                            logging.debug(f"⚠️ Ошибка поиска фото: {e}")
-                            product_data['image'] = ''
-
-                        # 5. РЕЙТИНГ ТОВАРА
-                        try:
-                            rating_selectors = [
-                                ".p6b3_0_2-a4 span[style*='color:var(--textPremium)']",
-                                "span[style*='color:var(--textPremium)']",
-                                "//span[contains(@style, 'textPremium')]"
-                            ]
-
-                            for rating_selector in rating_selectors:
-                                try:
-                                    if rating_selector.startswith("//"):
-                                        rating_elems = card.find_elements(By.XPATH, rating_selector)
-                                    else:
-                                        rating_elems = card.find_elements(By.CSS_SELECTOR, rating_selector)
-
-                                    for elem in rating_elems:
-                                        text = elem.text.strip()
-                                        if text and ('.' in text or text.replace('.', '').isdigit()):
-                                            product_data['rating'] = text
-                                            break
-                                    if product_data.get('rating'):
-                                        break
-                                except:
-                                    continue
-
-                            if not product_data.get('rating'):
-                                product_data['rating'] = ''
-
-                        except Exception as e:
-                            logging.debug(f"⚠️ Ошибка поиска рейтинга: {e}")
-                            product_data['rating'] = ''
-
-                        # 6. КОЛИЧЕСТВО ОТЗЫВОВ
-                        try:
-                            reviews_selectors = [
-                                ".p6b3_0_2-a4 span[style*='color:var(--textSecondary)']",
-                                "span[style*='color:var(--textSecondary)']",
-                                "//span[contains(text(), 'отзыв')]"
-                            ]
-
-                            for reviews_selector in reviews_selectors:
-                                try:
-                                    if reviews_selector.startswith("//"):
-                                        reviews_elems = card.find_elements(By.XPATH, reviews_selector)
-                                    else:
-                                        reviews_elems = card.find_elements(By.CSS_SELECTOR, reviews_selector)
-
-                                    for elem in reviews_elems:
-                                        text = elem.text.strip()
-                                        if 'отзыв' in text.lower():
-                                            product_data['reviews_count'] = text
-                                            break
-                                    if product_data.get('reviews_count'):
-                                        break
-                                except:
-                                    continue
-
-                            if not product_data.get('reviews_count'):
-                                product_data['reviews_count'] = ''
-
-                        except Exception as e:
-                            logging.debug(f"⚠️ Ошибка поиска отзывов: {e}")
-                            product_data['reviews_count'] = ''
+                        product_data = self.parse_product_card(card)
 
                         # Добавляем товар только если есть название
                         if product_data.get('name'):
@@ -608,6 +627,244 @@ class OzonSellerParser:
             logging.error(f"❌ Общая ошибка при парсинге товаров продавца: {str(e)}")
             return []
 
+    def parse_product_card(self, card):
+        """Извлечение полей товара из карточки пагинатора"""
+        product_data = {}
+
+        # 1. НАЗВАНИЕ ТОВАРА
+        try:
+            # Ищем название в основном месте
+            tried = []
+            for name_selector in selector_registry.ordered('product_name'):
+                tried.append(name_selector)
+                try:
+                    name_elem = find_all(card, name_selector)[0]
+                    name_text = name_elem.text.strip()
+                    if name_text and len(name_text) > 5:
+                        product_data['name'] = name_text
+                        break
+                except:
+                    continue
+            selector_registry.record('product_name', tried, bool(product_data.get('name')))
+
+            if not product_data.get('name'):
+                product_data['name'] = ''
+
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка поиска названия: {e}")
+            product_data['name'] = ''
+
+        # 2. ЦЕНА ТОВАРА
+        try:
+            # Основные селекторы цены
+            tried = []
+            for price_selector in selector_registry.ordered('product_price'):
+                tried.append(price_selector)
+                try:
+                    price_elems = find_all(card, price_selector)
+
+                    for elem in price_elems:
+                        text = elem.text.strip()
+                        if '₽' in text or (any(char.isdigit() for char in text) and len(text) <= 20):
+                            product_data['price'] = text
+                            break
+                    if product_data.get('price'):
+                        break
+                except:
+                    continue
+            selector_registry.record('product_price', tried, bool(product_data.get('price')))
+
+            if not product_data.get('price'):
+                product_data['price'] = ''
+
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка поиска цены: {e}")
+            product_data['price'] = ''
+
+        # 3. ССЫЛКА НА ТОВАР
+        try:
+            tried = []
+            for link_selector in selector_registry.ordered('product_link'):
+                tried.append(link_selector)
+                try:
+                    link_elem = find_all(card, link_selector)[0]
+                    href = link_elem.get_attribute('href')
+                    if href and '/product/' in href:
+                        product_data['link'] = href if href.startswith(
+                            'http') else f"https://www.ozon.ru{href}"
+                        break
+                except:
+                    continue
+            selector_registry.record('product_link', tried, bool(product_data.get('link')))
+
+            if not product_data.get('link'):
+                product_data['link'] = ''
+
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка поиска ссылки: {e}")
+            product_data['link'] = ''
+
+        # 4. ФОТО ТОВАРА
+        try:
+            tried = []
+            for img_selector in selector_registry.ordered('product_image'):
+                tried.append(img_selector)
+                try:
+                    img_elem = find_all(card, img_selector)[0]
+                    img_src = img_elem.get_attribute('src')
+                    if img_src and 'ozon.ru' in img_src:
+                        product_data['image'] = img_src
+                        break
+                except:
+                    continue
+            selector_registry.record('product_image', tried, bool(product_data.get('image')))
+
+            if not product_data.get('image'):
+                product_data['image'] = ''
+
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка поиска фото: {e}")
+            product_data['image'] = ''
+
+        # 5. РЕЙТИНГ ТОВАРА
+        try:
+            tried = []
+            for rating_selector in selector_registry.ordered('product_rating'):
+                tried.append(rating_selector)
+                try:
+                    rating_elems = find_all(card, rating_selector)
+
+                    for elem in rating_elems:
+                        text = elem.text.strip()
+                        if text and ('.' in text or text.replace('.', '').isdigit()):
+                            product_data['rating'] = text
+                            break
+                    if product_data.get('rating'):
+                        break
+                except:
+                    continue
+            selector_registry.record('product_rating', tried, bool(product_data.get('rating')))
+
+            if not product_data.get('rating'):
+                product_data['rating'] = ''
+
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка поиска рейтинга: {e}")
+            product_data['rating'] = ''
+
+        # 6. КОЛИЧЕСТВО ОТЗЫВОВ
+        try:
+            tried = []
+            for reviews_selector in selector_registry.ordered('product_reviews'):
+                tried.append(reviews_selector)
+                try:
+                    reviews_elems = find_all(card, reviews_selector)
+
+                    for elem in reviews_elems:
+                        text = elem.text.strip()
+                        if 'отзыв' in text.lower():
+                            product_data['reviews_count'] = text
+                            break
+                    if product_data.get('reviews_count'):
+                        break
+                except:
+                    continue
+            selector_registry.record('product_reviews', tried, bool(product_data.get('reviews_count')))
+
+            if not product_data.get('reviews_count'):
+                product_data['reviews_count'] = ''
+
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка поиска отзывов: {e}")
+            product_data['reviews_count'] = ''
+
+        return product_data
+
+    def iter_product_batches(self, max_products=None, max_scrolls=None):
+        """Глубокий обход виртуального пагинатора: пачки новых товаров по мере прокрутки"""
+        max_products = max_products or DEEP_PRODUCTS_MAX
+        max_scrolls = max_scrolls or DEEP_PRODUCTS_MAX_SCROLLS
+
+        try:
+            WebDriverWait(self.driver, self.deadline.timeout(10, "товары")).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-widget='infiniteVirtualPaginator']"))
+            )
+        except DeadlineExceeded:
+            raise
+        except:
+            logging.warning("⚠️ Не найден пагинатор с товарами продавца")
+            return
+
+        # Только окно последних позиций и хэшей ссылок: позиции ниже окна пагинатор уже не отрисует
+        seen_indexes = {}
+        seen_links = {}
+        floor = -1  # позиции не выше floor вышли из окна и считаются обработанными
+        total = 0
+        idle_scrolls = 0
+
+        for scroll in range(max_scrolls):
+            # Бюджет исчерпан - отдаём уже собранное, прокрутку прекращаем
+            if self.deadline.expired():
+                logging.warning(f"⏱️ Глубокий обход прерван по бюджету после {scroll} прокруток")
+                break
+            paginator = self.driver.find_element(By.CSS_SELECTOR, "div[data-widget='infiniteVirtualPaginator']")
+            cards = paginator.find_elements(By.CSS_SELECTOR, "div.tile-root[data-index]")
+
+            batch = []
+            last_card = None
+            for card in cards:
+                try:
+                    index = int(card.get_attribute('data-index'))
+                    last_card = card
+                    if index <= floor or index in seen_indexes:
+                        continue
+                    dropped = remember_recent(seen_indexes, index)
+                    if dropped is not None:
+                        floor = max(floor, dropped)
+
+                    product_data = self.parse_product_card(card)
+                    if not product_data.get('name'):
+                        continue
+                    link_key = hash(product_data.get('link') or product_data['name'])
+                    if link_key in seen_links:
+                        continue
+                    remember_recent(seen_links, link_key)
+                    batch.append(product_data)
+                except Exception as e:
+                    logging.debug(f"⚠️ Ошибка парсинга карточки товара продавца: {e}")
+
+            if batch:
+                batch = batch[:max_products - total]
+                total += len(batch)
+                idle_scrolls = 0
+                yield batch
+            else:
+                idle_scrolls += 1
+
+            if total >= max_products:
+                logging.info(f"🛑 Достигнут лимит товаров: {max_products}")
+                break
+            if idle_scrolls >= 3:
+                logging.info(f"✅ Пагинатор исчерпан после {scroll + 1} прокруток")
+                break
+
+            # Прокрутка к последней карточке подгружает следующую страницу
+            try:
+                if last_card is not None:
+                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'end'});", last_card)
+                else:
+                    self.driver.execute_script("window.scrollBy(0, window.innerHeight);")
+            except Exception:
+                self.driver.execute_script("window.scrollBy(0, window.innerHeight);")
+            try:
+                self.deadline.sleep(random.uniform(0.8, 1.6), "товары")
+            except DeadlineExceeded:
+                # Собранные пачки уже отданы - прокрутку прекращаем, как при проверке в начале цикла
+                logging.warning(f"⏱️ Глубокий обход прерван по бюджету после {scroll + 1} прокруток")
+                break
+
+        logging.info(f"📦 Глубокий обход: собрано товаров {total}")
+
     def click_shop_button(self) -> bool:
         """Клик по кнопке 'Магазин' на главной странице - УПРОЩЕННАЯ ВЕРСИЯ"""
         try:
@@ -615,32 +872,29 @@ class OzonSellerParser:
             #self.take_screenshot("before_shop_button")
 
             # Основные селекторы для кнопки "Магазин"
-            shop_selectors = [
-                "//div[@title='Магазин']",
-                "//div[contains(@class, 'b5_4_7-b0') and contains(text(), 'Магазин')]",
-                "//div[contains(text(), 'Магазин') and contains(@class, 'b5_4_7')]",
-            ]
-
-            for selector in shop_selectors:
+            tried = []
+            for selector in selector_registry.ordered('shop_button'):
+                tried.append(selector)
                 try:
-                    elements = self.driver.find_elements(By.XPATH, selector)
+                    elements = find_all(self.driver, selector)
                     logging.info(f"🔍 Поиск по '{selector}': найдено {len(elements)}")
 
                     for el in elements:
                         if el.is_displayed() and el.is_enabled():
                             logging.info(f"🎯 Нашли кнопку: {selector}")
+                            selector_registry.record('shop_button', tried, True)
 
                             # Прокручиваем и кликаем
                             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", el)
-                            time.sleep(1)
+                            self.deadline.sleep(1, "юрданные")
 
                             try:
                                 el.click()
-                            except:
+                            except Exception:
                                 self.driver.execute_script("arguments[0].click();", el)
 
                             # Ждем открытия модалки
-                            time.sleep(3)
+                            self.deadline.sleep(3, "юрданные")
                             #self.take_screenshot("after_shop_click")
 
                             # Проверяем, открылась ли модалка
@@ -655,6 +909,7 @@ class OzonSellerParser:
                     logging.debug(f"⚠️ Ошибка с селектором {selector}: {e}")
                     continue
 
+            selector_registry.record('shop_button', tried, False)
             logging.warning("❌ Не удалось найти кнопку 'Магазин'")
             return False
 
@@ -698,10 +953,12 @@ class OzonSellerParser:
 
             # Ждем загрузки модального окна
             try:
-                WebDriverWait(self.driver, 10).until(
+                WebDriverWait(self.driver, self.deadline.timeout(10, "юрданные")).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-widget='modalLayout']"))
                 )
                 logging.info("✅ Модальное окно загружено")
+            except DeadlineExceeded:
+                raise
             except:
                 logging.warning("⚠️ Не удалось дождаться загрузки модального окна")
                 return data
@@ -756,14 +1013,9 @@ class OzonSellerParser:
                     logging.info(f"📊 Метрика: '{metric_name}' = '{final_value}'")
 
                     # Сопоставляем с нашими полями
-                    if any(word in metric_name.lower() for word in ['заказ', 'заказов']):
-                        data['Заказы'] = final_value
-                    elif any(word in metric_name.lower() for word in ['работает', 'ozon']):
-                        data['Срок_регистрации'] = final_value
-                    elif any(word in metric_name.lower() for word in ['оценк', 'рейтинг', 'средняя']):
-                        data['Рейтинг'] = final_value
-                    elif any(word in metric_name.lower() for word in ['отзыв', 'количество']):
-                        data['Отзывы'] = final_value
+                    field = metric_field(metric_name)
+                    if field:
+                        data[field] = final_value
 
                 except Exception as e:
                     logging.debug(f"⚠️ Ошибка парсинга строки метрики: {e}")
@@ -780,19 +1032,12 @@ class OzonSellerParser:
 
         try:
             # Ищем блок с юридической информацией
-            legal_selectors = [
-                "div[data-widget='textBlock'] .tsBody400Small",
-                ".d0q_11 .tsBody400Small",
-                "//span[@class='tsBody400Small']"
-            ]
-
             legal_text = ""
-            for selector in legal_selectors:
+            tried = []
+            for selector in selector_registry.ordered('legal_text'):
+                tried.append(selector)
                 try:
-                    if selector.startswith("//"):
-                        elements = self.driver.find_elements(By.XPATH, selector)
-                    else:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                    elements = find_all(self.driver, selector)
 
                     for element in elements:
                         if element.is_displayed():
@@ -808,46 +1053,12 @@ class OzonSellerParser:
                 except Exception as e:
                     logging.debug(f"⚠️ Ошибка с селектором {selector}: {e}")
                     continue
+            selector_registry.record('legal_text', tried, bool(legal_text))
 
             # Парсим юридическую информацию
             if legal_text:
-                lines = legal_text.split('\n')
-
-                # Название юрлица (первая строка)
-                if lines:
-                    data['Название_юр_лица'] = lines[0].strip()
-                    logging.info(f"✅ Название юрлица: {data['Название_юр_лица']}")
-
-                # Ищем ОГРН и ИНН
-                import re
-
-                # ОГРН (13 цифр)
-                ogrn_match = re.search(r'\b\d{13}\b', legal_text)
-                if ogrn_match:
-                    data['ОГРН'] = ogrn_match.group()
-                else:
-                    ogrn_alt = re.search(r'ОГРН\s*[:\-]?\s*(\d{13})', legal_text, re.IGNORECASE)
-                    if ogrn_alt:
-                        data['ОГРН'] = ogrn_alt.group(1)
-
-                # ИНН (10 или 12 цифр)
-                inn_match = re.search(r'\b\d{10,12}\b', legal_text)
-                if inn_match:
-                    data['ИНН'] = inn_match.group()
-                else:
-                    inn_alt = re.search(r'ИНН\s*[:\-]?\s*(\d{10,12})', legal_text, re.IGNORECASE)
-                    if inn_alt:
-                        data['ИНН'] = inn_alt.group(1)
-
-                # Авто-определение если не нашли по шаблонам
-                if not data.get('ОГРН') and not data.get('ИНН'):
-                    numbers = re.findall(r'\b\d{10,13}\b', legal_text)
-                    for num in numbers:
-                        if len(num) == 13 and not data.get('ОГРН'):
-                            data['ОГРН'] = num
-                        elif len(num) in [10, 12] and not data.get('ИНН'):
-                            data['ИНН'] = num
-
+                data.update(parse_legal_text(legal_text))
+                logging.info(f"✅ Название юрлица: {data.get('Название_юр_лица')}")
                 logging.info(f"✅ Юридические данные: ОГРН={data.get('ОГРН')}, ИНН={data.get('ИНН')}")
 
         except Exception as e:
@@ -862,38 +1073,32 @@ class OzonSellerParser:
             #self.take_screenshot("before_modal_close")
 
             # Основные селекторы для закрытия
-            close_selectors = [
-                "//button[contains(., 'Понятно')]",
-                "button[data-widget='modalClose']",
-                ".b65_4_11-b1",  # Крестик
-                "//button[contains(@class, 'b25_5_1-a0')]"
-            ]
-
-            for selector in close_selectors:
+            tried = []
+            for selector in selector_registry.ordered('modal_close'):
+                tried.append(selector)
                 try:
-                    if selector.startswith("//"):
-                        elements = self.driver.find_elements(By.XPATH, selector)
-                    else:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                    elements = find_all(self.driver, selector)
 
                     for btn in elements:
                         if btn.is_displayed() and btn.is_enabled():
+                            selector_registry.record('modal_close', tried, True)
                             self.driver.execute_script("arguments[0].click();", btn)
-                            time.sleep(2)
+                            self.deadline.sleep(2, "закрытие модалки")
                             #self.take_screenshot("after_modal_close")
                             logging.info("✅ Модальное окно закрыто")
                             return True
-                except:
+                except Exception:
                     continue
+            selector_registry.record('modal_close', tried, False)
 
             # Альтернатива: клик по overlay
             try:
                 overlay = self.driver.find_element(By.CSS_SELECTOR, ".b65_4_11-a0")
                 self.driver.execute_script("arguments[0].click();", overlay)
-                time.sleep(1)
+                self.deadline.sleep(1, "закрытие модалки")
                 logging.info("✅ Модальное окно закрыто через overlay")
                 return True
-            except:
+            except Exception:
                 pass
 
             logging.warning("⚠️ Не удалось закрыть модальное окно")
@@ -910,24 +1115,12 @@ class OzonSellerParser:
 
             # ПОИСК НАЗВАНИЯ МАГАЗИНА
             try:
-                main_page_name_selectors = [
-                    "h1.seller-name",
-                    ".seller-title",
-                    "[data-widget='webSellerName']",
-                    "//h1[contains(@class, 'seller')]",
-                    "//div[contains(@class, 'seller-header')]//h1",
-                    "//span[contains(@class, 'tsHeadline600Large')]",
-                    ".bq03_0_2-a.bq03_0_2-a4.bq03_0_2-a5.h5n_19 span.tsHeadline600Large",
-                    "//div[contains(@class, 'h5n_19')]//span"
-                ]
-
                 shop_name_found = False
-                for selector in main_page_name_selectors:
+                tried = []
+                for selector in selector_registry.ordered('shop_name'):
+                    tried.append(selector)
                     try:
-                        if selector.startswith("//"):
-                            elements = self.driver.find_elements(By.XPATH, selector)
-                        else:
-                            elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                        elements = find_all(self.driver, selector)
 
                         for element in elements:
                             if element.is_displayed() and element.text.strip():
@@ -943,6 +1136,7 @@ class OzonSellerParser:
 
                     except Exception as e:
                         continue
+                selector_registry.record('shop_name', tried, shop_name_found)
 
                 if not shop_name_found:
                     logging.warning("⚠️ Не удалось извлечь название магазина с главной страницы")
@@ -958,114 +1152,369 @@ class OzonSellerParser:
             logging.error(f"❌ Ошибка извлечения информации о магазине: {e}")
             return {'Название': ''}
 
-    def parse_seller(self, seller_id):
-        """Парсинг данных продавца - УЛУЧШЕННАЯ ВЕРСИЯ"""
+    def parse_seller(self, seller_id, max_attempts=3, save_partial=True, profile=None):
+        """Парсинг данных продавца; возвращает Future записи (SellerRecord или None) либо None"""
         url = f"https://www.ozon.ru/seller/{seller_id}"
         seller_data = {'URL': url}
         html_paths = []
-        max_attempts = 3
         attempt = 1
+        self.last_status = 'error'
+        self.deadline = Deadline(SELLER_BUDGET)
+        self.profile = profile or default_profile
+        self.done_stages = set()
+        if self.profile is not default_profile:
+            logging.info(f"🧩 Профиль извлечения {seller_id}: {self.profile.name}")
+        if seller_discovery:
+            seller_discovery.mark_seen(seller_id)
 
-        while attempt <= max_attempts:
-            try:
-                logging.info(f"🚀 Попытка {attempt}/{max_attempts} для продавца {seller_id}")
-                #self.take_screenshot(f"start_attempt_{attempt}")
-
-                # Загрузка страницы
-                if not self.load_seller_page(url, attempt):
-                    if self.retry_after_blocking(seller_id, attempt, max_attempts):
-                        attempt += 1
-                        continue
-                    else:
-                        break
-
-                # Основной парсинг
-                parsing_success = self.parse_seller_data(seller_id, seller_data, html_paths)
+        try:
+            while attempt <= max_attempts:
+                try:
+                    logging.info(f"🚀 Попытка {attempt}/{max_attempts} для продавца {seller_id}")
+                    #self.take_screenshot(f"start_attempt_{attempt}")
+
+                    # Загрузка страницы
+                    with profiler.stage('load'):
+                        loaded = self.load_seller_page(url, attempt)
+                    if not loaded:
+                        self.last_status = 'blocked'
+                        if self.retry_after_blocking(seller_id, attempt, max_attempts):
+                            attempt += 1
+                            continue
+                        else:
+                            break
 
-                if parsing_success:
-                    # Сохраняем результаты
-                    seller_data['Html_путь'] = "; ".join(html_paths)
-                    if self.save_to_csv(seller_data):
-                        logging.info(f"✅ Успешно обработан продавец {seller_id}")
-                        return seller_data
+                    # Следующий продавец грузится во фоновой вкладке, пока извлекается и записывается этот
+                    self.start_prefetch()
+
+                    # Основной парсинг
+                    with profiler.stage('extract'):
+                        parsing_success = self.parse_seller_data(seller_id, seller_data, html_paths)
+
+                    if parsing_success:
+                        # Сериализация и запись - в конвейере, браузер свободен для следующего продавца
+                        seller_data['Html_путь'] = "; ".join(html_paths)
+                        self.last_status = 'ok'
+                        logging.info(f"✅ Данные продавца {seller_id} извлечены")
+                        self.finish_products(keep=True)
+                        return pipeline.submit(functools.partial(self.build_record, seller_id, seller_data,
+                                                                 fields=self.profile.fingerprint_fields))
                     else:
-                        logging.error(f"❌ Ошибка сохранения данных для {seller_id}")
-                        return None
-                else:
-                    logging.warning(f"⚠️ Неполные данные для {seller_id}, попытка {attempt}")
-
-                # Если дошли сюда, пробуем снова
-                if attempt < max_attempts:
-                    if self.retry_after_error(seller_id, attempt):
-                        attempt += 1
-                        continue
+                        self.last_status = 'incomplete'
+                        logging.warning(f"⚠️ Неполные данные для {seller_id}, попытка {attempt}")
+
+                    # Если дошли сюда, пробуем снова
+                    if attempt < max_attempts:
+                        if self.retry_after_error(seller_id, attempt):
+                            attempt += 1
+                            continue
+                        else:
+                            break
                     else:
+                        logging.error(f"❌ Все попытки провалились для {seller_id}")
                         break
-                else:
-                    logging.error(f"❌ Все попытки провалились для {seller_id}")
-                    break
 
-            except Exception as e:
-                logging.error(f"❌ Критическая ошибка на попытке {attempt}: {e}")
-                if not self.handle_critical_error(seller_id, attempt, max_attempts):
-                    break
-                attempt += 1
+                except Exception as e:
+                    self.last_status = 'error'
+                    logging.error(f"❌ Критическая ошибка на попытке {attempt}: {e}")
+                    if not self.handle_critical_error(seller_id, attempt, max_attempts):
+                        break
+                    attempt += 1
+        except DeadlineExceeded as e:
+            # Бюджет исчерпан: остаток работы отменён, сохраняем собранное с причиной
+            self.last_status = 'timeout'
+            seller_data['Причина'] = f"исчерпан бюджет {SELLER_BUDGET:.0f} сек: {e}"
+            logging.warning(f"⏱️ Продавец {seller_id}: исчерпан бюджет времени ({e})")
+        finally:
+            self.deadline = Deadline()
+
+        # Продавец уйдёт на повтор через очередь (в том числе по исчерпанному бюджету) - частичную запись не пишем
+        if not save_partial:
+            logging.info(f"⏭️ Частичные данные {seller_id} не сохраняем: будет повтор через очередь")
+            self.finish_products(keep=False)
+            return None
 
         # Сохраняем то, что удалось собрать
-        return self.finalize_parsing(seller_data, html_paths)
+        self.finish_products(keep=True)
+        return self.finalize_parsing(seller_data, html_paths, seller_id)
+
+    def finish_products(self, keep):
+        """Товары глубокого обхода - в файл товаров (успех или последняя попытка) или в корзину"""
+        if not DEEP_PRODUCTS:
+            return
+        try:
+            if keep:
+                self.product_sink.commit()
+            else:
+                self.product_sink.discard()
+        except Exception as e:
+            logging.error(f"❌ Ошибка записи файла товаров: {e}")
 
     def load_seller_page(self, url, attempt):
         """Загрузка страницы продавца"""
         try:
-            self.driver.set_page_load_timeout(30)
-            time.sleep(random.uniform(2, 4))
+            self.driver.set_page_load_timeout(self.deadline.timeout(30, "загрузка страницы"))
+            prefetched = self.take_prefetched_tab(url)
+            if not prefetched:
+                self.deadline.sleep(random.uniform(2, 4))
 
             logging.info(f"🌐 Загружаем страницу: {url}")
-            self.driver.get(url)
+            self.api_states = {}
+            if self.network:
+                self.network.reset()
+            # Предзагруженная вкладка; тёплая страница - переход через роутер приложения,
+            # иначе (или при неудаче) - полная загрузка
+            soft = not prefetched and self.navigator and self.navigator.navigate(
+                self.driver, url, self.deadline.timeout(SOFT_NAVIGATION_TIMEOUT, "загрузка страницы")
+            )
+            if prefetched:
+                self.wait_prefetched_load()
+            elif not soft:
+                self.driver.get(url)
 
             # Проверка блокировки
             if self.check_and_handle_blocking():
                 logging.warning(f"🛑 Обнаружена блокировка на попытке {attempt}")
+                # Сессия с блокировкой не возвращается в пул
+                if self.session:
+                    self.session.invalidate()
+                if self.navigator:
+                    self.navigator.invalidate()
                 return False
-
-            time.sleep(random.uniform(2, 4))
-            self.random_mouse_movements()
+            if self.session:
+                self.session.note_page()
+            if self.navigator and not soft:
+                self.navigator.warm()
+
+            # Дорисовка и прокрутка нужны пагинатору товаров; юрданные берутся из состояния страницы
+            if self.profile.runs('products'):
+                self.deadline.sleep(random.uniform(2, 4))
+                self.random_mouse_movements()
+            self.capture_api_states()
             return True
 
         except Exception as e:
             logging.error(f"❌ Ошибка загрузки страницы: {e}")
+            if self.navigator:
+                self.navigator.invalidate()
+            # Таймаут загрузки, обрезанный бюджетом, - отмена, а не блокировка
+            self.deadline.check("загрузка страницы")
             return False
 
+    def start_prefetch(self):
+        """Следующее ждущее сообщение процесса - этому воркеру, его страница - во фоновую вкладку"""
+        if not prefetcher or self.prefetch_tab or getattr(worker_state, 'next_ticket', None):
+            return
+        ticket = prefetcher.claim(self.worker_name)
+        if ticket is None:
+            return
+        # Сообщение обработает этот воркер следующим, даже если вкладку открыть не удастся
+        worker_state.next_ticket = ticket
+
+        current = self.driver.current_window_handle
+        handle = None
+        try:
+            self.driver.switch_to.new_window('tab')
+            handle = self.driver.current_window_handle
+            self.apply_stealth()
+            # Состояние CDP - у каждой вкладки своё: перехват сети и восстановление сессии включаем заново
+            if self.network:
+                self.network.enable()
+            if self.session:
+                self.session.prepare_tab(self.driver)
+            # Page.navigate возвращает управление после начала загрузки, не дожидаясь её окончания
+            self.driver.execute_cdp_cmd('Page.navigate', {'url': f"https://www.ozon.ru/seller/{ticket.seller_id}"})
+            self.prefetch_tab = (ticket.seller_id, handle)
+            logging.info(f"🔮 Предзагрузка продавца {ticket.seller_id} во фоновой вкладке")
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось начать предзагрузку {ticket.seller_id}: {e}")
+            if handle and handle != current:
+                try:
+                    self.driver.close()
+                except Exception:
+                    pass
+        finally:
+            self.driver.switch_to.window(current)
+
+    def take_prefetched_tab(self, url):
+        """Переход на вкладку с предзагруженной страницей продавца; прежняя вкладка закрывается"""
+        if not self.prefetch_tab:
+            return False
+        seller_id, handle = self.prefetch_tab
+        if not url.rstrip('/').endswith(f"/seller/{seller_id}"):
+            # Повтор текущего продавца: вкладка следующего остаётся, пока его сообщение можно подтвердить
+            ticket = getattr(worker_state, 'next_ticket', None)
+            if ticket is None or not ticket.valid():
+                self.discard_prefetch()
+            return False
+        self.prefetch_tab = None
+        try:
+            self.driver.close()
+            self.driver.switch_to.window(handle)
+            logging.info(f"🔮 Продавец {seller_id}: переключение на предзагруженную вкладку")
+            return True
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось переключиться на предзагруженную вкладку: {e}")
+            self.driver.switch_to.window(self.driver.window_handles[0])
+            return False
+
+    def wait_prefetched_load(self):
+        """Ожидание загрузки предзагруженной вкладки, как у driver.get при стратегии профиля запуска"""
+        ready = ('complete',) if launch_profile.page_load_strategy == 'normal' else ('interactive', 'complete')
+        WebDriverWait(self.driver, self.deadline.timeout(30, "загрузка страницы"), poll_frequency=0.2).until(
+            lambda d: d.execute_script("return document.readyState") in ready
+        )
+
+    def discard_prefetch(self):
+        """Закрытие вкладки предзагрузки, которая не понадобится"""
+        if not self.prefetch_tab:
+            return
+        seller_id, handle = self.prefetch_tab
+        self.prefetch_tab = None
+        if not self.driver:
+            return
+        current = self.driver.current_window_handle
+        try:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+            logging.info(f"🔮 Предзагрузка продавца {seller_id} отменена")
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось закрыть вкладку предзагрузки: {e}")
+        finally:
+            self.driver.switch_to.window(current)
+
+    def capture_api_states(self):
+        """Новые ответы API с прошлого вызова - в состояния текущей страницы"""
+        if not self.network:
+            return {}
+        try:
+            states = self.network.collect()
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось прочитать сетевые события: {e}")
+            return {}
+        if states:
+            self.api_states.update(states)
+            logging.info(f"📡 Перехвачено состояний виджетов из API: {len(states)}")
+        return states
+
+    def structured_states(self):
+        """Состояния виджетов страницы (data-state) вместе с перехваченными ответами API"""
+        try:
+            # Гидрация Nuxt после мягкого перехода - от прежнего продавца
+            states = collect_widget_states(self.driver, hydration=not (self.navigator and self.navigator.moved))
+        except Exception as e:
+            logging.debug(f"⚠️ Не удалось прочитать состояние страницы: {e}")
+            states = {}
+        states.update(self.api_states)
+        return states
+
     def parse_seller_data(self, seller_id, seller_data, html_paths):
-        """Основной парсинг данных продавца"""
+        """Основной парсинг данных продавца; стадии, успешные на прошлой загрузке страницы, пропускаются"""
         try:
             # Сохраняем основную HTML страницу
-            main_html_path = self.save_html_page(seller_id, "main_")
-            html_paths.append(main_html_path)
+            if self.profile.archive_html and 'html' not in self.done_stages:
+                with profiler.stage('html'):
+                    main_html_path = self.save_html_page(seller_id, "main_")
+                html_paths.append(main_html_path)
+                self.done_stages.add('html')
             #self.take_screenshot("page_loaded")
 
+            # Продавцы, упомянутые на странице, - в очередь (режим DISCOVERY)
+            if seller_discovery and 'discovery' not in self.done_stages:
+                self.discover_sellers(seller_id)
+                self.done_stages.add('discovery')
+
             # 1. Название магазина
-            if not self.parse_shop_name(seller_data):
-                logging.warning("⚠️ Не удалось извлечь название магазина")
+            if self.profile.runs('shop_name'):
+                if not self.run_stage('shop_name', self.parse_shop_name, seller_data):
+                    logging.warning("⚠️ Не удалось извлечь название магазина")
 
             # 2. Товары на главной странице
-            if not self.parse_products(seller_data):
-                logging.warning("⚠️ Не удалось извлечь товары")
+            if self.profile.runs('products'):
+                if not self.run_stage('products', self.parse_products, seller_data, seller_id):
+                    logging.warning("⚠️ Не удалось извлечь товары")
 
             # 3. Юридическая информация из модального окна
-            if not self.parse_legal_info(seller_id, seller_data, html_paths):
-                logging.warning("⚠️ Не удалось извлечь юридическую информацию")
+            if self.profile.runs('legal'):
+                if not self.run_stage('legal', self.parse_legal_info, seller_id, seller_data, html_paths):
+                    logging.warning("⚠️ Не удалось извлечь юридическую информацию")
 
-            logging.info(f"✅ Основные данные извлечены для {seller_id}")
+            logging.info(f"✅ Данные ({self.profile.name}) извлечены для {seller_id}")
             return True
 
+        except PageLost as e:
+            logging.warning(f"🔄 Страница продавца {seller_id} непригодна ({e}), извлечённые поля сохранены")
+            return False
         except Exception as e:
             logging.error(f"❌ Ошибка парсинга данных: {e}")
             return False
 
+    def run_stage(self, stage, func, *args):
+        """Стадия извлечения с повтором на той же странице; True - данные получены.
+
+        Неудачная стадия из STAGE_RETRY_STAGES повторяется без перезагрузки, пока страница цела;
+        PageLost - страница испорчена и поможет только перезагрузка.
+        """
+        if stage in self.done_stages:
+            logging.info(f"⏭️ Стадия {STAGE_LABELS[stage]} выполнена на прошлой загрузке")
+            return True
+
+        retries = STAGE_RETRIES if stage in STAGE_RETRY_STAGES else 0
+        for retry in range(retries + 1):
+            if retry:
+                self.check_page(stage)
+                logging.info(f"🔂 Повтор стадии {STAGE_LABELS[stage]} на загруженной странице ({retry}/{retries})")
+                self.reset_page_state()
+                self.deadline.sleep(random.uniform(1, 3), STAGE_LABELS[stage])
+
+            self.deadline.check(STAGE_LABELS[stage])
+            with profiler.stage(stage):
+                try:
+                    found = func(*args)
+                except Exception as e:
+                    logging.warning(f"⚠️ Ошибка стадии {STAGE_LABELS[stage]}: {e}")
+                    found = False
+            if found:
+                self.done_stages.add(stage)
+                return True
+
+        # Данных нет - различаем их отсутствие на странице и испорченную страницу
+        self.check_page(stage)
+        return False
+
+    def check_page(self, stage):
+        """PageLost, если страница продавца больше непригодна для извлечения"""
+        if self.check_and_handle_blocking():
+            if self.session:
+                self.session.invalidate()
+            raise PageLost(f"блокировка на стадии {STAGE_LABELS[stage]}")
+        if '/seller/' not in (self.driver.current_url or ''):
+            raise PageLost(f"уход со страницы продавца на стадии {STAGE_LABELS[stage]}: {self.driver.current_url}")
+
+    def reset_page_state(self):
+        """Перед повтором стадии: закрыть оставшуюся открытой модалку"""
+        try:
+            if self.check_modal_opened():
+                self.close_modal()
+        except Exception as e:
+            logging.debug(f"⚠️ Ошибка подготовки повтора стадии: {e}")
+
+    def discover_sellers(self, seller_id):
+        try:
+            seller_discovery.harvest(self.driver, seller_id)
+        except Exception as e:
+            logging.warning(f"⚠️ Ошибка сбора ссылок на продавцов: {e}")
+
     def parse_shop_name(self, seller_data):
         """Парсинг названия магазина"""
         try:
+            if NETWORK_CAPTURE:
+                name = extract_shop_name(self.structured_states())
+                if name:
+                    seller_data['Название'] = name
+                    logging.info(f"✅ Название магазина (из данных виджетов): {name}")
+                    return True
+
             shop_name_data = self.extract_shop_info()
             seller_data.update(shop_name_data)
 
@@ -1082,12 +1531,20 @@ class OzonSellerParser:
             seller_data['Название'] = ''
             return False
 
-    def parse_products(self, seller_data):
+    def parse_products(self, seller_data, seller_id=None):
         """Парсинг товаров"""
+        if DEEP_PRODUCTS and seller_id is not None:
+            return self.parse_products_deep(seller_id, seller_data)
         try:
-            products = self.extract_products_from_main_page()
+            raw_products = extract_products(self.structured_states()) if NETWORK_CAPTURE else []
+            if raw_products:
+                logging.info("📡 Товары получены из данных виджетов")
+            else:
+                raw_products = self.extract_products_from_main_page()
+            products = [ProductRecord.from_dict(p).to_dict() for p in raw_products]
             seller_data['Кол-во_товаров_на_странице'] = len(products)
-            seller_data['Товары_JSON'] = json.dumps(products, ensure_ascii=False, indent=2)
+            # JSON кодируется на этапе сериализации
+            seller_data['Товары_JSON'] = products
 
             logging.info(f"✅ Спарсено товаров: {len(products)}")
             return len(products) > 0
@@ -1098,23 +1555,76 @@ class OzonSellerParser:
             seller_data['Товары_JSON'] = '[]'
             return False
 
+    def extract_legal_info_from_state(self):
+        """Юридические данные и метрики из встроенного состояния страницы без открытия модалки"""
+        try:
+            states = self.structured_states()
+            data = extract_seller_info(states)
+            logging.info(f"🧬 Из состояния страницы ({len(states)} виджетов) извлечено полей: {len(data)}")
+            return data
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось прочитать состояние страницы: {e}")
+            return {}
+
+    def parse_products_deep(self, seller_id, seller_data):
+        """Потоковая запись всех товаров продавца в отдельный файл; в записи продавца - первые 20"""
+        preview = []
+        total = 0
+        self.product_sink.begin()
+        try:
+            for batch in self.iter_product_batches():
+                products = [ProductRecord.from_dict(p) for p in batch]
+                self.product_sink.write_batch(seller_id, products)
+                total += len(products)
+                if len(preview) < 20:
+                    preview.extend(p.to_dict() for p in products[:20 - len(preview)])
+        except Exception as e:
+            logging.error(f"❌ Ошибка глубокого парсинга товаров: {e}")
+
+        seller_data['Кол-во_товаров_на_странице'] = total
+        seller_data['Товары_JSON'] = json.dumps(preview, ensure_ascii=False, indent=2)
+        logging.info(f"✅ Спарсено товаров (глубокий обход): {total}")
+        return total > 0
+
     def parse_legal_info(self, seller_id, seller_data, html_paths):
         """Парсинг юридической информации"""
         try:
+            # Быстрый путь: данные из состояния страницы, модалка - только запасной вариант
+            # В запись - только полный набор обязательных полей; неполный не смешивается с данными модалки
+            state_info = self.extract_legal_info_from_state()
+            if all(state_info.get(field) for field in LEGAL_STATE_REQUIRED_FIELDS):
+                seller_data.update(state_info)
+                logging.info("✅ Юридические данные получены из состояния страницы, модалка не нужна")
+                self.store_legal_cache(seller_id, seller_data)
+                return True
+
+            # Юрданные и метрики из кэша прошлых обходов, пока не истёк их срок
+            if self.fill_from_legal_cache(seller_id, seller_data, state_info):
+                return True
+
             if not self.click_shop_button():
                 logging.warning("⚠️ Не удалось открыть модалку")
                 return False
 
             # Сохраняем HTML модального окна
-            shop_html_path = self.save_html_page(seller_id, "shop_")
-            html_paths.append(shop_html_path)
-
-            # Извлекаем данные из модалки
-            legal_info = self.extract_legal_info_from_modal()
-            seller_data.update(legal_info)
+            if self.profile.archive_html:
+                shop_html_path = self.save_html_page(seller_id, "shop_")
+                html_paths.append(shop_html_path)
+
+            # Модалка подгружает данные через API - при перехвате обходимся без разбора DOM
+            modal_states = self.capture_api_states()
+            modal_info = extract_seller_info(modal_states, seller_only=False) if modal_states else {}
+            if all(modal_info.get(field) for field in LEGAL_STATE_REQUIRED_FIELDS):
+                logging.info("📡 Юридические данные получены из ответа API модалки")
+                seller_data.update(modal_info)
+            else:
+                # Извлекаем данные из модалки
+                legal_info = self.extract_legal_info_from_modal()
+                seller_data.update(legal_info)
 
             # Закрываем модалку
             self.close_modal()
+            self.store_legal_cache(seller_id, seller_data)
 
             # Проверяем, что получили хоть какие-то данные
             legal_fields = ['ОГРН', 'ИНН', 'Название_юр_лица', 'Отзывы', 'Рейтинг', 'Срок_регистрации']
@@ -1127,12 +1637,46 @@ class OzonSellerParser:
             logging.error(f"❌ Ошибка работы с модальным окном: {e}")
             return False
 
+    def fill_from_legal_cache(self, seller_id, seller_data, state_info):
+        """Недостающие юрданные и метрики из кэша; True - модалка не нужна"""
+        if not legal_cache:
+            return False
+        # После мягкого перехода признаки устаревания со страницы ненадёжны - сверяем по модалке
+        if self.navigator and self.navigator.moved:
+            return False
+        try:
+            legal, metrics = legal_cache.lookup(seller_id, {**state_info, 'Название': seller_data.get('Название')})
+        except Exception as e:
+            logging.warning(f"⚠️ Ошибка чтения кэша юрданных {seller_id}: {e}")
+            return False
+        if legal is None:
+            return False
+        # Метрики со страницы свежее кэша; без них и без годных метрик в кэше модалку открываем
+        if metrics is None and not any(state_info.get(field) for field in METRIC_FIELDS):
+            logging.info(f"🗂️ Юрданные {seller_id} в кэше годны, метрики устарели - открываем модалку")
+            return False
+
+        # Проверенные поля со страницы свежее кэша
+        page_fields = {field: state_info[field] for field in METRIC_FIELDS if state_info.get(field)}
+        for field, value in {**(metrics or {}), **page_fields, **legal}.items():
+            if not seller_data.get(field):
+                seller_data[field] = value
+        logging.info(f"🗂️ Юридические данные {seller_id} взяты из кэша, модалка не нужна")
+        return True
+
+    def store_legal_cache(self, seller_id, seller_data):
+        if legal_cache:
+            try:
+                legal_cache.store(seller_id, seller_data)
+            except Exception as e:
+                logging.warning(f"⚠️ Ошибка записи кэша юрданных {seller_id}: {e}")
+
     def retry_after_blocking(self, seller_id, attempt, max_attempts):
         """Обработка блокировки и повторная попытка"""
         if attempt < max_attempts:
             delay = random.uniform(20, 40)
             logging.info(f"⏳ Задержка {delay:.1f} сек перед повторной попыткой")
-            time.sleep(delay)
+            self.deadline.sleep(delay, "повтор после блокировки")
             return True
         else:
             logging.error(f"❌ Все {max_attempts} попыток заблокированы для {seller_id}")
@@ -1142,7 +1686,7 @@ class OzonSellerParser:
         """Повторная попытка после ошибки"""
         delay = random.uniform(10, 20)
         logging.info(f"⏳ Повторная попытка через {delay:.1f} сек")
-        time.sleep(delay)
+        self.deadline.sleep(delay, "повтор после ошибки")
         return True
 
     def handle_critical_error(self, seller_id, attempt, max_attempts):
@@ -1152,24 +1696,24 @@ class OzonSellerParser:
         if attempt < max_attempts:
             delay = random.uniform(15, 25)
             logging.info(f"⏳ Критическая ошибка, повтор через {delay:.1f} сек")
-            time.sleep(delay)
+            self.deadline.sleep(delay, "повтор после ошибки")
             return True
         else:
             logging.error(f"❌ Критические ошибки на всех попытках для {seller_id}")
             return False
 
-    def finalize_parsing(self, seller_data, html_paths):
+    def finalize_parsing(self, seller_data, html_paths, seller_id=None):
         """Финальная обработка результатов"""
         try:
             # Добавляем пути к HTML если они есть
             if html_paths:
                 seller_data['Html_путь'] = "; ".join(html_paths)
 
-            # Сохраняем то, что есть
+            # Сохраняем то, что есть, с причиной неполноты
             if seller_data:
-                self.save_to_csv(seller_data)
-                logging.info("💾 Данные сохранены (частичные)")
-                return seller_data
+                seller_data.setdefault('Причина', self.last_status)
+                logging.info("💾 Частичные данные переданы на запись")
+                return pipeline.submit(functools.partial(self.build_record, seller_id, seller_data, fingerprint=False))
             else:
                 logging.error("❌ Не удалось собрать никаких данных")
                 return None
@@ -1233,30 +1777,103 @@ class OzonSellerParser:
             # Случайный скролл
             scroll_pixels = random.randint(200, 800)
             self.driver.execute_script(f"window.scrollBy(0, {scroll_pixels});")
-            time.sleep(random.uniform(0.5, 1.5))
+            self.deadline.sleep(random.uniform(0.5, 1.5), "движения мышью")
 
         except Exception as e:
             logging.debug(f"⚠️ Ошибка при движении мышью: {e}")
 
-    def close(self):
-        """Корректное закрытие драйвера и очистка"""
+    def shutdown_driver(self):
+        """Закрытие драйвера с добиванием оставшихся процессов браузера"""
+        pid = supervisor.browser_pid(self.worker_name)
+        self.save_session()
         if self.driver:
             try:
                 self.driver.quit()
             except Exception as e:
                 logging.error(f"❌ Ошибка при закрытии драйвера: {e}")
             self.driver = None
+        self.network = None
+        self.navigator = None
+        self.prefetch_tab = None
+
+        # quit() мог завершиться ошибкой или оставить дочерние процессы chrome
+        supervisor.kill_tree(pid)
+        supervisor.unregister(self.worker_name)
+
+        # Браузер закрыт - его кэш согласован и может стать общим снимком
+        if pid:
+            asset_cache.publish(self.chrome_temp_dir)
+
+    def save_session(self):
+        """Прогретая сессия браузера - обратно в пул (до закрытия драйвера)"""
+        if self.session and self.driver:
+            try:
+                self.session.save(self.driver)
+            except Exception as e:
+                logging.warning(f"⚠️ Не удалось сохранить сессию: {e}")
+        self.session = None
+
+    def recycle_driver(self, reason):
+        """Перезапуск браузера с чистым профилем"""
+        logging.info(f"♻️ Перезапуск браузера {self.worker_name}: {reason}")
+        self.shutdown_driver()
+
+        old_dir = self.chrome_temp_dir
+        self.chrome_temp_dir = tempfile.mkdtemp(prefix=PROFILE_PREFIX)
+        supervisor.claim_dir(self.chrome_temp_dir)
+        supervisor.release_dir(old_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        self.setup_driver()
+        self.wait = WebDriverWait(self.driver, 15)
+
+    def close(self):
+        """Корректное закрытие драйвера и очистка"""
+        self.shutdown_driver()
 
         if self.chrome_temp_dir and os.path.exists(self.chrome_temp_dir):
             try:
                 shutil.rmtree(self.chrome_temp_dir)
             except Exception as e:
                 logging.warning(f"⚠️ Не удалось удалить временную директорию: {e}")
+        supervisor.release_dir(self.chrome_temp_dir)
+        if proxy_leases:
+            proxy_leases.release(self.worker_name)
+
+
+def finish_message(ch, delivery_tag, body, attempt, status):
+    """Подтверждение сообщения в потоке соединения; неудачи - в очередь отложенных повторов"""
+    try:
+        if status != 'ok' and RETRY_MODE == 'queue':
+            schedule_retry(ch, body, attempt, status)
+        ch.basic_ack(delivery_tag=delivery_tag)
+    except Exception as e:
+        logging.error(f"❌ Ошибка подтверждения сообщения {body.decode()}: {e}")
 
 
 def callback(ch, method, properties, body):
-    seller_id = body.decode()
-    logging.info(f"🎯 Получен ID продавца: {seller_id}")
+    attempt = int((properties.headers or {}).get('x-attempt', 0)) + 1
+    try:
+        seller_id, profile = parse_message(body)
+    except ValueError as e:
+        # Повтор не поможет - сразу в отстойник
+        logging.error(f"❌ Некорректное сообщение: {e}")
+        finish_message(ch, method.delivery_tag, body, RETRY_MAX_ATTEMPTS, 'bad_message')
+        return
+    logging.info(f"🎯 Получен ID продавца: {seller_id} (попытка {attempt})")
+
+    # Сообщение подтверждается после записи результата (этап записи конвейера).
+    # Каналы pika не потокобезопасны: ack и публикация выполняются в потоке соединения
+    on_done = lambda status: ch.connection.add_callback_threadsafe(
+        functools.partial(finish_message, ch, method.delivery_tag, body, attempt, status)
+    )
+
+    if prefetcher:
+        # При закрытии канала брокер вернёт неподтверждённое сообщение в очередь - предзагрузка отменяется
+        ticket = Ticket(seller_id, attempt, profile, on_done, valid=lambda: ch.is_open)
+        prefetcher.offer(ticket)
+        executor.submit(run_tickets, ticket)
+        return
 
     def task_wrapper():
         # Добавляем случайную задержку перед началом обработки
@@ -1264,14 +1881,38 @@ def callback(ch, method, properties, body):
         logging.info(f"⏳ Случайная задержка перед обработкой {seller_id}: {delay:.2f} сек")
         time.sleep(delay)
 
-        parse_task(seller_id)
-        with lock:
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+        parse_task(seller_id, attempt, on_done=on_done, profile=profile)
 
     executor.submit(task_wrapper)
 
 
+def run_tickets(ticket):
+    """Режим PREFETCH: своё сообщение, затем сообщения, которые воркер забрал для предзагрузки"""
+    delay = random.uniform(1, 10)
+    logging.info(f"⏳ Случайная задержка перед обработкой {ticket.seller_id}: {delay:.2f} сек")
+    time.sleep(delay)
+    if not prefetcher.enter(ticket):
+        # Сообщение обработает воркер, загрузивший его во фоновой вкладке
+        return
+    borrow_worker_parser()
+    try:
+        while ticket:
+            parse_task(ticket.seller_id, ticket.attempt, on_done=ticket.on_done, profile=ticket.profile)
+            ticket, worker_state.next_ticket = getattr(worker_state, 'next_ticket', None), None
+            if ticket and not ticket.valid():
+                logging.info(f"↩️ Сообщение {ticket.seller_id} вернулось в очередь, предзагрузка отменена")
+                parser = getattr(worker_state, 'parser', None)
+                if parser:
+                    parser.discard_prefetch()
+                ticket = None
+    finally:
+        lend_worker_parser()
+        prefetcher.leave()
+
+
 def start_consumer():
+    supervisor.start_monitor()
+    profiler.install()
     while True:
         try:
             connection_params = pika.ConnectionParameters(
@@ -1297,7 +1938,10 @@ def start_consumer():
                 passive=True  # Только проверяем существование, не создаем заново
             )
 
-            channel.basic_qos(prefetch_count=1)
+            # Число сообщений в обработке = число активных слотов воркеров
+            channel.basic_qos(prefetch_count=controller.prefetch_count(), global_qos=True)
+            controller.attach(connection, channel)
+            controller.start()
             channel.basic_consume(
                 queue='seller_ids',
                 on_message_callback=callback,
@@ -0,0 +1,97 @@
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+# Сериализация и запись результатов в отдельных потоках; false - всё в потоке браузера
+PIPELINE_ENABLED = os.getenv('PIPELINE', 'true').lower() == 'true'
+
+# Размер очередей между этапами: при переполнении браузерный поток ждёт запись
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 20))
+
+
+def write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+
+class Stage:
+    """Этап конвейера: поток с ограниченной входной очередью задач.
+
+    Задача - функция без аргументов; если она вернула функцию, та уходит
+    следующему этапу, иначе результат завершает Future задачи.
+    """
+
+    def __init__(self, name, maxsize, next_stage=None):
+        self.name = name
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.next_stage = next_stage
+        self.thread = threading.Thread(target=self.run, name=f"pipeline-{name}", daemon=True)
+        self.thread.start()
+
+    def put(self, task, future):
+        self.queue.put((task, future))
+
+    def run(self):
+        while True:
+            task, future = self.queue.get()
+            try:
+                result = task()
+                if callable(result) and self.next_stage:
+                    self.next_stage.put(result, future)
+                else:
+                    future.set_result(result)
+            except Exception as e:
+                logging.error(f"❌ Ошибка этапа {self.name}: {e}", exc_info=True)
+                future.set_result(None)
+            finally:
+                self.queue.task_done()
+
+
+class Pipeline:
+    """Конвейер результатов продавца: браузер -> сериализация -> запись"""
+
+    def __init__(self, enabled=PIPELINE_ENABLED, maxsize=PIPELINE_QUEUE_SIZE):
+        self.enabled = enabled
+        if enabled:
+            self.persist_stage = Stage('persist', maxsize)
+            self.serialize_stage = Stage('serialize', maxsize, next_stage=self.persist_stage)
+
+    def run_now(self, task):
+        future = Future()
+        try:
+            result = task()
+            while callable(result):
+                result = result()
+            future.set_result(result)
+        except Exception as e:
+            logging.error(f"❌ Ошибка обработки результата: {e}", exc_info=True)
+            future.set_result(None)
+        return future
+
+    def submit(self, task):
+        """Сериализация и запись записи продавца; Future с результатом записи"""
+        if not self.enabled:
+            return self.run_now(task)
+        future = Future()
+        self.serialize_stage.put(task, future)
+        return future
+
+    def submit_write(self, task):
+        """Только запись (HTML страниц и т.п.)"""
+        if not self.enabled:
+            return self.run_now(task)
+        future = Future()
+        self.persist_stage.put(task, future)
+        return future
+
+    def drain(self):
+        """Дождаться записи всего, что уже передано в конвейер"""
+        if self.enabled:
+            self.serialize_stage.queue.join()
+            self.persist_stage.queue.join()
+
+
+pipeline = Pipeline()
@@ -0,0 +1,68 @@
+import os
+import threading
+from dataclasses import dataclass
+
+# Предзагрузка следующего продавца во фоновой вкладке, пока текущий извлекается и записывается
+PREFETCH = os.getenv('PREFETCH', 'false').lower() == 'true'
+
+
+@dataclass(slots=True)
+class Ticket:
+    """Полученное, но ещё не начатое сообщение продавца"""
+    seller_id: str
+    attempt: int
+    profile: object
+    on_done: object
+    valid: object  # () -> bool: сообщение ещё можно подтвердить (соединение живо, брокер не вернул его в очередь)
+    claimed_by: str = None
+    started: bool = False
+
+
+class Prefetcher:
+    """Сообщения, ждущие свободного слота, и передача следующего из них воркеру для предзагрузки.
+
+    Prefetch канала вдвое больше числа слотов: на каждый слот одно сообщение ждёт в enter(),
+    воркер с загруженной страницей забирает его через claim() и обрабатывает сам, следующим.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots  # () -> текущее число слотов
+        self.cond = threading.Condition()
+        self.waiting = []  # ждущие сообщения в порядке получения
+        self.running = 0
+
+    def offer(self, ticket):
+        with self.cond:
+            self.waiting.append(ticket)
+            self.cond.notify_all()
+
+    def enter(self, ticket):
+        """Ожидание свободного слота; False - сообщение забрал воркер с предзагрузкой или его вернул брокер"""
+        with self.cond:
+            while ticket.claimed_by is None and self.running >= self.slots() and ticket.valid():
+                self.cond.wait(timeout=1)
+            if ticket.claimed_by is not None:
+                return False
+            if not ticket.valid():
+                self.waiting.remove(ticket)
+                return False
+            self.waiting.remove(ticket)
+            ticket.started = True
+            self.running += 1
+            return True
+
+    def leave(self):
+        with self.cond:
+            self.running -= 1
+            self.cond.notify_all()
+
+    def claim(self, worker):
+        """Самое старое ждущее сообщение - воркеру worker; None - ждущих нет"""
+        with self.cond:
+            for ticket in self.waiting:
+                if ticket.claimed_by is None and not ticket.started and ticket.valid():
+                    self.waiting.remove(ticket)
+                    ticket.claimed_by = worker
+                    self.cond.notify_all()
+                    return ticket
+        return None
@@ -0,0 +1,244 @@
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+import pika
+from dotenv import load_dotenv
+from rabbit import SELLER_QUEUE, connection_params, declare_retry_queues, declare_seller_queue
+from discovery import DISCOVERY_ENABLED
+from extraction_profiles import PROFILES, message_body
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PRODUCER_DB = os.getenv('PRODUCER_DB', '/app/data/producer.db')
+
+# Очередь держится между порогами: ниже нижнего - доливается до верхнего
+PRODUCER_LOW_WATERMARK = int(os.getenv('PRODUCER_LOW_WATERMARK', 2000))
+PRODUCER_HIGH_WATERMARK = int(os.getenv('PRODUCER_HIGH_WATERMARK', 10000))
+# Период проверки глубины очереди (сек) и размер пачки с подтверждением брокера
+PRODUCER_INTERVAL = int(os.getenv('PRODUCER_INTERVAL', 10))
+PRODUCER_BATCH = int(os.getenv('PRODUCER_BATCH', 500))
+
+
+class CursorStore:
+    """Курсоры продюсеров (общий файл SQLite): следующий ID, конец диапазона, пауза"""
+
+    def __init__(self, path=PRODUCER_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS producers (
+                name TEXT PRIMARY KEY,
+                next_id INTEGER,
+                end_id INTEGER,
+                paused INTEGER DEFAULT 0,
+                published INTEGER DEFAULT 0,
+                updated REAL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, name):
+        """Состояние курсора: dict или None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT next_id, end_id, paused, published, updated FROM producers WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'next_id': row[0], 'end_id': row[1], 'paused': bool(row[2]), 'published': row[3], 'updated': row[4]}
+
+    def start(self, name, start_id, end_id=None, reset=False):
+        """Курсор для запуска: сохранённый (продолжение) или новый с start_id.
+
+        end_id заменяет сохранённый конец, только если задан: перезапуск без --end не снимает границу.
+        """
+        with self.lock, self.db:
+            if reset:
+                self.db.execute("DELETE FROM producers WHERE name = ?", (name,))
+            self.db.execute("""
+                INSERT INTO producers (name, next_id, end_id, updated) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET end_id = COALESCE(excluded.end_id, end_id)
+            """, (name, start_id, end_id, time.time()))
+        return self.get(name)
+
+    def advance(self, name, next_id, published):
+        """Сдвиг курсора после подтверждённой брокером пачки"""
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE producers SET next_id = ?, published = published + ?, updated = ? WHERE name = ?",
+                (next_id, published, time.time(), name)
+            )
+
+    def set_paused(self, name, paused):
+        """Пауза/продолжение; False - курсора с таким именем нет"""
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "UPDATE producers SET paused = ?, updated = ? WHERE name = ?", (int(paused), time.time(), name)
+            )
+        return bool(cursor.rowcount)
+
+
+class StreamProducer:
+    """Постепенная постановка ID продавцов в seller_ids между нижним и верхним порогом глубины"""
+
+    def __init__(self, name, start_id, end_id=None, profile=None, archive_html=None, reset=False):
+        self.name = name
+        self.start_id = start_id
+        self.end_id = end_id
+        self.profile = profile
+        self.archive_html = archive_html
+        self.reset = reset
+        self.store = CursorStore()
+        self.discovery = None
+        if DISCOVERY_ENABLED:
+            from discovery import DiscoveryStore
+            self.discovery = DiscoveryStore()
+        self.connection = None
+        self.channel = None
+
+    def connect(self):
+        self.connection = pika.BlockingConnection(connection_params())
+        self.channel = self.connection.channel()
+        if self.reset:
+            # Новый обход: очередь пересоздаётся без TTL, курсор - с начала
+            self.channel.queue_delete(queue=SELLER_QUEUE)
+            declare_seller_queue(self.channel, ttl=0)
+            self.channel = declare_retry_queues(self.channel)
+            self.reset = False
+        else:
+            try:
+                self.channel.queue_declare(queue=SELLER_QUEUE, durable=True, passive=True)
+            except pika.exceptions.ChannelClosedByBroker:
+                self.channel = self.connection.channel()
+                declare_seller_queue(self.channel, ttl=0)
+                self.channel = declare_retry_queues(self.channel)
+        self.channel.confirm_delivery()
+
+    def depth(self):
+        """Готовые к выдаче сообщения seller_ids"""
+        return self.channel.queue_declare(queue=SELLER_QUEUE, durable=True, passive=True).method.message_count
+
+    def publish(self, seller_ids):
+        """Пачка ID с подтверждением брокера (исключение - пачка не подтверждена)"""
+        for seller_id in seller_ids:
+            self.channel.basic_publish(
+                exchange='',
+                routing_key=SELLER_QUEUE,
+                body=message_body(seller_id, self.profile, self.archive_html),
+                properties=pika.BasicProperties(delivery_mode=2)
+            )
+
+    def top_up(self, state):
+        """Долив очереди до верхнего порога; True - диапазон исчерпан"""
+        next_id, end_id = state['next_id'], state['end_id']
+        depth = self.depth()
+        if depth >= PRODUCER_LOW_WATERMARK:
+            return False
+
+        room = PRODUCER_HIGH_WATERMARK - depth
+        added = 0
+        while room > 0 and (end_id is None or next_id <= end_id):
+            count = min(PRODUCER_BATCH, room)
+            if end_id is not None:
+                count = min(count, end_id - next_id + 1)
+            seller_ids = range(next_id, next_id + count)
+            self.publish(seller_ids)
+            # Курсор сдвигается только после подтверждения: при падении пачка повторится, а не потеряется
+            next_id += count
+            self.store.advance(self.name, next_id, count)
+            if self.discovery:
+                self.discovery.add((str(i) for i in seller_ids), 'stream')
+            room -= count
+            added += count
+
+        logging.info(f"🌊 Глубина очереди {depth} < {PRODUCER_LOW_WATERMARK}: добавлено {added} ID, "
+                     f"курсор {next_id}" + (f" из {end_id}" if end_id is not None else ""))
+        return end_id is not None and next_id > end_id
+
+    def run(self):
+        state = self.store.start(self.name, self.start_id, self.end_id, reset=self.reset)
+        logging.info(f"🚀 Продюсер '{self.name}': с ID {state['next_id']}"
+                     + (f" до {state['end_id']}" if state['end_id'] is not None else " без конца диапазона")
+                     + f", пороги {PRODUCER_LOW_WATERMARK}/{PRODUCER_HIGH_WATERMARK}")
+
+        paused = None
+        while True:
+            try:
+                if self.connection is None or self.connection.is_closed:
+                    self.connect()
+
+                state = self.store.get(self.name)
+                if state['paused'] != paused:
+                    paused = state['paused']
+                    logging.info(f"⏸️ Продюсер '{self.name}' на паузе" if paused
+                                 else f"▶️ Продюсер '{self.name}' работает")
+                if not paused and self.top_up(state):
+                    logging.info(f"🎉 Продюсер '{self.name}': диапазон поставлен целиком")
+                    self.connection.close()
+                    return True
+
+                # sleep соединения обслуживает heartbeat брокера
+                self.connection.sleep(PRODUCER_INTERVAL)
+
+            except KeyboardInterrupt:
+                logging.info("🛑 Остановка продюсера")
+                if self.connection and self.connection.is_open:
+                    self.connection.close()
+                return True
+            except Exception as e:
+                logging.error(f"❌ Ошибка продюсера: {e}, переподключение через {PRODUCER_INTERVAL} сек")
+                self.connection = None
+                time.sleep(PRODUCER_INTERVAL)
+
+
+def print_status(store, name):
+    state = store.get(name)
+    if state is None:
+        print(f"Продюсер '{name}' ещё не запускался")
+        return
+    end = state['end_id'] if state['end_id'] is not None else '∞'
+    print(f"Продюсер '{name}': следующий ID {state['next_id']} (конец {end}), "
+          f"поставлено {state['published']}, {'пауза' if state['paused'] else 'работает'}")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    end_default = os.getenv('PRODUCER_END_ID')
+
+    arg_parser = argparse.ArgumentParser(description="Потоковая постановка ID продавцов в очередь")
+    arg_parser.add_argument('command', choices=('run', 'pause', 'resume', 'status'), nargs='?', default='run')
+    arg_parser.add_argument('--name', default=os.getenv('PRODUCER_NAME', 'sellers'),
+                            help="имя курсора (несколько независимых продюсеров)")
+    arg_parser.add_argument('--start', type=int, default=int(os.getenv('START_SELLER_ID', 1)),
+                            help="первый ID для нового курсора (сохранённый курсор продолжается)")
+    arg_parser.add_argument('--end', type=int, default=int(end_default) if end_default else None,
+                            help="последний ID (по умолчанию - без конца)")
+    arg_parser.add_argument('--profile', choices=sorted(PROFILES), default=os.getenv('MESSAGE_PROFILE') or None,
+                            help="профиль извлечения в сообщениях (по умолчанию - EXTRACTION_PROFILE парсера)")
+    arg_parser.add_argument('--no-html', action='store_const', const=False, dest='archive_html',
+                            help="не сохранять HTML страниц для этих сообщений")
+    arg_parser.add_argument('--reset', action='store_true',
+                            help="начать заново: пересоздать очередь и курсор с --start (и снять --end)")
+    args = arg_parser.parse_args()
+
+    if args.command == 'run':
+        # В диапазонном режиме queue_setup уже поставил весь диапазон - второй источник дал бы дубли
+        if os.getenv('QUEUE_MODE', 'range') != 'stream':
+            # Отказ по конфигурации - штатное завершение (код 0), иначе restart: on-failure зациклит перезапуски
+            logging.warning("⚠️ Продюсер не нужен: QUEUE_MODE не stream, очередь заполняет queue_setup. Завершение")
+            sys.exit(0)
+        producer = StreamProducer(args.name, args.start, args.end, args.profile, args.archive_html, args.reset)
+        sys.exit(0 if producer.run() else 1)
+
+    store = CursorStore()
+    if args.command in ('pause', 'resume'):
+        if not store.set_paused(args.name, args.command == 'pause'):
+            print(f"❌ Продюсер '{args.name}' ещё не запускался")
+            sys.exit(1)
+    print_status(store, args.name)
@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import signal
+import pstats
+import logging
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+LOG_DIR = os.path.join(os.getenv('APP_DIR', '/app'), 'logs')
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def folded_stack(frame):
+    """Стек кадра от корня к листу в формате folded (через ';')"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Profiler:
+    """Профилирование работающего воркера без перезапуска.
+
+    sample   - сэмплирование стеков потоков, обрабатывающих продавца, с тегом стадии;
+               результат в формате folded (flamegraph.pl, speedscope) в LOG_DIR.
+    cprofile - cProfile одного воркера на PROFILE_SELLERS продавцов, результат - .prof (pstats).
+
+    Режим задаётся PROFILE_MODE при старте; SIGUSR1 включает/выключает сэмплирование,
+    SIGUSR2 запускает окно cProfile.
+    """
+
+    def __init__(self):
+        self.mode = os.getenv('PROFILE_MODE', 'off')
+        self.interval = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))
+        self.dump_interval = float(os.getenv('PROFILE_DUMP_INTERVAL', 300))
+        self.sellers_per_profile = int(os.getenv('PROFILE_SELLERS', 20))
+        self.instance_id = os.getenv('HOSTNAME', 'parser')
+
+        self.stages = {}  # ident потока -> стек стадий
+        self.samples = Counter()
+        self.lock = threading.Lock()
+        self.sampling = threading.Event()
+        self.sampler = None
+
+        # cProfile в 3.12+ - один на процесс: профилирует только поток-владелец окна
+        self.cprofile_armed = self.mode == 'cprofile'
+        self.cprofile_owner = None
+        self.cprofile = None
+        self.cprofile_left = 0
+
+    def install(self):
+        """Обработчики сигналов (только из главного потока) и запуск режима из окружения"""
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.toggle_sampling())
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.arm_cprofile())
+        except ValueError:
+            logging.warning("⚠️ Сигналы профилирования доступны только из главного потока")
+        if self.mode == 'sample':
+            self.start_sampling()
+
+    @contextmanager
+    def stage(self, name):
+        """Тег стадии обработки продавца для стеков текущего потока"""
+        stack = self.stages.setdefault(threading.get_ident(), [])
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    # Сэмплирование
+
+    def toggle_sampling(self):
+        if self.sampling.is_set():
+            self.sampling.clear()
+        else:
+            self.start_sampling()
+
+    def start_sampling(self):
+        self.sampling.set()
+        if self.sampler is None or not self.sampler.is_alive():
+            self.sampler = threading.Thread(target=self.sample_loop, name="profiler", daemon=True)
+            self.sampler.start()
+        logging.info(f"🔬 Сэмплирующий профайлер включён (интервал {self.interval} сек)")
+
+    def sample_loop(self):
+        last_dump = time.time()
+        while self.sampling.is_set():
+            time.sleep(self.interval)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                stack = self.stages.get(ident)
+                if not stack:
+                    continue
+                key = f"{names.get(ident, ident)};{'/'.join(stack)};{folded_stack(frame)}"
+                with self.lock:
+                    self.samples[key] += 1
+
+            if time.time() - last_dump >= self.dump_interval:
+                self.dump_samples()
+                last_dump = time.time()
+
+        self.dump_samples()
+        logging.info("🔬 Сэмплирующий профайлер выключен")
+
+    def dump_samples(self):
+        with self.lock:
+            samples, self.samples = self.samples, Counter()
+        if not samples:
+            return None
+        path = f"{LOG_DIR}/profile_{self.instance_id}_{time.strftime('%Y%m%d_%H%M%S')}.folded"
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logging.info(f"🔬 Профиль сохранён: {path} ({sum(samples.values())} сэмплов)")
+            return path
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось сохранить профиль: {e}")
+            return None
+
+    # cProfile
+
+    def arm_cprofile(self):
+        self.cprofile_armed = True
+        logging.info(f"🔬 cProfile: следующий воркер профилируется на {self.sellers_per_profile} продавцах")
+
+    @contextmanager
+    def seller(self):
+        """Обработка одного продавца; в окне cProfile профилируется поток-владелец"""
+        ident = threading.get_ident()
+        with self.lock:
+            if self.cprofile_armed and self.cprofile_owner is None:
+                self.cprofile_armed = self.mode == 'cprofile'
+                self.cprofile_owner = ident
+                self.cprofile = cProfile.Profile()
+                self.cprofile_left = self.sellers_per_profile
+            profiling = self.cprofile_owner == ident
+
+        if profiling:
+            try:
+                self.cprofile.enable()
+            except ValueError as e:
+                # Активен другой инструмент профилирования
+                logging.warning(f"⚠️ cProfile недоступен: {e}")
+                self.release_cprofile()
+                profiling = False
+
+        try:
+            with self.stage('seller'):
+                yield
+        finally:
+            if profiling:
+                self.cprofile.disable()
+                self.cprofile_left -= 1
+                if self.cprofile_left <= 0:
+                    self.dump_cprofile()
+
+    def dump_cprofile(self):
+        path = (f"{LOG_DIR}/cprofile_{self.instance_id}_{threading.current_thread().name}_"
+                f"{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        try:
+            stats = pstats.Stats(self.cprofile)
+            stats.dump_stats(path)
+            logging.info(f"🔬 cProfile за {self.sellers_per_profile} продавцов сохранён: {path}")
+        except Exception as e:
+            logging.warning(f"⚠️ Не удалось сохранить cProfile: {e}")
+        self.release_cprofile()
+
+    def release_cprofile(self):
+        with self.lock:
+            self.cprofile_owner = None
+            self.cprofile = None
+
+
+profiler = Profiler()
@@ -0,0 +1,113 @@
+import os
+import time
+import random
+import sqlite3
+import logging
+import threading
+
+PROXY_LEASE_DB = os.getenv('PROXY_LEASE_DB', '/app/data/proxy_leases.db')
+
+# Аренда прокси слотами воркеров всех реплик: каждому - наименее загруженный прокси пула
+PROXY_LEASES_ENABLED = os.getenv('PROXY_LEASES', 'true').lower() == 'true'
+# Слотов на один прокси; сверх этого прокси делятся, только когда заняты все
+PROXY_LEASE_SLOTS = int(os.getenv('PROXY_LEASE_SLOTS', 1))
+# Аренда без продления дольше TTL (упавшая реплика) освобождается
+PROXY_LEASE_TTL = int(os.getenv('PROXY_LEASE_TTL', 120))
+PROXY_LEASE_HEARTBEAT = int(os.getenv('PROXY_LEASE_HEARTBEAT', 30))
+
+
+class ProxyLeaseRegistry:
+    """Реестр аренды прокси (общий для реплик файл SQLite): выдача, продление, истечение, освобождение"""
+
+    def __init__(self, path=PROXY_LEASE_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        # Файл общий для реплик (bind mount), поэтому ждём блокировку
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                holder TEXT PRIMARY KEY,
+                proxy TEXT,
+                acquired REAL,
+                heartbeat REAL
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS proxy_usage (
+                proxy TEXT PRIMARY KEY,
+                leases INTEGER DEFAULT 0,
+                last_released REAL
+            )
+        """)
+        self.db.commit()
+        self.held = {}  # аренды этого процесса: holder -> proxy
+        self.heartbeat_thread = None
+
+    def acquire(self, holder, proxies, exclude=None):
+        """Аренда наименее загруженного прокси из proxies; прежняя аренда holder освобождается"""
+        candidates = [proxy for proxy in proxies if proxy != exclude] or list(proxies)
+        if not candidates:
+            return None
+        now = time.time()
+        with self.lock, self.db:
+            # Блокировка записи до выбора: выбор и аренда атомарны для всех реплик
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute("DELETE FROM leases WHERE heartbeat < ? OR holder = ?", (now - PROXY_LEASE_TTL, holder))
+            load = dict(self.db.execute("SELECT proxy, COUNT(*) FROM leases GROUP BY proxy").fetchall())
+            released = dict(self.db.execute("SELECT proxy, last_released FROM proxy_usage").fetchall())
+            # Меньше аренд, затем дольше простаивал; равные - случайно, чтобы реплики не шли по кругу вместе
+            proxy = min(candidates, key=lambda p: (load.get(p, 0), released.get(p) or 0, random.random()))
+            self.db.execute(
+                "INSERT INTO leases (holder, proxy, acquired, heartbeat) VALUES (?, ?, ?, ?)", (holder, proxy, now, now)
+            )
+            self.db.execute("""
+                INSERT INTO proxy_usage (proxy, leases) VALUES (?, 1)
+                ON CONFLICT(proxy) DO UPDATE SET leases = leases + 1
+            """, (proxy,))
+            self.held[holder] = proxy
+        self.start_heartbeat()
+
+        holders = load.get(proxy, 0) + 1
+        if holders > PROXY_LEASE_SLOTS:
+            logging.warning(f"⚠️ Все прокси заняты: {proxy} делят {holders} слотов (лимит {PROXY_LEASE_SLOTS})")
+        logging.info(f"🔑 {holder}: аренда прокси {proxy} (слотов на нём: {holders})")
+        return proxy
+
+    def release(self, holder):
+        with self.lock, self.db:
+            proxy = self.held.pop(holder, None)
+            self.db.execute("DELETE FROM leases WHERE holder = ?", (holder,))
+            if proxy:
+                self.db.execute("""
+                    INSERT INTO proxy_usage (proxy, last_released) VALUES (?, ?)
+                    ON CONFLICT(proxy) DO UPDATE SET last_released = excluded.last_released
+                """, (proxy, time.time()))
+        if proxy:
+            logging.info(f"🔑 {holder}: прокси {proxy} освобождён")
+
+    def heartbeat(self):
+        """Продление аренд процесса; истёкшая (долгая пауза процесса) восстанавливается"""
+        now = time.time()
+        with self.lock, self.db:
+            held = list(self.held.items())
+            self.db.executemany("""
+                INSERT INTO leases (holder, proxy, acquired, heartbeat) VALUES (?, ?, ?, ?)
+                ON CONFLICT(holder) DO UPDATE SET heartbeat = excluded.heartbeat
+            """, [(holder, proxy, now, now) for holder, proxy in held])
+
+    def start_heartbeat(self):
+        if self.heartbeat_thread is None or not self.heartbeat_thread.is_alive():
+            self.heartbeat_thread = threading.Thread(target=self.heartbeat_loop, name="proxy-leases", daemon=True)
+            self.heartbeat_thread.start()
+
+    def heartbeat_loop(self):
+        while True:
+            time.sleep(PROXY_LEASE_HEARTBEAT)
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logging.warning(f"⚠️ Ошибка продления аренды прокси: {e}")
+
+
+proxy_leases = ProxyLeaseRegistry() if PROXY_LEASES_ENABLED and os.getenv('PROXY_LIST', '').strip() else None
@@ -3,14 +3,22 @@ import pika
 import logging
 import time
 import sys
+import argparse
 from dotenv import load_dotenv  # Добавить эту строку
+from rabbit import declare_retry_queues, declare_seller_queue
+from discovery import DISCOVERY_ENABLED
+from extraction_profiles import PROFILES, message_body
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def setup_queues():
-    """Заполнение очереди RabbitMQ ID продавцов с повторными попытками подключения"""
+def setup_queues(profile=None, archive_html=None, recreate_retry=False):
+    """Заполнение очереди RabbitMQ ID продавцов с повторными попытками подключения.
+
+    profile / archive_html - профиль извлечения в каждом сообщении (иначе - профиль парсера);
+    recreate_retry - удалить очереди отложенных повторов вместе с ждущими в них сообщениями.
+    """
 
     load_dotenv()
     rabbitmq_host = os.getenv('RABBITMQ_HOST', 'rabbitmq')
@@ -39,20 +47,38 @@ def setup_queues():
 
             channel = connection.channel()
 
-            # УДАЛИТЬ существующую очередь и создать заново
-            try:
-                channel.queue_delete(queue='seller_ids')
-                logging.info("🗑️ Удалена существующая очередь")
-            except:
-                pass
-
-            # СОЗДАТЬ очередь с TTL
-            channel.queue_declare(
-                queue='seller_ids',
-                durable=True,
-                arguments={'x-message-ttl': 86400000}  # TTL 24 часа
-            )
-            logging.info("✅ Очередь 'seller_ids' создана")
+            # Потоковый режим: очередь без TTL, ID ставит producer.py между порогами.
+            # Очередь не пересоздаётся: её сообщения уже учтены курсором продюсера
+            stream = os.getenv('QUEUE_MODE', 'range') == 'stream'
+
+            if stream:
+                try:
+                    declare_seller_queue(channel, ttl=0)
+                except pika.exceptions.ChannelClosedByBroker:
+                    # Очередь диапазонного режима (с TTL) - пересоздаём без TTL
+                    logging.warning("⚠️ Очередь создана в диапазонном режиме с TTL, пересоздаём без TTL")
+                    channel = connection.channel()
+                    channel.queue_delete(queue='seller_ids')
+                    declare_seller_queue(channel, ttl=0)
+                channel = declare_retry_queues(channel)
+            else:
+                # УДАЛИТЬ существующую очередь и создать заново
+                try:
+                    channel.queue_delete(queue='seller_ids')
+                    logging.info("🗑️ Удалена существующая очередь")
+                except:
+                    pass
+
+                # СОЗДАТЬ очередь с TTL (SELLER_QUEUE_TTL)
+                declare_seller_queue(channel)
+
+                # Очереди отложенных повторов и отстойник: ждущие повторы не теряются
+                channel = declare_retry_queues(channel, recreate=recreate_retry)
+
+            if stream:
+                logging.info("🌊 Потоковый режим: очередь заполняет producer.py")
+                connection.close()
+                return True
 
             # Заполняем очередь
             added_count = 0
@@ -62,7 +88,7 @@ def setup_queues():
                 channel.basic_publish(
                     exchange='',
                     routing_key='seller_ids',
-                    body=str(seller_id),
+                    body=message_body(seller_id, profile, archive_html),
                     properties=pika.BasicProperties(
                         delivery_mode=2  # Сохранять сообщение на диск
                     )
@@ -72,6 +98,11 @@ def setup_queues():
                 if added_count % batch_size == 0:
                     logging.info(f"✅ Добавлено {added_count} ID в очередь")
 
+            # Поставленные ID - в множество известных, чтобы обнаружение не ставило их повторно
+            if DISCOVERY_ENABLED:
+                from discovery import DiscoveryStore
+                DiscoveryStore().add((str(i) for i in range(start_id, end_id + 1)), 'range')
+
             logging.info(f"🎉 Успешно добавлено {added_count} ID продавцов")
             connection.close()
             return True
@@ -85,8 +116,58 @@ def setup_queues():
                 return False
 
 
+def enqueue_refresh(limit, profile=None, archive_html=None):
+    """Постановка в очередь продавцов для повторного обхода без пересоздания очереди"""
+    from fingerprints import FingerprintStore
+
+    load_dotenv()
+    credentials = pika.PlainCredentials(os.getenv('RABBITMQ_USER', 'admin'), os.getenv('RABBITMQ_PASS', 'guest'))
+    try:
+        connection = pika.BlockingConnection(
+            pika.ConnectionParameters(
+                host=os.getenv('RABBITMQ_HOST', 'rabbitmq'),
+                credentials=credentials,
+                heartbeat=600,
+                connection_attempts=3,
+                retry_delay=5
+            )
+        )
+        channel = connection.channel()
+        channel.queue_declare(queue='seller_ids', durable=True, passive=True)
+
+        seller_ids = FingerprintStore().due(limit)
+        for seller_id in seller_ids:
+            channel.basic_publish(
+                exchange='',
+                routing_key='seller_ids',
+                body=message_body(seller_id, profile, archive_html),
+                properties=pika.BasicProperties(delivery_mode=2)
+            )
+
+        logging.info(f"🎉 На повторный обход поставлено {len(seller_ids)} продавцов")
+        connection.close()
+        return True
+    except Exception as e:
+        logging.error(f"❌ Не удалось поставить продавцов на повторный обход: {e}")
+        return False
+
+
 if __name__ == "__main__":
-    success = setup_queues()
+    arg_parser = argparse.ArgumentParser(description="Заполнение очереди ID продавцов")
+    arg_parser.add_argument('--refresh', type=int, metavar='N',
+                            help="поставить в очередь N самых устаревших продавцов из отпечатков вместо диапазона")
+    arg_parser.add_argument('--profile', choices=sorted(PROFILES), default=os.getenv('MESSAGE_PROFILE') or None,
+                            help="профиль извлечения в сообщениях (по умолчанию - EXTRACTION_PROFILE парсера)")
+    arg_parser.add_argument('--recreate-retry-queues', action='store_true',
+                            help="пересоздать очереди отложенных повторов (ждущие повторы удаляются)")
+    arg_parser.add_argument('--no-html', action='store_const', const=False, dest='archive_html',
+                            help="не сохранять HTML страниц для этих сообщений")
+    args = arg_parser.parse_args()
+
+    if args.refresh:
+        sys.exit(0 if enqueue_refresh(args.refresh, args.profile, args.archive_html) else 1)
+
+    success = setup_queues(args.profile, args.archive_html, args.recreate_retry_queues)
     if success:
         print("✅ Очередь успешно заполнена!")
         sys.exit(0)
@@ -0,0 +1,158 @@
+import os
+import logging
+import threading
+import pika
+
+SELLER_QUEUE = 'seller_ids'
+PARKING_QUEUE = f'{SELLER_QUEUE}.parking'
+
+# Повторы через очереди задержки: seller_ids.retry.N -> (TTL, dead-letter) -> seller_ids
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 4))
+RETRY_BASE_DELAY = int(os.getenv('RETRY_BASE_DELAY', 60))
+
+# TTL сообщений seller_ids (сек); 0 - без TTL (потоковый продюсер держит очередь короткой)
+SELLER_QUEUE_TTL = int(os.getenv('SELLER_QUEUE_TTL', 86400))
+
+
+def connection_params():
+    """Параметры подключения к RabbitMQ из окружения"""
+    return pika.ConnectionParameters(
+        host=os.getenv('RABBITMQ_HOST', 'rabbitmq'),
+        port=5672,
+        credentials=pika.PlainCredentials(
+            os.getenv('RABBITMQ_USER', 'guest'),
+            os.getenv('RABBITMQ_PASS', 'guest')
+        ),
+        heartbeat=600,
+        blocked_connection_timeout=300,
+        connection_attempts=10,
+        retry_delay=5
+    )
+
+
+def declare_seller_queue(channel, ttl=SELLER_QUEUE_TTL):
+    """Объявление очереди seller_ids"""
+    channel.queue_declare(
+        queue=SELLER_QUEUE,
+        durable=True,
+        arguments={'x-message-ttl': ttl * 1000} if ttl else None
+    )
+    logging.info(f"✅ Очередь '{SELLER_QUEUE}' создана" + (f" (TTL {ttl} сек)" if ttl else " (без TTL)"))
+
+
+def retry_queue_name(attempt):
+    return f'{SELLER_QUEUE}.retry.{attempt}'
+
+
+def retry_delay(attempt):
+    """Экспоненциальная задержка перед попыткой attempt + 1 (сек)"""
+    return RETRY_BASE_DELAY * 2 ** (attempt - 1)
+
+
+def declare_retry_queues(channel, recreate=False):
+    """Объявление очередей задержки и очереди отстойника; возвращает канал для дальнейшей работы.
+
+    Очереди объявляются повторно без потери сообщений. Очередь задержки с другим TTL (сменился
+    RETRY_BASE_DELAY) пересоздаётся, только если пуста; recreate - удалить очереди задержки в любом случае.
+    """
+    for attempt in range(1, RETRY_MAX_ATTEMPTS):
+        queue = retry_queue_name(attempt)
+        arguments = {
+            'x-message-ttl': retry_delay(attempt) * 1000,
+            'x-dead-letter-exchange': '',
+            'x-dead-letter-routing-key': SELLER_QUEUE
+        }
+        if recreate:
+            channel.queue_delete(queue=queue)
+        try:
+            channel.queue_declare(queue=queue, durable=True, arguments=arguments)
+        except pika.exceptions.ChannelClosedByBroker:
+            # Несовпадение аргументов закрывает канал
+            channel = channel.connection.channel()
+            pending = channel.queue_declare(queue=queue, durable=True, passive=True).method.message_count
+            if pending:
+                logging.warning(f"⚠️ Очередь повторов '{queue}' с другой задержкой содержит {pending} сообщений "
+                                f"и оставлена прежней (пересоздание - флаг --recreate-retry-queues)")
+                continue
+            channel.queue_delete(queue=queue)
+            channel.queue_declare(queue=queue, durable=True, arguments=arguments)
+        logging.info(f"✅ Очередь повторов '{queue}' объявлена (задержка {retry_delay(attempt)} сек)")
+
+    channel.queue_declare(queue=PARKING_QUEUE, durable=True)
+    logging.info(f"✅ Очередь отстойника '{PARKING_QUEUE}' объявлена")
+    return channel
+
+
+def schedule_retry(channel, body, attempt, reason):
+    """Отправка продавца на отложенный повтор или в отстойник после последней попытки"""
+    headers = {'x-attempt': attempt, 'x-reason': reason}
+    if attempt < RETRY_MAX_ATTEMPTS:
+        queue = retry_queue_name(attempt)
+        logging.info(f"🔁 Продавец {body.decode()} ({reason}) уйдёт на повтор через {retry_delay(attempt)} сек")
+    else:
+        queue = PARKING_QUEUE
+        logging.warning(f"🅿️ Продавец {body.decode()} ({reason}) отправлен в отстойник после {attempt} попыток")
+
+    channel.basic_publish(
+        exchange='',
+        routing_key=queue,
+        body=body,
+        properties=pika.BasicProperties(delivery_mode=2, headers=headers)
+    )
+    return queue
+
+
+class Publisher:
+    """Публикация в очередь из потоков воркеров: одно соединение на процесс, подтверждения брокера"""
+
+    def __init__(self, queue, declare=True):
+        self.queue = queue
+        self.declare = declare
+        self.lock = threading.Lock()
+        self.connection = None
+        self.channel = None
+
+    def connect(self):
+        self.connection = pika.BlockingConnection(connection_params())
+        self.channel = self.connection.channel()
+        if self.declare:
+            self.channel.queue_declare(queue=self.queue, durable=True)
+        self.channel.confirm_delivery()
+
+    def publish(self, bodies, content_type=None):
+        """Публикация сообщений (одно или список); False - не удалось и после переподключения"""
+        if isinstance(bodies, (bytes, str)):
+            bodies = [bodies]
+        # Каналы pika не потокобезопасны: публикации воркеров сериализуются
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.connection is None or self.connection.is_closed or self.channel.is_closed:
+                        self.disconnect()
+                        self.connect()
+                    for body in bodies:
+                        self.channel.basic_publish(
+                            exchange='',
+                            routing_key=self.queue,
+                            body=body,
+                            properties=pika.BasicProperties(delivery_mode=2, content_type=content_type)
+                        )
+                    return True
+                except Exception as e:
+                    logging.warning(f"⚠️ Ошибка публикации в {self.queue} (попытка {attempt + 1}): {e}")
+                    self.disconnect()
+        return False
+
+    def disconnect(self):
+        """Закрытие соединения (вызывается под self.lock): упавшее соединение не должно держать сокет"""
+        try:
+            if self.connection and self.connection.is_open:
+                self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+        self.channel = None
+
+    def close(self):
+        with self.lock:
+            self.disconnect()
@@ -0,0 +1,180 @@
+import re
+import json
+from dataclasses import dataclass, fields
+
+
+# Колонки CSV: исходные строковые поля + нормализованные числовые
+CSV_HEADERS = [
+    'URL', 'название', 'Html', 'ОГРН', 'ИНН', 'Название юр лица',
+    'Кол-во отзывов', 'рейтинг', 'Срок регистрации', 'Товары',
+    'Отзывы_число', 'Рейтинг_число', 'Срок_регистрации_мес', 'Причина'
+]
+
+# Служебные колонки, не влияющие на оценку полноты
+NON_SCORED_COLUMNS = ('Причина',)
+
+# Вес важных полей при выборе самой полной записи среди дубликатов
+COMPLETENESS_WEIGHTS = {
+    'ОГРН': 10,
+    'Название юр лица': 8,
+    'рейтинг': 5,
+    'Кол-во отзывов': 5,
+    'Срок регистрации': 5,
+    'ИНН': 7,
+}
+
+NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+MULTIPLIERS = [('млн', 1_000_000), ('тыс', 1_000), ('k', 1_000)]
+
+
+def parse_number(text):
+    """Число из строки вида '1 234 ₽', '4,8', '12 тыс. отзывов'; None если чисел нет"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return None if text != text else float(text)  # NaN из pandas
+    # Убираем разделители разрядов (\s включает неразрывный и узкий пробелы)
+    compact = re.sub(r'(?<=\d)\s(?=\d)', '', str(text))
+    match = NUMBER_RE.search(compact)
+    if not match:
+        return None
+    value = float(match.group().replace(',', '.'))
+    tail = compact[match.end():].lower()
+    for suffix, multiplier in MULTIPLIERS:
+        if tail.lstrip(' .').startswith(suffix):
+            value *= multiplier
+            break
+    return value
+
+
+def parse_int(text):
+    value = parse_number(text)
+    return int(value) if value is not None else None
+
+
+def parse_registration_months(text):
+    """Срок регистрации в месяцах: '5 лет' -> 60, '1 год 3 месяца' -> 15, '20 дней' -> 0"""
+    if not text or not isinstance(text, str):
+        return None
+    months = 0
+    found = False
+    for number, unit in re.findall(r'(\d+(?:[.,]\d+)?)\s*([а-яa-z]+)', text.lower()):
+        value = float(number.replace(',', '.'))
+        if unit.startswith(('год', 'лет', 'г')):
+            months += value * 12
+            found = True
+        elif unit.startswith('мес'):
+            months += value
+            found = True
+        elif unit.startswith(('дн', 'ден', 'нед')):
+            found = True
+    return int(months) if found else None
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """Товар продавца"""
+    name: str = ''
+    price: str = ''
+    link: str = ''
+    image: str = ''
+    rating: str = ''
+    reviews_count: str = ''
+    price_value: float | None = None
+    rating_value: float | None = None
+    reviews_value: int | None = None
+
+    @classmethod
+    def from_dict(cls, data):
+        product = cls(**{f.name: data.get(f.name, '') or '' for f in fields(cls) if not f.name.endswith('_value')})
+        product.normalize()
+        return product
+
+    def normalize(self):
+        self.price_value = parse_number(self.price)
+        self.rating_value = parse_number(self.rating)
+        self.reviews_value = parse_int(self.reviews_count)
+        return self
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass(slots=True)
+class SellerRecord:
+    """Запись о продавце, общая для парсера, CSV и объединения"""
+    url: str = ''
+    name: str = ''
+    html_paths: str = ''
+    ogrn: str = ''
+    inn: str = ''
+    legal_name: str = ''
+    reviews: str = ''
+    rating: str = ''
+    registration: str = ''
+    products_json: str = ''
+    reason: str = ''  # почему запись неполная: блокировка, ошибка, исчерпан бюджет
+    reviews_count: int | None = None
+    rating_value: float | None = None
+    registration_months: int | None = None
+
+    # Ключи словарей парсера и колонки CSV -> поле записи
+    ALIASES = {
+        'url': ('URL',),
+        'name': ('Название', 'название'),
+        'html_paths': ('Html_путь', 'Html'),
+        'ogrn': ('ОГРН',),
+        'inn': ('ИНН',),
+        'legal_name': ('Название_юр_лица', 'Название юр лица'),
+        'reviews': ('Отзывы', 'Кол-во отзывов'),
+        'rating': ('Рейтинг', 'рейтинг'),
+        'registration': ('Срок_регистрации', 'Срок регистрации'),
+        'products_json': ('Товары_JSON', 'Товары'),
+        'reason': ('Причина',),
+    }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Запись из словаря парсера или строки CSV (ключи любой из стадий)"""
+        record = cls()
+        for field_name, keys in cls.ALIASES.items():
+            for key in keys:
+                value = data.get(key)
+                if value is not None and value == value and value != '':  # value == value отсекает NaN
+                    setattr(record, field_name, str(value))
+                    break
+        return record.normalize()
+
+    def normalize(self):
+        self.reviews_count = parse_int(self.reviews)
+        self.rating_value = parse_number(self.rating)
+        self.registration_months = parse_registration_months(self.registration)
+        return self
+
+    def products(self):
+        """Товары продавца из JSON-колонки"""
+        try:
+            return [ProductRecord.from_dict(p) for p in json.loads(self.products_json or '[]')]
+        except (TypeError, ValueError):
+            return []
+
+    def to_csv_dict(self):
+        """Запись с ключами-колонками CSV (формат сообщений очереди результатов)"""
+        return dict(zip(CSV_HEADERS, self.to_csv_row()))
+
+    def completeness(self):
+        """Оценка полноты записи, как при объединении CSV"""
+        row = self.to_csv_dict()
+        score = sum(1 for column, value in row.items() if value != '' and column not in NON_SCORED_COLUMNS)
+        score += sum(weight for column, weight in COMPLETENESS_WEIGHTS.items() if row.get(column) != '')
+        return score
+
+    def to_csv_row(self):
+        return [
+            self.url, self.name, self.html_paths, self.ogrn, self.inn, self.legal_name,
+            self.reviews, self.rating, self.registration, self.products_json,
+            '' if self.reviews_count is None else self.reviews_count,
+            '' if self.rating_value is None else self.rating_value,
+            '' if self.registration_months is None else self.registration_months,
+            self.reason,
+        ]
@@ -0,0 +1,126 @@
+import os
+import csv
+import time
+import json
+import sqlite3
+import logging
+import pika
+from dotenv import load_dotenv
+from records import CSV_HEADERS, SellerRecord
+from rabbit import connection_params
+from sinks import RESULTS_QUEUE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BATCH_SIZE = int(os.getenv('RESULT_BATCH_SIZE', 500))
+FLUSH_INTERVAL = float(os.getenv('RESULT_FLUSH_INTERVAL', 10))
+EXPORT_INTERVAL = float(os.getenv('RESULT_EXPORT_INTERVAL', 300))
+DB_PATH = os.getenv('RESULT_DB', '/app/data/results.db')
+EXPORT_PATH = os.getenv('RESULT_EXPORT', '/app/data/combined_sellers_live.csv')
+
+# Колонки таблицы - поля SellerRecord
+COLUMNS = list(SellerRecord.__dataclass_fields__)
+
+
+class ResultStore:
+    """Дедуплицированное хранилище: по URL остаётся самая полная запись"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            f"CREATE TABLE IF NOT EXISTS sellers ({', '.join(f'{c} TEXT' for c in COLUMNS)}, "
+            f"score INTEGER, updated REAL, PRIMARY KEY (url))"
+        )
+        # Базы прошлых версий: новые поля записи - новыми колонками
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(sellers)")}
+        for column in COLUMNS:
+            if column not in existing:
+                self.db.execute(f"ALTER TABLE sellers ADD COLUMN {column} TEXT")
+
+    def upsert(self, records):
+        """Пакетная запись; существующая строка заменяется, только если новая полнее"""
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        updates = ', '.join(f'{c} = excluded.{c}' for c in COLUMNS + ['score', 'updated'])
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                f"INSERT INTO sellers ({', '.join(COLUMNS)}, score, updated) VALUES ({placeholders}, ?, ?) "
+                f"ON CONFLICT(url) DO UPDATE SET {updates} WHERE excluded.score >= sellers.score",
+                [[getattr(r, c) for c in COLUMNS] + [r.completeness(), now] for r in records]
+            )
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM sellers").fetchone()[0]
+
+    def export(self, path):
+        """Снимок итогового набора в CSV (атомарная замена файла)"""
+        tmp_path = f"{path}.tmp"
+        rows = 0
+        with open(tmp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADERS)
+            for row in self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM sellers ORDER BY url"):
+                record = SellerRecord(**{c: ('' if v is None else v) for c, v in zip(COLUMNS, row)})
+                writer.writerow(record.normalize().to_csv_row())
+                rows += 1
+        os.replace(tmp_path, path)
+        return rows
+
+
+def run_sink():
+    """Потребитель seller_results: пакеты -> хранилище -> периодический экспорт CSV"""
+    load_dotenv()
+    store = ResultStore(DB_PATH)
+    last_export = 0
+    dirty = False
+
+    while True:
+        try:
+            connection = pika.BlockingConnection(connection_params())
+            channel = connection.channel()
+            channel.queue_declare(queue=RESULTS_QUEUE, durable=True)
+            channel.basic_qos(prefetch_count=BATCH_SIZE)
+            logging.info(f"🔄 Ожидаем результаты из '{RESULTS_QUEUE}' (пакет {BATCH_SIZE})")
+
+            batch = []
+            last_tag = None
+            batch_started = 0
+
+            for method, properties, body in channel.consume(RESULTS_QUEUE, inactivity_timeout=FLUSH_INTERVAL):
+                if method is not None:
+                    if last_tag is None:
+                        batch_started = time.time()
+                    try:
+                        batch.append(SellerRecord.from_dict(json.loads(body)))
+                    except Exception as e:
+                        logging.error(f"❌ Некорректное сообщение результата: {e}")
+                    last_tag = method.delivery_tag
+
+                full = len(batch) >= BATCH_SIZE
+                stale = time.time() - batch_started >= FLUSH_INTERVAL
+                if last_tag is not None and (full or stale):
+                    store.upsert(batch)
+                    # Подтверждаем пакет только после коммита в хранилище
+                    channel.basic_ack(delivery_tag=last_tag, multiple=True)
+                    logging.info(f"💾 Записан пакет: {len(batch)} (всего продавцов: {store.count()})")
+                    batch, last_tag = [], None
+                    dirty = True
+
+                if dirty and time.time() - last_export >= EXPORT_INTERVAL:
+                    rows = store.export(EXPORT_PATH)
+                    last_export = time.time()
+                    dirty = False
+                    logging.info(f"📈 Экспортировано {rows} продавцов в {EXPORT_PATH}")
+
+        except pika.exceptions.AMQPConnectionError as e:
+            logging.error(f"❌ Ошибка подключения к RabbitMQ: {e}")
+            time.sleep(10)
+        except Exception as e:
+            logging.error(f"❌ Неожиданная ошибка приёмника: {e}", exc_info=True)
+            time.sleep(10)
+
+
+if __name__ == "__main__":
+    run_sink()
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import logging
+import threading
+from selenium.webdriver.common.by import By
+
+SELECTORS_FILE = os.getenv(
+    'SELECTORS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'selectors.json')
+)
+
+
+def find_all(context, selector):
+    """Поиск элементов по CSS или XPath (XPath начинается с '//')"""
+    if selector.startswith("//") or selector.startswith("(//"):
+        return context.find_elements(By.XPATH, selector)
+    return context.find_elements(By.CSS_SELECTOR, selector)
+
+
+class SelectorRegistry:
+    """Селекторы из конфига с горячей перезагрузкой, статистикой попаданий и обучаемым порядком"""
+
+    def __init__(self, path=SELECTORS_FILE):
+        self.path = path
+        self.reload_interval = int(os.getenv('SELECTORS_RELOAD_INTERVAL', 30))
+        self.decay = float(os.getenv('SELECTORS_DECAY', 0.9))
+        self.dead_after = int(os.getenv('SELECTORS_DEAD_AFTER', 50))
+        self.stats_file = os.getenv(
+            'SELECTORS_STATS_FILE', os.path.join(os.getenv('APP_DIR', '/app'), 'logs', 'selector_stats.json')
+        )
+        self.lock = threading.Lock()
+        self.groups = {}  # группа -> селекторы в порядке конфига
+        self.stats = {}  # (группа, селектор) -> статистика
+        self.mtime = None
+        self.last_check = 0
+        self.last_report = time.time()
+        self.load()
+
+    def load(self):
+        """Загрузка (или перезагрузка) селекторов из файла"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding='utf-8') as f:
+                groups = json.load(f)
+        except Exception as e:
+            logging.error(f"❌ Ошибка загрузки селекторов из {self.path}: {e}")
+            return False
+
+        with self.lock:
+            self.groups = {group: list(selectors) for group, selectors in groups.items()}
+            # Статистика сохраняется для селекторов, оставшихся в конфиге
+            self.stats = {
+                key: value for key, value in self.stats.items()
+                if key[1] in self.groups.get(key[0], [])
+            }
+            for group, selectors in self.groups.items():
+                for selector in selectors:
+                    self.stats.setdefault((group, selector), {
+                        'hits': 0, 'misses': 0, 'score': 0.0, 'misses_in_row': 0, 'dead': False
+                    })
+            self.mtime = mtime
+
+        logging.info(f"✅ Загружены селекторы: {', '.join(f'{g}={len(s)}' for g, s in groups.items())}")
+        return True
+
+    def reload_if_changed(self):
+        now = time.time()
+        if now - self.last_check < self.reload_interval:
+            return
+        self.last_check = now
+        try:
+            if os.path.getmtime(self.path) != self.mtime:
+                logging.info(f"🔄 Файл селекторов изменён, перезагружаем: {self.path}")
+                self.load()
+        except OSError:
+            pass
+
+    def ordered(self, group):
+        """Селекторы группы: сначала те, что сейчас срабатывают"""
+        self.reload_if_changed()
+        with self.lock:
+            selectors = self.groups.get(group, [])
+            return sorted(
+                selectors,
+                key=lambda s: (self.stats[(group, s)]['dead'], -self.stats[(group, s)]['score'], selectors.index(s))
+            )
+
+    def record(self, group, tried, found):
+        """Учёт попытки: все перебранные селекторы - промахи, кроме последнего при успехе"""
+        with self.lock:
+            for i, selector in enumerate(tried):
+                stat = self.stats.get((group, selector))
+                if stat is None:
+                    continue
+                hit = found and i == len(tried) - 1
+                stat['score'] = stat['score'] * self.decay + (1 - self.decay if hit else 0)
+                if hit:
+                    stat['hits'] += 1
+                    stat['misses_in_row'] = 0
+                    if stat['dead']:
+                        stat['dead'] = False
+                        logging.info(f"✅ Селектор снова работает [{group}]: {selector}")
+                else:
+                    stat['misses'] += 1
+                    stat['misses_in_row'] += 1
+                    if not stat['dead'] and self.dead_after and stat['misses_in_row'] >= self.dead_after:
+                        stat['dead'] = True
+                        logging.warning(
+                            f"💀 Селектор не срабатывает {stat['misses_in_row']} раз подряд [{group}]: {selector}")
+
+    def dead_selectors(self):
+        with self.lock:
+            return [key for key, stat in self.stats.items() if stat['dead']]
+
+    def report(self):
+        """Статистика по группам; сохраняется в файл для анализа"""
+        with self.lock:
+            report = {
+                group: [
+                    {'selector': s, **self.stats[(group, s)]}
+                    for s in selectors
+                ]
+                for group, selectors in self.groups.items()
+            }
+        try:
+            with open(self.stats_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.debug(f"⚠️ Не удалось сохранить статистику селекторов: {e}")
+        return report
+
+    def maybe_report(self, interval=300):
+        """Сохранение статистики не чаще раза в interval секунд"""
+        with self.lock:
+            if time.time() - self.last_report < interval:
+                return
+            self.last_report = time.time()
+        self.report()
+
+
+selector_registry = SelectorRegistry()
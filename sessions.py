@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+SESSION_DB = os.getenv('SESSION_DB', os.path.join(os.getenv('APP_DIR', '/app'), 'data', 'sessions.db'))
+
+# Прогретые сессии (cookies + localStorage) по прокси
+SESSION_POOL_ENABLED = os.getenv('SESSION_POOL', 'true').lower() == 'true'
+SESSION_TTL = int(os.getenv('SESSION_TTL', 6 * 3600))
+SESSION_MAX_PER_PROXY = int(os.getenv('SESSION_MAX_PER_PROXY', 5))
+# Сессия упавшего воркера снова доступна через это время
+SESSION_LEASE_TIMEOUT = int(os.getenv('SESSION_LEASE_TIMEOUT', 3600))
+
+SESSION_DOMAIN = 'ozon.ru'
+
+LOCAL_STORAGE_SCRIPT = "return JSON.stringify(Object.assign({}, window.localStorage));"
+
+# Восстановление localStorage до скриптов страницы; существующие ключи не трогаем
+RESTORE_STORAGE_SCRIPT = """
+(function () {
+    if (!location.hostname.endsWith('%s')) return;
+    var items = %s;
+    try {
+        for (var key in items) {
+            if (window.localStorage.getItem(key) === null) window.localStorage.setItem(key, items[key]);
+        }
+    } catch (e) {}
+})();
+"""
+
+
+def proxy_key(proxy):
+    return proxy or 'direct'
+
+
+def cdp_cookie(cookie):
+    """Cookie из Network.getAllCookies в параметры Network.setCookies"""
+    result = {key: cookie[key] for key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite')
+              if key in cookie}
+    # Сессионные cookie приходят с expires = -1
+    if not cookie.get('session') and cookie.get('expires', -1) > 0:
+        result['expires'] = cookie['expires']
+    return result
+
+
+class SessionPool:
+    """Пул сессий браузера, привязанных к прокси: выдача, сохранение, истечение, инвалидация"""
+
+    def __init__(self, path=SESSION_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        # Файл общий для реплик (bind mount), поэтому ждём блокировку
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                proxy TEXT,
+                cookies TEXT,
+                local_storage TEXT,
+                created REAL,
+                saved REAL,
+                pages INTEGER DEFAULT 0,
+                leased_by TEXT,
+                leased_at REAL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS sessions_proxy ON sessions (proxy, saved)")
+        self.db.commit()
+
+    def checkout(self, proxy, owner):
+        """Самая свежая свободная сессия прокси (с арендой) или None"""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM sessions WHERE created < ?", (now - SESSION_TTL,))
+            row = self.db.execute("""
+                SELECT session_id, cookies, local_storage FROM sessions
+                WHERE proxy = ? AND (leased_by IS NULL OR leased_at < ?)
+                ORDER BY saved DESC LIMIT 1
+            """, (proxy_key(proxy), now - SESSION_LEASE_TIMEOUT)).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE sessions SET leased_by = ?, leased_at = ? WHERE session_id = ?", (owner, now, row[0])
+            )
+        return {'session_id': row[0], 'cookies': json.loads(row[1] or '[]'), 'local_storage': json.loads(row[2] or '{}')}
+
+    def save(self, session_id, proxy, cookies, local_storage, pages):
+        """Сохранение состояния и снятие аренды; лишние старые сессии прокси удаляются"""
+        now = time.time()
+        session_id = session_id or uuid.uuid4().hex
+        with self.lock, self.db:
+            self.db.execute("""
+                INSERT INTO sessions (session_id, proxy, cookies, local_storage, created, saved, pages)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    cookies = excluded.cookies,
+                    local_storage = excluded.local_storage,
+                    saved = excluded.saved,
+                    pages = pages + excluded.pages,
+                    leased_by = NULL,
+                    leased_at = NULL
+            """, (session_id, proxy_key(proxy), json.dumps(cookies), json.dumps(local_storage), now, now, pages))
+            self.db.execute("""
+                DELETE FROM sessions WHERE proxy = ? AND session_id NOT IN (
+                    SELECT session_id FROM sessions WHERE proxy = ? ORDER BY saved DESC LIMIT ?
+                )
+            """, (proxy_key(proxy), proxy_key(proxy), SESSION_MAX_PER_PROXY))
+        return session_id
+
+    def release(self, session_id):
+        """Возврат сессии в пул без изменений"""
+        with self.lock, self.db:
+            self.db.execute("UPDATE sessions SET leased_by = NULL, leased_at = NULL WHERE session_id = ?", (session_id,))
+
+    def invalidate(self, session_id):
+        """Сессия получила блокировку - больше не выдаём"""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        logging.info(f"🍪 Сессия {session_id[:8]} удалена из пула после блокировки")
+
+
+class BrowserSession:
+    """Сессия одного браузера: восстановление при запуске и сохранение при закрытии"""
+
+    def __init__(self, pool, proxy, owner):
+        self.pool = pool
+        self.proxy = proxy
+        self.owner = owner
+        self.session_id = None
+        self.pages = 0  # успешно загруженных страниц в этой сессии
+        self.blocked = False
+        self.storage_script = None  # восстановление localStorage; регистрируется в каждой новой вкладке
+
+    def restore(self, driver):
+        """Cookies через CDP (без навигации), localStorage - скриптом при загрузке страницы Ozon"""
+        state = self.pool.checkout(self.proxy, self.owner)
+        if state is None:
+            logging.info(f"🍪 Нет сохранённых сессий для прокси {proxy_key(self.proxy)}, начинаем с чистой")
+            return False
+        self.session_id = state['session_id']
+        cookies = state['cookies']
+        if cookies:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        if state['local_storage']:
+            self.storage_script = RESTORE_STORAGE_SCRIPT % (SESSION_DOMAIN, json.dumps(state['local_storage']))
+            self.prepare_tab(driver)
+        logging.info(f"🍪 Восстановлена сессия {self.session_id[:8]}: cookies {len(cookies)}, "
+                     f"localStorage {len(state['local_storage'])}")
+        return True
+
+    def prepare_tab(self, driver):
+        """Скрипт восстановления localStorage для текущей вкладки (cookies общие для браузера)"""
+        if self.storage_script:
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': self.storage_script})
+
+    def note_page(self):
+        self.pages += 1
+
+    def invalidate(self):
+        self.blocked = True
+        if self.session_id:
+            self.pool.invalidate(self.session_id)
+            self.session_id = None
+
+    def save(self, driver):
+        """Сохранение прогретой сессии; после блокировки и без загруженных страниц - не сохраняем"""
+        if self.blocked or not self.pages:
+            if self.session_id:
+                self.pool.release(self.session_id)
+            return False
+        # Все cookies браузера, а не только текущего документа
+        cookies = [
+            cdp_cookie(c) for c in driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            if SESSION_DOMAIN in c.get('domain', '')
+        ]
+        local_storage = {}
+        if SESSION_DOMAIN in (driver.current_url or ''):
+            local_storage = json.loads(driver.execute_script(LOCAL_STORAGE_SCRIPT) or '{}')
+        self.session_id = self.pool.save(self.session_id, self.proxy, cookies, local_storage, self.pages)
+        logging.info(f"🍪 Сессия {self.session_id[:8]} сохранена ({self.pages} стр., cookies {len(cookies)})")
+        return True
+
+
+session_pool = SessionPool() if SESSION_POOL_ENABLED else None
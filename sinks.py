@@ -0,0 +1,120 @@
+import os
+import csv
+import json
+import shutil
+import logging
+import threading
+from dataclasses import fields
+from records import CSV_HEADERS, SellerRecord, ProductRecord
+from rabbit import Publisher
+
+RESULTS_QUEUE = 'seller_results'
+PRODUCT_HEADERS = ['seller_id'] + [f.name for f in fields(ProductRecord)]
+
+# csv - файл на парсер в /app/data, queue - публикация в очередь seller_results
+RESULT_SINK = os.getenv('RESULT_SINK', 'csv')
+
+
+class CsvSink:
+    """Запись результатов в CSV файл воркера"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADERS)
+            logging.info(f"✅ Создан CSV файл: {self.path}")
+        except Exception as e:
+            logging.error(f"❌ Ошибка создания CSV: {e}", exc_info=True)
+
+    def write(self, record):
+        with self.lock:
+            with open(self.path, 'a', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(record.to_csv_row())
+                f.flush()
+                os.fsync(f.fileno())
+        logging.info(f"✅ Данные сохранены в CSV {self.path}")
+        return True
+
+    def close(self):
+        pass
+
+
+class ProductCsvSink:
+    """Товары продавцов построчно (seller_id, товар) - пишутся пачками по мере прокрутки.
+
+    Пачки текущего продавца копятся в файле-черновике и попадают в общий файл через commit():
+    попытка, которая уйдёт на повтор через очередь, не оставляет в нём дублей.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.spool_path = f"{path}.part"
+        self.lock = threading.Lock()
+        with open(self.path, 'w', newline='', encoding='utf-8-sig') as f:
+            csv.writer(f).writerow(PRODUCT_HEADERS)
+        logging.info(f"✅ Создан CSV файл товаров: {self.path}")
+
+    def begin(self):
+        """Новый черновик продавца (повтор стадии на той же попытке начинает его заново)"""
+        open(self.spool_path, 'w').close()
+
+    def write_batch(self, seller_id, products):
+        with open(self.spool_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for product in products:
+                writer.writerow([seller_id] + [getattr(product, name) for name in PRODUCT_HEADERS[1:]])
+        return True
+
+    def commit(self):
+        """Черновик продавца - в общий файл товаров"""
+        if not os.path.exists(self.spool_path):
+            return
+        with self.lock:
+            with open(self.spool_path, 'rb') as src, open(self.path, 'ab') as dst:
+                shutil.copyfileobj(src, dst)
+        os.remove(self.spool_path)
+
+    def discard(self):
+        """Черновик попытки, которая уйдёт на повтор, не сохраняется"""
+        if os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+
+
+class QueueSink:
+    """Публикация результатов в очередь seller_results (без записи на диск в воркере)"""
+
+    def __init__(self):
+        self.publisher = Publisher(RESULTS_QUEUE)
+
+    def write(self, record):
+        body = json.dumps(record.to_csv_dict(), ensure_ascii=False).encode('utf-8')
+        if self.publisher.publish(body, content_type='application/json'):
+            logging.info(f"📤 Результат {record.url} отправлен в очередь {RESULTS_QUEUE}")
+            return True
+        return False
+
+    def close(self):
+        self.publisher.close()
+
+
+_queue_sink = None
+_queue_sink_lock = threading.Lock()
+
+
+def create_sink(csv_path):
+    """Приёмник результатов по RESULT_SINK; очередь - одна на процесс"""
+    global _queue_sink
+    if RESULT_SINK == 'queue':
+        with _queue_sink_lock:
+            if _queue_sink is None:
+                _queue_sink = QueueSink()
+            return _queue_sink
+    return CsvSink(csv_path)
+
+
+def record_from_message(body):
+    return SellerRecord.from_dict(json.loads(body))
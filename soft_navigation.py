@@ -0,0 +1,87 @@
+import os
+import time
+import logging
+from urllib.parse import urlparse
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Переход к следующему продавцу через роутер уже загруженной страницы вместо driver.get
+SOFT_NAVIGATION = os.getenv('SOFT_NAVIGATION', 'false').lower() == 'true'
+# Мягких переходов подряд, затем полная загрузка: состояние и память SPA не копятся бесконечно
+SOFT_NAVIGATION_MAX = int(os.getenv('SOFT_NAVIGATION_MAX', 25))
+SOFT_NAVIGATION_TIMEOUT = float(os.getenv('SOFT_NAVIGATION_TIMEOUT', 10))
+# Сколько виджетов новой страницы должно отрисоваться, чтобы считать переход состоявшимся
+SOFT_NAVIGATION_MIN_WIDGETS = int(os.getenv('SOFT_NAVIGATION_MIN_WIDGETS', 3))
+
+# Виджеты текущей страницы помечаются устаревшими, переход - через роутер Nuxt (Vue 2) или Vue 3
+START_SCRIPT = """
+var path = arguments[0];
+document.querySelectorAll('[data-widget]').forEach(function (el) {
+    el.setAttribute('data-soft-nav-stale', '1');
+});
+var router = window.$nuxt && window.$nuxt.$router;
+if (!router) {
+    var root = document.querySelector('#__nuxt, #app');
+    var app = root && root.__vue_app__;
+    router = app && app.config.globalProperties.$router;
+}
+if (!router) return false;
+var pending = router.push(path);
+if (pending && pending.catch) pending.catch(function () {});
+return true;
+"""
+
+# Переход состоялся: адрес сменился, пагинатор и заданное число виджетов отрисованы заново
+DONE_SCRIPT = """
+var path = arguments[0].replace(/\\/$/, '');
+if (location.pathname.replace(/\\/$/, '') !== path) return false;
+if (document.querySelector('[data-widget="infiniteVirtualPaginator"][data-soft-nav-stale]')) return false;
+return document.querySelectorAll('[data-widget]:not([data-soft-nav-stale])').length >= arguments[1];
+"""
+
+
+class SoftNavigator:
+    """Мягкие переходы между страницами продавцов в одной загруженной странице Ozon"""
+
+    def __init__(self):
+        self.pages = None  # мягких переходов с последней полной загрузки; None - тёплой страницы нет
+        self.supported = True  # роутер приложения найден (или ещё не проверялся)
+
+    def warm(self):
+        """Страница загружена полностью и годится для следующих мягких переходов"""
+        self.pages = 0
+
+    @property
+    def moved(self):
+        """Текущая страница открыта мягким переходом: гидрация __NUXT__ осталась от полной загрузки"""
+        return bool(self.pages)
+
+    def invalidate(self):
+        """Блокировка или ошибка: следующий переход - полной загрузкой"""
+        self.pages = None
+
+    def navigate(self, driver, url, timeout):
+        """Переход через роутер приложения; False - нужна полная загрузка (driver.get)"""
+        if not self.supported or self.pages is None or self.pages >= SOFT_NAVIGATION_MAX:
+            return False
+        if 'ozon.ru' not in (driver.current_url or ''):
+            return False
+
+        path = urlparse(url).path
+        started = time.time()
+        try:
+            if not driver.execute_script(START_SCRIPT, path):
+                logging.warning("⚠️ Роутер приложения не найден, мягкие переходы для этого браузера отключены")
+                self.supported = False
+                return False
+            WebDriverWait(driver, timeout, poll_frequency=0.2).until(
+                lambda d: d.execute_script(DONE_SCRIPT, path, SOFT_NAVIGATION_MIN_WIDGETS)
+            )
+        except Exception as e:
+            logging.info(f"↩️ Мягкий переход на {path} не удался ({e.__class__.__name__}), полная загрузка")
+            self.invalidate()
+            return False
+
+        self.pages += 1
+        logging.info(f"⚡ Мягкий переход на {path} за {time.time() - started:.1f} сек "
+                     f"({self.pages}/{SOFT_NAVIGATION_MAX})")
+        return True